@@ -1,95 +1,198 @@
-import google.generativeai as genai
-import uuid
-import random
 import json
+from tools.dispatch_engine import get_dispatch_engine
+from tools.gazetteer import get_gazetteer
 from tools.time_tool import get_current_time
 
-# Mock implementation of the tool for the agent to use directly
-def dispatch_ambulance(location: str, injury: str):
+def dispatch_ambulance(location: str, injury: str, lat: float = None, lon: float = None):
     """
-    Dispatches an ambulance to the specified location.
+    Dispatches the nearest available ambulance to the specified location.
     
     Args:
         location: The location to dispatch to.
         injury: The description of the injury.
+        lat: Latitude of the location, if known.
+        lon: Longitude of the location, if known.
         
     Returns:
-        A dictionary with ETA and dispatch ID.
+        A dictionary with ETA, dispatch ID and the assigned unit.
     """
-    return {
-        "eta": random.randint(5, 15),
-        "dispatch_id": str(uuid.uuid4())
-    }
+    engine = get_dispatch_engine()
+    coordinates = _coordinates(location, lat, lon)
+    confirmed = coordinates is not None
+    if not confirmed:
+        # Never hold a dispatch back for a missing fix: send the unit nearest
+        # the service-area centre and refine the destination en route
+        coordinates = engine.center
 
+    record = engine.assign(coordinates[0], coordinates[1], incident=injury)
+    if record is None:
+        return {"eta": None, "dispatch_id": None, "error": "No ambulance available"}
+    record["location_confirmed"] = confirmed
+    return record
+
+
+def _coordinates(location: str, lat, lon):
+    try:
+        if lat is not None and lon is not None:
+            return float(lat), float(lon)
+    except (TypeError, ValueError):
+        pass
+    gazetteer = get_gazetteer()
+    if gazetteer is not None and location:
+        matches = gazetteer.search(location)
+        if matches:
+            return matches[0]["lat"], matches[0]["lon"]
+    return None
+
+from agents.prompts import instruction
+from agents.registry import get_model
+from agents.schemas import DISPATCH, parse_response, parse_response_async
+from memory.history import log_prompt_tokens, log_usage
 from utils import retry_with_backoff
 
 class AmbulanceAgent:
     def __init__(self, model_name="gemini-2.0-flash"):
         self.tools = [dispatch_ambulance]
-        self.model = genai.GenerativeModel(model_name, tools=self.tools)
-        self.system_instruction = """
+        self.system_instruction = instruction("""
         You are an Ambulance Dispatch Agent.
         Your role is to dispatch an ambulance using the `dispatch_ambulance` tool.
         You need the 'location' and 'injury' details.
         Once dispatched, inform the user of the ETA and dispatch ID.
-        """
-
-    @retry_with_backoff(retries=2, initial_delay=0.5)
-    def dispatch(self, injury_type: str, location: str = "Unknown location", history: list = None) -> dict:
-        chat = self.model.start_chat(history=history or [])
-        
-        json_instruction = f"""
+        """)
+        # JSON mode cannot be combined with tools, so the output shape stays in the instruction
+        self.dispatch_instruction = self.system_instruction + "\n\n" + instruction("""
         Dispatch the ambulance for the given injury.
         You MUST use the `dispatch_ambulance` tool.
-        
-        Injury type: {injury_type}
-        Location: {location}
-        
+
         After dispatching, return a JSON object with:
         - "eta": The estimated time of arrival (integer minutes) returned by the tool.
         - "dispatch_id": The dispatch ID returned by the tool.
+        - "unit_id": The ambulance unit ID returned by the tool.
         
-        If dispatch fails, return {{"eta": null, "dispatch_id": null}}.
+        If dispatch fails, return {"eta": null, "dispatch_id": null}.
+        """)
+        self.model = get_model(model_name, tools=self.tools, system_instruction=self.dispatch_instruction)
+        # Tool-free model that words confirmations for direct dispatches and
+        # repairs malformed answers
+        self.phrasing_model = get_model(model_name, system_instruction=self.system_instruction)
+
+    def dispatch_direct(self, injury_type: str, location: str = "Unknown location", lat: float = None, lon: float = None) -> dict:
         """
-        
-        response = chat.send_message(f"{self.system_instruction}\n{json_instruction}")
+        Dispatches through the tool without a model round trip. The inputs are
+        already structured, so there is nothing for the LLM to decide.
+        """
+        result = dispatch_ambulance(location=location, injury=injury_type, lat=lat, lon=lon)
+        result["timestamp"] = get_current_time()["timestamp"]
+        return result
+
+    @retry_with_backoff(retries=2, initial_delay=0.5)
+    async def phrase_confirmation_async(self, dispatch_result: dict, injury_type: str) -> str:
+        """
+        One calm, spoken-style sentence confirming a dispatch that already happened.
+        """
+        prompt = instruction(f"""
+        An ambulance has already been dispatched. Tell the caller in one short, calm sentence.
+        Mention the estimated arrival time in minutes. Do not call any tools.
+
+        Injury type: {injury_type}
+        Dispatch: {json.dumps({k: dispatch_result.get(k) for k in ("eta", "unit_id", "dispatch_id")})}
+        """)
+        log_prompt_tokens("ambulance", prompt, system_instruction=self.system_instruction)
+        response = await self.phrasing_model.generate_content_async(prompt)
+        log_usage("ambulance", response)
+        return response.text.strip()
+
+    @retry_with_backoff(retries=2, initial_delay=0.5)
+    def dispatch(self, injury_type: str, location: str = "Unknown location", lat: float = None, lon: float = None, history: list = None) -> dict:
+        prompt = self._build_prompt(injury_type, location, lat, lon)
+        log_prompt_tokens("ambulance", prompt, history, self.dispatch_instruction)
+        chat = self.model.start_chat(history=history or [])
+        response = chat.send_message(prompt)
+        log_usage("ambulance", response)
+        tool_result = None
         
         # Check if function call is needed
         if response.parts[0].function_call:
             # Extract function call details
             function_call = response.parts[0].function_call
             function_name = function_call.name
-            function_args = function_call.args
+            function_args = self._tool_args(function_call.args, lat, lon)
             
             if function_name == "dispatch_ambulance":
                 # Call the tool
                 tool_result = self.tools[0](**function_args)
                 
                 # Send the tool result back to the model
-                response = chat.send_message(
-                    genai.protos.Content(
-                        parts=[
-                            genai.protos.Part(
-                                function_response=genai.protos.FunctionResponse(
-                                    name=function_name,
-                                    response={"result": tool_result}
-                                )
-                            )
-                        ]
-                    )
-                )
+                response = chat.send_message(self._function_response(function_name, tool_result))
         
-        try:
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3]
-            result = json.loads(text)
-            
+        return self._stamp(parse_response(DISPATCH, response, self.phrasing_model, self._fallback(tool_result)))
+
+    @retry_with_backoff(retries=2, initial_delay=0.5)
+    async def dispatch_async(self, injury_type: str, location: str = "Unknown location", lat: float = None, lon: float = None, history: list = None) -> dict:
+        """
+        Non-blocking variant of dispatch() for the FastAPI request path.
+        """
+        prompt = self._build_prompt(injury_type, location, lat, lon)
+        log_prompt_tokens("ambulance", prompt, history, self.dispatch_instruction)
+        chat = self.model.start_chat(history=history or [])
+        response = await chat.send_message_async(prompt)
+        log_usage("ambulance", response)
+        tool_result = None
+
+        if response.parts[0].function_call:
+            function_call = response.parts[0].function_call
+            function_name = function_call.name
+            function_args = self._tool_args(function_call.args, lat, lon)
+
+            if function_name == "dispatch_ambulance":
+                tool_result = self.tools[0](**function_args)
+                response = await chat.send_message_async(self._function_response(function_name, tool_result))
+
+        return self._stamp(await parse_response_async(DISPATCH, response, self.phrasing_model, self._fallback(tool_result)))
+
+    def _build_prompt(self, injury_type: str, location: str, lat: float = None, lon: float = None) -> str:
+        coordinates = f"{lat}, {lon}" if lat is not None and lon is not None else "unknown"
+        return f"Injury type: {injury_type}\nLocation: {location}\nCoordinates (lat, lon): {coordinates}"
+
+    @staticmethod
+    def _tool_args(args, lat, lon) -> dict:
+        """The model's tool arguments, with the known coordinates filled in if it dropped them."""
+        args = dict(args)
+        if lat is not None and lon is not None:
+            args.setdefault("lat", lat)
+            args.setdefault("lon", lon)
+        return args
+
+    @staticmethod
+    def _function_response(function_name: str, tool_result: dict):
+        # The SDK converts this dict to a protos.Content; building it here
+        # would import the SDK in processes that never create a Gemini model
+        return {
+            "parts": [
+                {
+                    "function_response": {
+                        "name": function_name,
+                        "response": {"result": tool_result}
+                    }
+                }
+            ]
+        }
+
+    @staticmethod
+    def _fallback(tool_result: dict):
+        """
+        The tool's own record if it dispatched (the model only echoes it);
+        otherwise an error, so the supervisor does not mark the call as covered.
+        """
+        def fallback(text: str):
+            if tool_result and tool_result.get("dispatch_id"):
+                return dict(tool_result)
+            return {"eta": None, "dispatch_id": None, "error": "Unreadable dispatch response", "raw_response": text}
+        return fallback
+
+    @staticmethod
+    def _stamp(result: dict) -> dict:
+        if not result.get("error"):
             # Add timestamp from MCP tool
-            time_data = get_current_time()
-            result["timestamp"] = time_data["timestamp"]
-            
-            return result
-        except Exception:
-            # Attempt to extract from text if JSON parsing fails
-            return {"eta": None, "dispatch_id": None, "raw_response": response.text}
+            result["timestamp"] = get_current_time()["timestamp"]
+        return result
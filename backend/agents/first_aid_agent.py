@@ -1,12 +1,32 @@
-import google.generativeai as genai
-
-import json
+import metrics
+from agents.first_aid_protocols import get_protocols
+from agents.prompts import RenderCache, instruction
+from agents.registry import get_model
+from agents.response_cache import cached_response
+from agents.schemas import FIRST_AID, parse_response, parse_response_async
+from memory.history import log_prompt_tokens, log_usage
 from utils import retry_with_backoff
 
+# Appended by the model to the last step when streaming plain text
+COMPLETED_MARKER = "[COMPLETED]"
+
+
+def _cache_key(self, injury_type: str, step_index: int, user_input: str, history: list = None):
+    # History only adds nuance to an answer about the same injury and step
+    return f"{injury_type} | step {step_index} | {user_input}"
+
+
+def _partial_marker(text: str) -> int:
+    """Length of the longest suffix of `text` that begins COMPLETED_MARKER."""
+    for size in range(min(len(text), len(COMPLETED_MARKER) - 1), 0, -1):
+        if COMPLETED_MARKER.startswith(text[-size:]):
+            return size
+    return 0
+
+
 class FirstAidAgent:
     def __init__(self, model_name="gemini-2.0-flash"):
-        self.model = genai.GenerativeModel(model_name)
-        self.system_instruction = """
+        self.system_instruction = instruction("""
         You are a First Aid Guidance Agent.
         Your goal is to provide clear, step-by-step first aid instructions based on the injury.
         
@@ -15,33 +35,168 @@ class FirstAidAgent:
         2. Wait for user confirmation or questions before moving to the next step.
         3. Be calm and reassuring.
         4. If the situation is critical (CPR needed), be very direct.
+        """)
+        self.model = get_model(model_name, system_instruction=self.system_instruction)
+        self.protocols = get_protocols()
+        # Per-call instructions by (injury, step, streaming): the same few are asked for in every call
+        self._step_prompts = RenderCache()
+
+    def get_next_step(self, injury_type: str, step_index: int, user_input: str, history: list = None) -> dict:
+        scripted = self._scripted_step(injury_type, step_index, user_input)
+        if scripted is not None:
+            return scripted
+        return self._off_script(self._generate(injury_type, step_index, user_input, history), injury_type, step_index)
+
+    async def get_next_step_async(self, injury_type: str, step_index: int, user_input: str, history: list = None) -> dict:
         """
+        Non-blocking variant of get_next_step() for the FastAPI request path.
+        """
+        scripted = self._scripted_step(injury_type, step_index, user_input)
+        if scripted is not None:
+            return scripted
+        return self._off_script(await self._generate_async(injury_type, step_index, user_input, history), injury_type, step_index)
 
+    @cached_response("first_aid", key=_cache_key, similar=True)
     @retry_with_backoff(retries=3, initial_delay=2)
-    def get_next_step(self, injury_type: str, step_index: int, user_input: str, history: list = None) -> dict:
+    def _generate(self, injury_type: str, step_index: int, user_input: str, history: list = None) -> dict:
+        prompt = self._build_prompt(injury_type, step_index, user_input)
+        log_prompt_tokens("first_aid", prompt, history, self.system_instruction)
         chat = self.model.start_chat(history=history or [])
-        
-        json_instruction = f"""
-        Provide the next first aid step for: {injury_type}.
-        Current step index: {step_index}.
-        
-        Return a JSON object with:
-        - "instruction": The text instruction for the user.
-        - "next_step_index": The index for the next step (increment by 1).
-        - "completed": Boolean, true if all steps are finished.
+        response = chat.send_message(prompt, generation_config=FIRST_AID.generation_config)
+        log_usage("first_aid", response)
+        return parse_response(FIRST_AID, response, self.model, self._fallback(step_index))
+
+    @cached_response("first_aid", key=_cache_key, similar=True)
+    @retry_with_backoff(retries=3, initial_delay=2)
+    async def _generate_async(self, injury_type: str, step_index: int, user_input: str, history: list = None) -> dict:
+        prompt = self._build_prompt(injury_type, step_index, user_input)
+        log_prompt_tokens("first_aid", prompt, history, self.system_instruction)
+        chat = self.model.start_chat(history=history or [])
+        response = await chat.send_message_async(prompt, generation_config=FIRST_AID.generation_config)
+        log_usage("first_aid", response)
+        return await parse_response_async(FIRST_AID, response, self.model, self._fallback(step_index))
+
+    async def stream_next_step_async(self, injury_type: str, step_index: int, user_input: str, history: list = None):
         """
-        
-        prompt = f"{self.system_instruction}\n{json_instruction}\n\nUser Input: {user_input}"
-        response = chat.send_message(prompt)
-        
-        try:
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3]
-            return json.loads(text)
-        except Exception:
-            return {
-                "instruction": response.text,
-                "next_step_index": step_index + 1,
-                "completed": False
-            }
+        Streams the next step as plain text while the model generates it.
+        Yields text deltas, then a final dict with the same keys as
+        get_next_step() so the caller can update session state.
+        """
+        scripted = self._scripted_step(injury_type, step_index, user_input)
+        if scripted is not None:
+            yield scripted["instruction"]
+            yield scripted
+            return
+
+        prompt = self._build_stream_prompt(injury_type, step_index, user_input)
+        log_prompt_tokens("first_aid", prompt, history, self.system_instruction)
+        chat = self.model.start_chat(history=history or [])
+        response = await self._open_stream(chat, prompt)
+
+        text, held = "", ""
+        async for chunk in response:
+            held += chunk.text
+            if COMPLETED_MARKER in held:
+                continue
+            # Hold back a tail that could be the start of the completion marker
+            safe = len(held) - _partial_marker(held)
+            if safe:
+                text += held[:safe]
+                yield held[:safe]
+                held = held[safe:]
+
+        completed = COMPLETED_MARKER in held
+        tail = held.replace(COMPLETED_MARKER, "")
+        if tail.strip():
+            text += tail
+            yield tail
+        yield self._off_script({
+            "instruction": text.strip(),
+            "next_step_index": step_index + 1,
+            "completed": completed,
+        }, injury_type, step_index)
+
+    def _scripted_step(self, injury_type: str, step_index: int, user_input: str):
+        """
+        The scripted step from the protocol library, or None when the LLM is
+        needed (no protocol for this injury, or an off-script question).
+        """
+        protocol_id = self.protocols.resolve(injury_type)
+        if protocol_id is None:
+            metrics.incr("first_aid_unscripted_total")
+            return None
+        if self.protocols.wants_repeat(user_input):
+            metrics.incr("first_aid_scripted_total")
+            step = self.protocols.step(protocol_id, step_index - 1)
+            if step_index > 0:
+                # Repeating the last step does not advance the script
+                step["next_step_index"] = step_index
+            return step
+        if self.protocols.is_off_script(user_input):
+            metrics.incr("first_aid_off_script_total")
+            return None
+        metrics.incr("first_aid_scripted_total")
+        return self.protocols.step(protocol_id, step_index)
+
+    def _off_script(self, result: dict, injury_type: str, step_index: int) -> dict:
+        """
+        An LLM answer inside a scripted protocol answers the question without
+        moving the script on, so the next "what next?" resumes where it was.
+        """
+        if self.protocols.resolve(injury_type) is not None:
+            result["next_step_index"] = step_index
+            result["completed"] = False
+        return result
+
+    @retry_with_backoff(retries=3, initial_delay=2)
+    async def _open_stream(self, chat, prompt: str):
+        # Only opening the stream is retried; a stream that fails midway is not replayed
+        return await chat.send_message_async(prompt, stream=True)
+
+    def _protocol_context(self, injury_type: str, step_index: int) -> str:
+        protocol_id = self.protocols.resolve(injury_type)
+        if protocol_id is None:
+            return ""
+        last_step = self.protocols.step(protocol_id, step_index - 1)["instruction"] if step_index > 0 else "none yet"
+        return instruction(f"""
+        The caller is following the scripted {self.protocols.title(protocol_id)} protocol.
+        Last step they were given: {last_step}
+        Answer their question briefly and consistently with that protocol, then tell them to say "next" when ready.
+        """)
+
+    def _step_prompt(self, injury_type: str, step_index: int, stream: bool) -> str:
+        def render():
+            if stream:
+                reply_format = instruction(f"""
+                Reply with the instruction only, as plain spoken sentences (no JSON, no markdown).
+                If this is the final step, end your reply with {COMPLETED_MARKER}
+                """)
+            else:
+                reply_format = instruction("""
+                Return a JSON object with:
+                - "instruction": The text instruction for the user.
+                - "next_step_index": The index for the next step (increment by 1).
+                - "completed": Boolean, true if all steps are finished.
+                """)
+            return "\n".join(filter(None, [
+                f"Provide the next first aid step for: {injury_type}.",
+                f"Current step index: {step_index}.",
+                self._protocol_context(injury_type, step_index),
+                reply_format,
+            ]))
+        return self._step_prompts.get((injury_type, step_index, stream), render)
+
+    def _build_stream_prompt(self, injury_type: str, step_index: int, user_input: str) -> str:
+        return f"{self._step_prompt(injury_type, step_index, True)}\n\nUser Input: {user_input}"
+
+    def _build_prompt(self, injury_type: str, step_index: int, user_input: str) -> str:
+        return f"{self._step_prompt(injury_type, step_index, False)}\n\nUser Input: {user_input}"
+
+    @staticmethod
+    def _fallback(step_index: int):
+        # Unrepairable answers are still spoken: the text itself is the instruction
+        return lambda text: {
+            "instruction": text.strip(),
+            "next_step_index": step_index + 1,
+            "completed": False
+        }
@@ -0,0 +1,119 @@
+"""
+Precompiled first-aid protocols.
+
+Scripted step-by-step protocols (CPR, bleeding, burns, ...) are loaded once
+from a versioned JSON file into an index keyed by protocol and step, with
+every step's response prebuilt, so serving a step is a dictionary lookup.
+The LLM is only needed for injuries without a protocol and for questions
+that go off the script.
+"""
+import json
+import os
+import re
+
+DEFAULT_PROTOCOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "first_aid_protocols.json")
+
+# "what next", "done, what now?" ... move the script on rather than asking something new
+_PROGRESS_PHRASE = (
+    r"(?:ok(?:ay)?|yes|yeah|yep|alright|done|did it|i did(?: it| that)?|finished|got it|ready|next|continue|go on"
+    r"|(?:and |so )?(?:what(?:'s| is)? next|what now|now what|then what|what (?:do|should|can) i do(?: now| next)?))"
+)
+_PROGRESS = re.compile(rf"^{_PROGRESS_PHRASE}(?:[\s,.!]+{_PROGRESS_PHRASE})*[\s.!?]*$", re.IGNORECASE)
+_QUESTION = re.compile(
+    r"\?|^(?:what|why|how|when|where|which|who|can|could|should|shall|is|are|do|does|did|will|would|may|must)\b",
+    re.IGNORECASE,
+)
+_REPEAT = re.compile(r"\b(?:repeat|again|say that|didn't (?:get|hear)|didnt (?:get|hear)|pardon|sorry\?)", re.IGNORECASE)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class ProtocolLibrary:
+    def __init__(self, document: dict):
+        self.version = document.get("version", 1)
+        self._steps = {}
+        self._titles = {}
+        self._aliases = {}
+        for protocol in document["protocols"]:
+            steps = protocol["steps"]
+            # Prebuilt responses, one per step plus the closing line past the end
+            self._steps[protocol["id"]] = tuple(
+                {
+                    "instruction": text,
+                    "next_step_index": index + 1,
+                    "completed": index == len(steps) - 1,
+                }
+                for index, text in enumerate(steps)
+            ) + ({"instruction": protocol["closing"], "next_step_index": len(steps), "completed": True},)
+            self._titles[protocol["id"]] = protocol["title"]
+            for alias in [protocol["id"], *protocol.get("aliases", [])]:
+                self._aliases[_normalize(alias)] = protocol["id"]
+        # Longest aliases first, so "broken arm" wins over a shorter alias inside it
+        self._alias_pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(a) for a in sorted(self._aliases, key=len, reverse=True)) + r")\b"
+        )
+        self._resolved = {}
+
+    @classmethod
+    def from_file(cls, path: str = None):
+        with open(path or DEFAULT_PROTOCOLS_PATH, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def resolve(self, injury_type: str):
+        """Protocol id for a triage injury type ("Severe bleeding" -> "bleeding"), or None."""
+        if not injury_type:
+            return None
+        if injury_type in self._resolved:
+            return self._resolved[injury_type]
+        key = _normalize(injury_type)
+        protocol_id = self._aliases.get(key)
+        if protocol_id is None:
+            match = self._alias_pattern.search(key)
+            protocol_id = self._aliases[match.group(0)] if match else None
+        if len(self._resolved) < 4096:
+            self._resolved[injury_type] = protocol_id
+        return protocol_id
+
+    def step(self, protocol_id: str, step_index: int) -> dict:
+        """The prebuilt response for a step; past the last step, the closing line."""
+        steps = self._steps[protocol_id]
+        return dict(steps[min(max(step_index, 0), len(steps) - 1)])
+
+    def step_count(self, protocol_id: str) -> int:
+        return len(self._steps[protocol_id]) - 1
+
+    def title(self, protocol_id: str) -> str:
+        return self._titles[protocol_id]
+
+    @staticmethod
+    def wants_repeat(user_input: str) -> bool:
+        return bool(_REPEAT.search(user_input or ""))
+
+    @staticmethod
+    def is_progress(user_input: str) -> bool:
+        """True for plain confirmations and "what next" style prompts that only move the steps on."""
+        return bool(_PROGRESS.match((user_input or "").strip()))
+
+    @staticmethod
+    def is_off_script(user_input: str) -> bool:
+        """
+        True for questions the script cannot answer ("can I give him water?").
+        Confirmations and "what next" style prompts stay on the script.
+        """
+        text = (user_input or "").strip()
+        if not text or _PROGRESS.match(text):
+            return False
+        return bool(_QUESTION.search(text))
+
+
+_default_library = None
+
+
+def get_protocols() -> ProtocolLibrary:
+    """Returns the process-wide protocol library, loaded once from FIRST_AID_PROTOCOLS_PATH."""
+    global _default_library
+    if _default_library is None:
+        _default_library = ProtocolLibrary.from_file(os.getenv("FIRST_AID_PROTOCOLS_PATH") or None)
+    return _default_library
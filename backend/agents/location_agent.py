@@ -1,38 +1,52 @@
-import google.generativeai as genai
-from tools.geocode import reverse_geocode
-import json
+from tools.geocode import reverse_geocode, reverse_geocode_async
 
+from agents.prompts import instruction
+from agents.registry import get_model
+from agents.response_cache import cached_response
+from agents.schemas import LOCATION, parse_response, parse_response_async
+from memory.history import log_prompt_tokens, log_usage
 from utils import retry_with_backoff
 
+
+def _cache_key(self, user_input: str, history: list = None):
+    # Where the caller is does not depend on what else was said
+    return user_input
+
+
+def _resolved(result) -> bool:
+    # Only cache locations the geocoder actually resolved
+    return bool(result) and result.get("lat") is not None
+
 class LocationAgent:
     def __init__(self, model_name="gemini-2.0-flash"):
         self.tools = [reverse_geocode]
-        self.model = genai.GenerativeModel(model_name, tools=self.tools)
-        self.system_instruction = """
+        # JSON mode cannot be combined with tools, so the output shape stays in the instruction
+        self.system_instruction = instruction("""
         You are a Location Agent. Your job is to extract location information from the user's input and resolve it to a specific address using the `reverse_geocode` tool.
         
         If the user provides a location, use the tool to get the details.
         Return the final location details.
-        """
 
-    @retry_with_backoff(retries=3, initial_delay=2)
-    def extract_location(self, user_input: str, history: list = None) -> dict:
-        chat = self.model.start_chat(history=history or [])
-        
-        # Update system instruction to request JSON
-        json_instruction = """
-        Extract the location from the user's input.
-        If a location is found, use the `reverse_geocode` tool to get details if needed, or just extract it.
-        
         Return a JSON object with the following keys:
         - "address": The full address or location description.
         - "lat": Latitude (if available, else null).
         - "lon": Longitude (if available, else null).
         
         If no location is found, return null.
-        """
-        
-        response = chat.send_message(f"{self.system_instruction}\n{json_instruction}\n\nUser Input: {user_input}")
+        """)
+        self.model = get_model(model_name, tools=self.tools, system_instruction=self.system_instruction)
+        # Tool-free model for schema-constrained repairs
+        self.repair_model = get_model(model_name)
+
+    @cached_response("location", key=_cache_key, accept=_resolved)
+    @retry_with_backoff(retries=3, initial_delay=2)
+    def extract_location(self, user_input: str, history: list = None) -> dict:
+        prompt = self._build_prompt(user_input)
+        log_prompt_tokens("location", prompt, history, self.system_instruction)
+        chat = self.model.start_chat(history=history or [])
+        response = chat.send_message(prompt)
+        log_usage("location", response)
+        tool_result = None
         
         # Check if function call is needed
         if response.parts[0].function_call:
@@ -46,25 +60,62 @@ class LocationAgent:
                 tool_result = self.tools[0](**function_args)
                 
                 # Send the tool result back to the model
-                response = chat.send_message(
-                    genai.protos.Content(
-                        parts=[
-                            genai.protos.Part(
-                                function_response=genai.protos.FunctionResponse(
-                                    name=function_name,
-                                    response={"result": tool_result}
-                                )
-                            )
-                        ]
-                    )
-                )
-
-        try:
-            # Clean up response text to ensure it's valid JSON
-            text = response.text.strip()
-            if text.startswith("```json"):
-                text = text[7:-3]
-            return json.loads(text)
-        except Exception:
-            # Fallback if JSON parsing fails or if it's just a string
-            return {"address": response.text, "lat": None, "lon": None}
+                response = chat.send_message(self._function_response(function_name, tool_result))
+
+        return parse_response(LOCATION, response, self.repair_model, self._fallback(tool_result))
+
+    @cached_response("location", key=_cache_key, accept=_resolved)
+    @retry_with_backoff(retries=3, initial_delay=2)
+    async def extract_location_async(self, user_input: str, history: list = None) -> dict:
+        """
+        Non-blocking variant of extract_location() for the FastAPI request path.
+        The geocoding tool call goes through the shared async HTTP client.
+        """
+        prompt = self._build_prompt(user_input)
+        log_prompt_tokens("location", prompt, history, self.system_instruction)
+        chat = self.model.start_chat(history=history or [])
+        response = await chat.send_message_async(prompt)
+        log_usage("location", response)
+        tool_result = None
+
+        if response.parts[0].function_call:
+            function_call = response.parts[0].function_call
+            function_name = function_call.name
+            function_args = dict(function_call.args)
+
+            if function_name == "reverse_geocode":
+                tool_result = await reverse_geocode_async(**function_args)
+                response = await chat.send_message_async(self._function_response(function_name, tool_result))
+
+        return await parse_response_async(LOCATION, response, self.repair_model, self._fallback(tool_result))
+
+    def _build_prompt(self, user_input: str) -> str:
+        return f"User Input: {user_input}"
+
+    @staticmethod
+    def _function_response(function_name: str, tool_result: dict):
+        # The SDK converts this dict to a protos.Content; building it here
+        # would import the SDK in processes that never create a Gemini model
+        return {
+            "parts": [
+                {
+                    "function_response": {
+                        "name": function_name,
+                        "response": {"result": tool_result}
+                    }
+                }
+            ]
+        }
+
+    @staticmethod
+    def _fallback(tool_result: dict):
+        """
+        What the geocoder resolved, if it did. Otherwise no location: asking
+        again beats guiding an ambulance to the model's raw text.
+        """
+        def fallback(text: str):
+            if tool_result and tool_result.get("lat") is not None:
+                address = tool_result.get("display_name") or tool_result.get("name")
+                return {"address": address, "lat": float(tool_result["lat"]), "lon": float(tool_result["lon"])}
+            return None
+        return fallback
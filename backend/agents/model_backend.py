@@ -0,0 +1,85 @@
+"""
+Model backends: where agent models come from.
+
+Every agent gets its model through agents.registry.get_model(), which asks
+the configured backend to build it. MODEL_BACKEND picks the backend:
+
+    gemini  google.generativeai.GenerativeModel (default)
+    stub    agents.stub_model.StubModel: canned answers, no network, for
+            load tests, benchmarks and local runs without an API key
+
+The stub is configured with STUB_MODEL_LATENCY / STUB_MODEL_JITTER (seconds),
+STUB_MODEL_ERROR_RATE (0-1) and STUB_MODEL_ERROR ("unavailable" or "quota"),
+and STUB_MODEL_RESPONSES (a JSON file of canned responses).
+
+The Gemini SDK takes about a second to import, so it is only imported (and
+configured with GOOGLE_API_KEY) when the first model is built.
+
+Each agent's fixed instructions go to the model as its native
+system_instruction, ahead of history and the per-call prompt, which is the
+prefix Gemini's implicit context caching reuses across requests. Explicit
+CachedContent is not used: its minimum size is far above these instructions
+(a few hundred tokens at most), and it bills storage per hour.
+"""
+import os
+import threading
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self):
+        self._configured = False
+
+    def create(self, model_name: str, tools: list = None, system_instruction: str = None):
+        import google.generativeai as genai
+        if not self._configured:
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if api_key:
+                genai.configure(api_key=api_key)
+            self._configured = True
+        return genai.GenerativeModel(model_name, tools=tools, system_instruction=system_instruction)
+
+    async def warm_up(self, model):
+        # count_tokens is free and opens the same async channel generation uses
+        await model.count_tokens_async("warm-up")
+
+
+def _stub_from_env():
+    from agents.stub_model import StubBackend
+    options = {
+        "latency": float(os.getenv("STUB_MODEL_LATENCY", "0")),
+        "jitter": float(os.getenv("STUB_MODEL_JITTER", "0")),
+        "error_rate": float(os.getenv("STUB_MODEL_ERROR_RATE", "0")),
+        "error": os.getenv("STUB_MODEL_ERROR", "unavailable"),
+    }
+    path = os.getenv("STUB_MODEL_RESPONSES")
+    return StubBackend.from_file(path, **options) if path else StubBackend(**options)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Returns the process-wide model backend selected by MODEL_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.getenv("MODEL_BACKEND", "gemini").lower()
+                if name == "stub":
+                    _backend = _stub_from_env()
+                elif name == "gemini":
+                    _backend = GeminiBackend()
+                else:
+                    raise ValueError(f"Unknown MODEL_BACKEND: {name}")
+                print(f"[DEBUG] Model backend: {name}")
+    return _backend
+
+
+def set_backend(backend):
+    """Swaps the backend; models already handed out keep the old one until registry.clear()."""
+    global _backend
+    _backend = backend
+
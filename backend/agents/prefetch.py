@@ -0,0 +1,97 @@
+"""
+Speculative prefetch of the next first-aid step.
+
+While the caller carries out step N, step N+1 is already being generated in
+the background. The next plain confirmation ("done", "what next?") is served
+from it: at once if it finished, or after only the remaining part of the
+generation if it is still running. Entries are per session, keyed by injury
+and step, and expire after a TTL; any other reply (a question, new
+symptoms) discards them, since the situation the step was written for may
+have changed.
+
+    first_aid_prefetch_started_total     prefetches launched
+    first_aid_prefetch_hits_total        steps served from a prefetch
+    first_aid_prefetch_misses_total      confirmations with nothing usable prefetched
+    first_aid_prefetch_discarded_total   prefetches dropped (reply changed the situation, or expired)
+    first_aid_prefetch_saved_seconds     model latency the caller did not wait for, per hit
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import metrics
+
+
+class _Prefetch:
+    __slots__ = ("key", "task", "expires_at", "duration")
+
+    def __init__(self, key, expires_at: float):
+        self.key = key
+        self.task = None
+        self.expires_at = expires_at
+        self.duration = None
+
+
+class StepPrefetcher:
+    def __init__(self, ttl_seconds: float = 120.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # session_id -> _Prefetch, oldest first
+
+    def start(self, session_id: str, key, generate: Callable[[], Awaitable[Any]]):
+        """Starts generating `key` for the session in the background, replacing any earlier prefetch."""
+        self.discard(session_id, count=False)
+        self._evict(time.monotonic())
+        entry = _Prefetch(key, time.monotonic() + self.ttl_seconds)
+        entry.task = asyncio.get_running_loop().create_task(self._run(entry, generate))
+        self._entries[session_id] = entry
+        metrics.incr("first_aid_prefetch_started_total")
+
+    async def take(self, session_id: str, key):
+        """The prefetched result for `key`, or None (a miss) if there is none or it no longer applies."""
+        entry = self._entries.pop(session_id, None)
+        if entry is None or entry.key != key or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                entry.task.cancel()
+                metrics.incr("first_aid_prefetch_discarded_total")
+            metrics.incr("first_aid_prefetch_misses_total")
+            return None
+
+        start = time.perf_counter()
+        result = await entry.task
+        if result is None:
+            metrics.incr("first_aid_prefetch_misses_total")
+            return None
+        metrics.incr("first_aid_prefetch_hits_total")
+        metrics.observe("first_aid_prefetch_saved_seconds", max(0.0, entry.duration - (time.perf_counter() - start)))
+        return result
+
+    def discard(self, session_id: str, count: bool = True):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            entry.task.cancel()
+            if count:
+                metrics.incr("first_aid_prefetch_discarded_total")
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    async def _run(entry: _Prefetch, generate: Callable[[], Awaitable[Any]]):
+        start = time.perf_counter()
+        try:
+            return await generate()
+        except Exception as e:
+            # The step is simply generated on demand instead
+            print(f"[WARN] First-aid prefetch failed: {e}")
+            return None
+        finally:
+            entry.duration = time.perf_counter() - start
+
+    def _evict(self, now: float):
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) < self.max_entries:
+                break
+            self.discard(session_id)
@@ -0,0 +1,42 @@
+"""
+Prompt text shared by the agents.
+
+Each agent's fixed instructions are its model's system instruction (see
+registry.get_model), so a message carries only what changes per call. Parts
+of that per-call text that depend on a few values (first-aid injury and step)
+are rendered once and kept in a RenderCache.
+"""
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+def instruction(text: str) -> str:
+    """A triple-quoted prompt block without the source indentation (each space is input the model pays for)."""
+    return textwrap.dedent(text).strip()
+
+
+class RenderCache:
+    """Bounded memo of rendered prompt parts, least recently used dropped first."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> str:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                return text
+        text = render()
+        with self._lock:
+            self._entries[key] = text
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def size(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,93 @@
+"""
+Process-wide registry of model clients and agents.
+
+Agents hold no per-session state (that lives in the session store), so one
+instance of each agent, and one model client per model + tool configuration,
+is shared by every session.
+"""
+import importlib
+import threading
+
+from agents.model_backend import get_backend
+
+_lock = threading.RLock()
+_models = {}
+_agents = {}
+
+
+def _tools_key(tools):
+    return tuple(getattr(tool, "__qualname__", repr(tool)) for tool in tools or ())
+
+
+def get_model(model_name: str, tools: list = None, system_instruction: str = None):
+    """
+    Returns the shared GenerativeModel for this model name + tool set + system
+    instruction, building it once. The system instruction is the agent's fixed
+    prompt: sent natively instead of pasted into every message, it leads each
+    request as a stable prefix the API can cache.
+    """
+    key = (model_name, _tools_key(tools), system_instruction)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = get_backend().create(model_name, tools=tools, system_instruction=system_instruction)
+                _models[key] = model
+    return model
+
+
+def models() -> list:
+    """Every model client built so far."""
+    with _lock:
+        return list(_models.values())
+
+
+def get_agent(agent_cls):
+    """
+    Returns the shared instance of an agent class, constructing it on first use.
+    """
+    agent = _agents.get(agent_cls)
+    if agent is None:
+        with _lock:
+            agent = _agents.get(agent_cls)
+            if agent is None:
+                agent = agent_cls()
+                _agents[agent_cls] = agent
+    return agent
+
+
+class LazyAgent:
+    """
+    Class attribute that resolves to the shared agent on first access, so
+    the agent's module (and the models behind it) load only when a request
+    needs it. Assigning to the attribute replaces it for that instance.
+
+        triage_agent = LazyAgent("agents.triage_agent", "TriageAgent")
+    """
+
+    def __init__(self, module: str, class_name: str):
+        self.module = module
+        self.class_name = class_name
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        agent = instance.__dict__.get(self.name)
+        if agent is None:
+            agent = get_agent(getattr(importlib.import_module(self.module), self.class_name))
+            instance.__dict__[self.name] = agent
+        return agent
+
+    def __set__(self, instance, agent):
+        instance.__dict__[self.name] = agent
+
+
+def clear():
+    """Drops every cached model and agent (used by tests and reconfiguration)."""
+    with _lock:
+        _models.clear()
+        _agents.clear()
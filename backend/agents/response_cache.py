@@ -0,0 +1,298 @@
+"""
+Response cache for agent LLM calls.
+
+Agents send the same prompts over and over (triage of "I cut my hand and
+it's bleeding", the same off-script first-aid question). Results are cached
+per agent under the normalized prompt, with a per-agent TTL and LRU
+eviction under a byte budget.
+
+An optional similarity tier also serves near-duplicate prompts, using MinHash
+signatures over word shingles with LSH banding. A near match must still
+agree on every negation word and number, so "he is not breathing" never
+reuses "he is breathing". The tier is off unless RESPONSE_CACHE_SIMILARITY
+is set, and only agents that opt in use it.
+
+Safety-critical agents never go through the cache (ambulance dispatch has
+side effects and must always run).
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+NEVER_CACHE = frozenset({"ambulance"})
+DEFAULT_TTLS = {"triage": 3600.0, "first_aid": 3600.0, "location": 3600.0}
+
+_WORD = re.compile(r"[a-z0-9']+")
+_GUARD_WORDS = frozenset({
+    "no", "not", "never", "without", "none", "nobody", "nothing",
+    "isn't", "isnt", "wasn't", "wasnt", "don't", "dont", "doesn't", "doesnt",
+    "can't", "cant", "cannot", "won't", "wont", "hasn't", "hasnt", "didn't", "didnt",
+})
+
+
+def normalize_prompt(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, using XOR-masked 64-bit hashes as permutations."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+    def signature(self, words: list) -> tuple:
+        size = self.shingle_size
+        shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles]
+        return tuple(min(h ^ mask for h in hashes) for mask in self._masks)
+
+    @staticmethod
+    def similarity(a: tuple, b: tuple) -> float:
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class _Entry:
+    __slots__ = ("key", "agent", "value", "nbytes", "expires_at", "latency", "signature", "guard")
+
+    def __init__(self, key, agent, value, nbytes, expires_at, latency, signature=None, guard=None):
+        self.key = key
+        self.agent = agent
+        self.value = value
+        self.nbytes = nbytes
+        self.expires_at = expires_at
+        self.latency = latency
+        self.signature = signature
+        self.guard = guard
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, similarity: float = 0.0, ttls: dict = None,
+                 num_perm: int = 64, bands: int = 16):
+        self.max_bytes = max_bytes
+        self.similarity = similarity
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.bands = bands
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm=num_perm)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._bytes = 0
+        self._hits = 0
+        self._lookups = 0
+
+    def ttl_for(self, agent: str) -> float:
+        if agent in NEVER_CACHE:
+            return 0.0
+        return self.ttls.get(agent, 0.0)
+
+    # ------------------------------------------------------------------
+    # Lookup and store
+    # ------------------------------------------------------------------
+    def get(self, agent: str, prompt: str, similar: bool = False):
+        """The cached value for a prompt (a fresh copy), or None."""
+        normalized = normalize_prompt(prompt)
+        key = (agent, normalized)
+        now = time.time()
+        with self._lock:
+            self._lookups += 1
+            entry = self._live(key, now)
+            tier = "exact"
+            if entry is None and similar and self.similarity > 0:
+                entry, tier = self._similar(agent, normalized.split(), now), "similar"
+            if entry is None:
+                self._record(hit=False)
+                return None
+            self._entries.move_to_end(entry.key)
+            self._hits += 1
+            self._record(hit=True, tier=tier, agent=agent, latency=entry.latency)
+            value = entry.value
+        return json.loads(value)
+
+    def put(self, agent: str, prompt: str, value, latency: float = 0.0, similar: bool = False):
+        ttl = self.ttl_for(agent)
+        if ttl <= 0:
+            return
+        normalized = normalize_prompt(prompt)
+        key = (agent, normalized)
+        encoded = json.dumps(value)
+        nbytes = len(encoded) + len(normalized) + 64
+        if nbytes > self.max_bytes:
+            return
+        signature = guard = None
+        if similar and self.similarity > 0:
+            words = normalized.split()
+            signature, guard = self._hasher.signature(words), self._guard(words)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry = _Entry(key, agent, encoded, nbytes, time.time() + ttl, latency, signature, guard)
+            self._entries[key] = entry
+            self._bytes += nbytes
+            if signature is not None:
+                for band in self._bands(agent, signature):
+                    self._buckets.setdefault(band, set()).add(key)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                metrics.incr("response_cache_evictions_total")
+            self._publish_gauges()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._bytes = 0
+            self._publish_gauges()
+
+    # ------------------------------------------------------------------
+    # Internals (called with the lock held)
+    # ------------------------------------------------------------------
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            self._remove(key)
+            return None
+        return entry
+
+    def _similar(self, agent, words, now):
+        signature = self._hasher.signature(words)
+        guard = self._guard(words)
+        candidates = set()
+        for band in self._bands(agent, signature):
+            candidates |= self._buckets.get(band, set())
+        best, best_score = None, self.similarity
+        for key in candidates:
+            entry = self._live(key, now)
+            if entry is None or entry.guard != guard:
+                continue
+            score = MinHasher.similarity(signature, entry.signature)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _bands(self, agent, signature):
+        rows = self._rows
+        return [(agent, i, signature[i * rows:(i + 1) * rows]) for i in range(self.bands)]
+
+    @staticmethod
+    def _guard(words):
+        """Words a near match must agree on exactly: negations and numbers."""
+        return frozenset(w for w in words if w in _GUARD_WORDS or any(c.isdigit() for c in w))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+        if entry.signature is not None:
+            for band in self._bands(entry.agent, entry.signature):
+                members = self._buckets.get(band)
+                if members is not None:
+                    members.discard(key)
+                    if not members:
+                        del self._buckets[band]
+
+    def _record(self, hit: bool, tier: str = None, agent: str = None, latency: float = 0.0):
+        if hit:
+            metrics.incr("response_cache_hits_total")
+            metrics.incr(f"response_cache_{tier}_hits_total")
+            metrics.incr(f"response_cache_{agent}_hits_total")
+            metrics.incr("response_cache_saved_seconds_total", latency)
+        else:
+            metrics.incr("response_cache_misses_total")
+        metrics.set_gauge("response_cache_hit_rate", round(self._hits / self._lookups, 4))
+
+    def _publish_gauges(self):
+        metrics.set_gauge("response_cache_entries", len(self._entries))
+        metrics.set_gauge("response_cache_bytes", self._bytes)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide cache, configured from RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_SIMILARITY and RESPONSE_CACHE_TTL_<AGENT> (0 disables an agent).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttls = {
+                    agent: float(os.getenv(f"RESPONSE_CACHE_TTL_{agent.upper()}", ttl))
+                    for agent, ttl in DEFAULT_TTLS.items()
+                }
+                _cache = ResponseCache(
+                    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+                    similarity=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0")),
+                    ttls=ttls,
+                )
+    return _cache
+
+
+def set_response_cache(cache: ResponseCache):
+    global _cache
+    _cache = cache
+
+
+def cached_response(agent: str, key, accept=None, similar: bool = False):
+    """
+    Caches an agent method's result under the prompt returned by `key`
+    (called with the method's arguments; returning None bypasses the cache).
+    `accept` can veto caching a result, e.g. a parse failure. Place it above
+    retry_with_backoff so hits skip the rate limiter too.
+    """
+    if agent in NEVER_CACHE:
+        raise ValueError(f"{agent} responses must not be cached")
+
+    def decorator(func):
+        def lookup(args, kwargs):
+            cache = get_response_cache()
+            if cache.ttl_for(agent) <= 0:
+                return cache, None, None
+            prompt = key(*args, **kwargs)
+            if prompt is None:
+                return cache, None, None
+            return cache, prompt, cache.get(agent, prompt, similar=similar)
+
+        def store(cache, prompt, result, start):
+            if prompt is not None and (accept is None or accept(result)):
+                cache.put(agent, prompt, result, latency=time.perf_counter() - start, similar=similar)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache, prompt, hit = lookup(args, kwargs)
+                if hit is not None:
+                    return hit
+                start = time.perf_counter()
+                result = await func(*args, **kwargs)
+                store(cache, prompt, result, start)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache, prompt, hit = lookup(args, kwargs)
+            if hit is not None:
+                return hit
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            store(cache, prompt, result, start)
+            return result
+        return wrapper
+    return decorator
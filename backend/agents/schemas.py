@@ -0,0 +1,281 @@
+"""
+Response schemas for the agents' structured outputs.
+
+Each schema is written once in the subset of OpenAPI that Gemini's
+`response_schema` accepts (type, properties, required, items, enum,
+nullable), plus local-only bounds (minimum, maximum) that are checked here
+but stripped before the schema is sent to the model. A schema is compiled
+into a validator on import, so checking a response is a handful of
+isinstance calls rather than a walk over the schema.
+
+Tool-free calls pass `generation_config` so the model is constrained to the
+schema. Calls with tools cannot use JSON mode, so their answers are checked
+against the same schema and, if they do not fit, repaired once by asking the
+(tool-free, schema-constrained) model to reformat them. Per schema:
+
+    structured_<name>_total                  responses parsed
+    structured_<name>_invalid_total          responses that did not fit the schema
+    structured_<name>_repairs_total          extra model round trips spent repairing
+    structured_<name>_repair_failures_total  repairs that failed too (fallback used)
+
+Decoding uses orjson when it is installed and the stdlib decoder otherwise.
+"""
+import json
+import time
+from typing import Any, Callable
+
+import metrics
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+_DECODER = json.JSONDecoder()
+_LOCAL_KEYWORDS = ("minimum", "maximum")
+
+
+class SchemaError(ValueError):
+    """A model response that is not JSON or does not match its schema."""
+
+
+def decode(text: str) -> Any:
+    """
+    Decodes a JSON answer, also when the model wrapped it in a ```json fence
+    or a sentence: decoding then starts at the first bracket and stops at
+    the end of that value.
+    """
+    text = text.strip()
+    try:
+        return _loads(text)
+    except ValueError:
+        pass
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise SchemaError("response is not JSON")
+    try:
+        return _DECODER.raw_decode(text, min(starts))[0]
+    except ValueError as e:
+        raise SchemaError(f"response is not JSON: {e}") from None
+
+
+def _compile(schema: dict, path: str) -> Callable[[Any], Any]:
+    """Validator for `schema`: returns the value (numbers coerced) or raises SchemaError."""
+    kind = schema.get("type")
+    nullable = schema.get("nullable", False)
+    enum = frozenset(schema["enum"]) if "enum" in schema else None
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+
+    if kind == "object":
+        properties = [(key, _compile(sub, f"{path}.{key}")) for key, sub in schema.get("properties", {}).items()]
+        required = tuple(schema.get("required", ()))
+
+        def check(value):
+            if not isinstance(value, dict):
+                raise SchemaError(f"{path}: expected an object")
+            for key in required:
+                if key not in value:
+                    raise SchemaError(f"{path}.{key}: required")
+            for key, validate in properties:
+                if key in value:
+                    value[key] = validate(value[key])
+            return value
+    elif kind == "array":
+        validate_item = _compile(schema.get("items", {}), f"{path}[]")
+
+        def check(value):
+            if not isinstance(value, list):
+                raise SchemaError(f"{path}: expected an array")
+            return [validate_item(item) for item in value]
+    elif kind in ("integer", "number"):
+        def check(value):
+            if isinstance(value, str):
+                try:
+                    value = float(value.strip())
+                except ValueError:
+                    raise SchemaError(f"{path}: expected a {kind}") from None
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise SchemaError(f"{path}: expected a {kind}")
+            if kind == "integer":
+                if value != int(value):
+                    raise SchemaError(f"{path}: expected an integer")
+                value = int(value)
+            if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                raise SchemaError(f"{path}: {value} is out of range")
+            return value
+    elif kind == "boolean":
+        def check(value):
+            if not isinstance(value, bool):
+                raise SchemaError(f"{path}: expected a boolean")
+            return value
+    elif kind == "string":
+        def check(value):
+            if not isinstance(value, str):
+                raise SchemaError(f"{path}: expected a string")
+            if enum is not None and value not in enum:
+                raise SchemaError(f"{path}: {value!r} is not one of {sorted(enum)}")
+            return value
+    else:
+        def check(value):
+            return value
+
+    if not nullable:
+        def validate(value):
+            if value is None:
+                raise SchemaError(f"{path}: must not be null")
+            return check(value)
+        return validate
+    return lambda value: None if value is None else check(value)
+
+
+def _model_schema(schema: dict) -> dict:
+    """The schema without the keywords Gemini's response_schema does not accept."""
+    model = {key: value for key, value in schema.items() if key not in _LOCAL_KEYWORDS}
+    if "properties" in model:
+        model["properties"] = {key: _model_schema(sub) for key, sub in model["properties"].items()}
+    if "items" in model:
+        model["items"] = _model_schema(model["items"])
+    return model
+
+
+class ResponseSchema:
+    def __init__(self, name: str, schema: dict):
+        self.name = name
+        self.schema = schema
+        self.validate = _compile(schema, "$")
+        self.model_schema = _model_schema(schema)
+        self.generation_config = {"response_mime_type": "application/json", "response_schema": self.model_schema}
+
+    def parse(self, text: str) -> Any:
+        return self.validate(decode(text))
+
+    def repair_prompt(self, text: str, error: SchemaError) -> str:
+        return (
+            "The response below does not match the required JSON schema "
+            f"({error}). Return only the corrected JSON, keeping its meaning.\n\n"
+            f"Schema: {json.dumps(self.model_schema)}\n\n"
+            f"Response: {text}"
+        )
+
+
+def response_text(response) -> str:
+    try:
+        return response.text
+    except (AttributeError, ValueError):
+        # A response made only of a function call has no text
+        return ""
+
+
+def _first_pass(schema: ResponseSchema, response):
+    metrics.incr(f"structured_{schema.name}_total")
+    text = response_text(response)
+    try:
+        return schema.parse(text), None, text
+    except SchemaError as e:
+        metrics.incr(f"structured_{schema.name}_invalid_total")
+        return None, e, text
+
+
+def _repaired(schema: ResponseSchema, repair, text: str, fallback: Callable[[str], Any]):
+    try:
+        return schema.parse(response_text(repair))
+    except SchemaError as e:
+        metrics.incr(f"structured_{schema.name}_repair_failures_total")
+        print(f"[WARN] {schema.name} response still invalid after repair ({e}); using fallback")
+        return fallback(text)
+
+
+def parse_response(schema: ResponseSchema, response, repair_model, fallback: Callable[[str], Any]) -> Any:
+    """
+    The response's value under `schema`. An invalid one gets one repair
+    request to `repair_model` (a tool-free model); `fallback(text)` is
+    returned if that fails as well.
+    """
+    value, error, text = _first_pass(schema, response)
+    if error is None:
+        return value
+    metrics.incr(f"structured_{schema.name}_repairs_total")
+    start = time.perf_counter()
+    try:
+        repair = repair_model.generate_content(schema.repair_prompt(text, error), generation_config=schema.generation_config)
+    except Exception as e:
+        print(f"[WARN] {schema.name} repair request failed: {e}")
+        metrics.incr(f"structured_{schema.name}_repair_failures_total")
+        return fallback(text)
+    finally:
+        metrics.observe("structured_repair_seconds", time.perf_counter() - start)
+    return _repaired(schema, repair, text, fallback)
+
+
+async def parse_response_async(schema: ResponseSchema, response, repair_model, fallback: Callable[[str], Any]) -> Any:
+    """Non-blocking variant of parse_response()."""
+    value, error, text = _first_pass(schema, response)
+    if error is None:
+        return value
+    metrics.incr(f"structured_{schema.name}_repairs_total")
+    start = time.perf_counter()
+    try:
+        repair = await repair_model.generate_content_async(schema.repair_prompt(text, error), generation_config=schema.generation_config)
+    except Exception as e:
+        print(f"[WARN] {schema.name} repair request failed: {e}")
+        metrics.incr(f"structured_{schema.name}_repair_failures_total")
+        return fallback(text)
+    finally:
+        metrics.observe("structured_repair_seconds", time.perf_counter() - start)
+    return _repaired(schema, repair, text, fallback)
+
+
+_TRIAGE_FIELDS = {
+    "accident_type": {"type": "string"},
+    "severity": {"type": "integer", "minimum": 1, "maximum": 5},
+    "dispatch_ambulance": {"type": "boolean"},
+    "reasoning": {"type": "string"},
+}
+
+TRIAGE = ResponseSchema("triage", {
+    "type": "object",
+    "properties": _TRIAGE_FIELDS,
+    "required": ["accident_type", "severity", "dispatch_ambulance"],
+})
+
+# One entry of a packed triage answer; entries are checked one by one so a
+# garbled entry only costs that utterance a retry
+TRIAGE_ENTRY = ResponseSchema("triage_entry", {
+    "type": "object",
+    "properties": dict(_TRIAGE_FIELDS, id={"type": "integer", "minimum": 0}),
+    "required": ["id", "accident_type", "severity", "dispatch_ambulance"],
+})
+
+TRIAGE_BATCH = ResponseSchema("triage_batch", {"type": "array", "items": TRIAGE_ENTRY.schema})
+
+LOCATION = ResponseSchema("location", {
+    "type": "object",
+    "nullable": True,  # no location in the caller's words
+    "properties": {
+        "address": {"type": "string"},
+        "lat": {"type": "number", "nullable": True, "minimum": -90, "maximum": 90},
+        "lon": {"type": "number", "nullable": True, "minimum": -180, "maximum": 180},
+    },
+    "required": ["address"],
+})
+
+DISPATCH = ResponseSchema("dispatch", {
+    "type": "object",
+    "properties": {
+        "eta": {"type": "integer", "nullable": True, "minimum": 0},
+        "dispatch_id": {"type": "string", "nullable": True},
+        "unit_id": {"type": "string", "nullable": True},
+    },
+    "required": ["eta", "dispatch_id"],
+})
+
+FIRST_AID = ResponseSchema("first_aid", {
+    "type": "object",
+    "properties": {
+        "instruction": {"type": "string"},
+        "next_step_index": {"type": "integer", "minimum": 0},
+        "completed": {"type": "boolean"},
+    },
+    "required": ["instruction", "next_step_index", "completed"],
+})
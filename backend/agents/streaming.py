@@ -0,0 +1,65 @@
+"""
+Helpers for streaming agent output to the caller as it is generated.
+"""
+import re
+
+# Sentence end: terminal punctuation (optionally closed by a quote or
+# bracket) followed by whitespace, or a line break
+_BOUNDARY = re.compile(r"""[.!?]+["')\]]*\s+|\n+""")
+_SOFT_BOUNDARY = re.compile(r"[,;:]\s+")
+
+
+class SentenceChunker:
+    """
+    Turns a stream of model tokens into speakable chunks.
+
+    Text is released a sentence at a time so speech synthesis gets whole
+    phrases with natural prosody. Very short fragments ("1.", "Dr.") are
+    held until more text arrives, and run-on text is split at a comma or
+    space once it passes `max_chars` so the first words are never held
+    back for long.
+    """
+
+    def __init__(self, min_chars: int = 8, max_chars: int = 160):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        """Adds streamed text; returns the chunks that are now complete."""
+        self._buffer += text
+        chunks = []
+        while True:
+            chunk = self._take_sentence() or self._take_overflow()
+            if chunk is None:
+                return chunks
+            chunks.append(chunk)
+
+    def flush(self) -> list:
+        """Returns whatever is left once the stream has ended."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+    def _take_sentence(self):
+        for match in _BOUNDARY.finditer(self._buffer):
+            if len(self._buffer[:match.start()].strip()) >= self.min_chars:
+                return self._cut(match.end())
+        return None
+
+    def _take_overflow(self):
+        if len(self._buffer) <= self.max_chars:
+            return None
+        window = self._buffer[:self.max_chars]
+        soft = [m.end() for m in _SOFT_BOUNDARY.finditer(window)]
+        cut = soft[-1] if soft else window.rfind(" ") + 1
+        return self._cut(cut if cut > self.min_chars else self.max_chars)
+
+    def _cut(self, position: int) -> str:
+        chunk, self._buffer = self._buffer[:position].strip(), self._buffer[position:]
+        return chunk
+
+
+def split_sentences(text: str) -> list:
+    """Chunks an already complete response the same way as a streamed one."""
+    chunker = SentenceChunker()
+    return chunker.feed(text) + chunker.flush()
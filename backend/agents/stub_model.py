@@ -0,0 +1,262 @@
+"""
+Deterministic offline stand-in for the Gemini models.
+
+Implements the slice of the GenerativeModel / ChatSession API the agents use
+(generate_content, start_chat, send_message, streaming, function calls), so
+the whole orchestration layer runs without an API key or quota. Each prompt,
+after the model's system instruction, is answered by the first canned
+response whose `match` regex finds it:
+
+    {"match": "Triage Agent", "text": "{\"accident_type\": \"burns\", ...}"}
+    {"match": "Ambulance Dispatch Agent",
+     "function_call": {"name": "dispatch_ambulance", "args": {"location": "x", "injury": "y"}},
+     "text": "{\"eta\": 7, \"dispatch_id\": \"D-1\"}"}
+
+A response with a function_call answers the first message with the call and
+the function-response message with `text`. Prompts no canned response
+matches get a built-in answer per agent (triage from the rule engine, the
+real geocoding and dispatch tools called with the caller's words, numbered
+first-aid steps). Every call can wait a configurable latency (plus jitter) and fail
+with an injected retryable error at a configurable rate.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from google.api_core import exceptions
+
+from agents.triage_rules import get_rules
+from tools.gazetteer import get_gazetteer
+
+_PACKED_LINE = re.compile(r"^(\d+)\. (\".*\")$", re.MULTILINE)
+_STEP_INDEX = re.compile(r"Current step index: (\d+)")
+_FIELD = re.compile(r"^\s*(Injury type|Location): (.*)$", re.MULTILINE)
+_DEFAULT_FIX = (17.3850, 78.4867)
+STUB_PROTOCOL_STEPS = 5
+INJECTED_ERRORS = {
+    "unavailable": exceptions.ServiceUnavailable,
+    "quota": exceptions.ResourceExhausted,
+}
+
+
+class StubFunctionCall:
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+
+class StubPart:
+    def __init__(self, text: str = "", function_call: StubFunctionCall = None):
+        self.text = text
+        self.function_call = function_call
+
+
+class StubResponse:
+    def __init__(self, text: str = "", function_call: StubFunctionCall = None):
+        self.text = text
+        self.parts = [StubPart(text, function_call)]
+
+
+class StubModel:
+    def __init__(self, backend, model_name: str, tools: list = None, system_instruction: str = None):
+        self.backend = backend
+        self.model_name = model_name
+        self.tools = {getattr(tool, "__name__", repr(tool)) for tool in tools or ()}
+        self.system_instruction = system_instruction
+
+    def generate_content(self, contents, generation_config=None, **kwargs):
+        self.backend.wait()
+        return self.backend.respond(self, contents)
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        await self.backend.wait_async()
+        return self.backend.respond(self, contents)
+
+    def start_chat(self, history=None):
+        return StubChat(self, history)
+
+
+class StubChat:
+    def __init__(self, model: StubModel, history=None):
+        self.model = model
+        self.history = list(history or [])
+        self._pending_call = None
+
+    def send_message(self, content, stream=False, **kwargs):
+        self.model.backend.wait()
+        return self._reply(content)
+
+    async def send_message_async(self, content, stream=False, **kwargs):
+        await self.model.backend.wait_async()
+        response = self._reply(content)
+        if not stream:
+            return response
+        return self.model.backend.stream(response.text)
+
+    def _reply(self, content):
+        if self._pending_call is not None and not isinstance(content, str):
+            canned, self._pending_call = self._pending_call, None
+            return self.model.backend.after_call(canned, content)
+        response = self.model.backend.respond(self.model, content)
+        if response.parts[0].function_call:
+            self._pending_call = response
+        return response
+
+
+class StubBackend:
+    name = "stub"
+
+    def __init__(self, responses: list = None, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error: str = "unavailable", chunk_words: int = 4, seed: int = 0):
+        self.responses = [dict(r, pattern=re.compile(r["match"])) for r in responses or ()]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error = INJECTED_ERRORS[error]
+        self.chunk_words = chunk_words
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.rules = get_rules()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            return cls(responses=json.load(f), **kwargs)
+
+    def create(self, model_name: str, tools: list = None, system_instruction: str = None) -> StubModel:
+        return StubModel(self, model_name, tools, system_instruction)
+
+    async def warm_up(self, model: StubModel):
+        pass
+
+    # ------------------------------------------------------------------
+    # Latency and error injection
+    # ------------------------------------------------------------------
+    def _draw(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        return delay, failed
+
+    def wait(self):
+        delay, failed = self._draw()
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise self.error("stub model: injected error")
+
+    async def wait_async(self):
+        delay, failed = self._draw()
+        # A real model call always suspends, even when the stub adds no latency
+        await asyncio.sleep(delay)
+        if failed:
+            raise self.error("stub model: injected error")
+
+    async def stream(self, text: str):
+        words = text.split(" ")
+        for i in range(0, len(words), self.chunk_words):
+            piece = " ".join(words[i:i + self.chunk_words])
+            yield StubPart(piece + (" " if i + self.chunk_words < len(words) else ""))
+            await asyncio.sleep(0)
+
+    # ------------------------------------------------------------------
+    # Answers
+    # ------------------------------------------------------------------
+    def respond(self, model: StubModel, content) -> StubResponse:
+        prompt = content if isinstance(content, str) else json.dumps(content, default=str)
+        if model.system_instruction:
+            # The real model reads the system instruction ahead of every message
+            prompt = f"{model.system_instruction}\n\n{prompt}"
+        for canned in self.responses:
+            if canned["pattern"].search(prompt):
+                if "function_call" in canned:
+                    call = canned["function_call"]
+                    return StubResponse(function_call=StubFunctionCall(call["name"], dict(call.get("args", {}))))
+                return StubResponse(canned.get("text", ""))
+        return self._builtin(model, prompt)
+
+    def after_call(self, response: StubResponse, content) -> StubResponse:
+        """Answers the function-response message that follows a canned or built-in call."""
+        call = response.parts[0].function_call
+        canned = next((r for r in self.responses if r.get("function_call", {}).get("name") == call.name), None)
+        if canned is not None and "text" in canned:
+            return StubResponse(canned["text"])
+        result = _function_result(content)
+        if call.name == "reverse_geocode":
+            if "lat" not in result:
+                return StubResponse(json.dumps({"address": call.args["location_text"], "lat": None, "lon": None}))
+            address = result.get("display_name") or result.get("name") or call.args["location_text"]
+            return StubResponse(json.dumps({"address": address, "lat": float(result["lat"]), "lon": float(result["lon"])}))
+        return StubResponse(json.dumps({key: result.get(key) for key in ("eta", "dispatch_id", "unit_id")}))
+
+    def _builtin(self, model: StubModel, prompt: str) -> StubResponse:
+        if "Triage Agent" in prompt:
+            return StubResponse(self._triage(prompt))
+        if "Location Agent" in prompt:
+            if "reverse_geocode" in model.tools:
+                return StubResponse(function_call=StubFunctionCall("reverse_geocode", {"location_text": _user_input(prompt)}))
+            return StubResponse(self._location(prompt))
+        if "First Aid" in prompt:
+            return StubResponse(self._first_aid(prompt))
+        if "dispatch_ambulance" in model.tools:
+            fields = dict(_FIELD.findall(prompt))
+            args = {"location": fields.get("Location", "Unknown location"), "injury": fields.get("Injury type", "unknown")}
+            return StubResponse(function_call=StubFunctionCall("dispatch_ambulance", args))
+        if "Ambulance Dispatch Agent" in prompt:
+            return StubResponse("An ambulance is on its way to you now.")
+        return StubResponse("OK.")
+
+    def _triage(self, prompt: str) -> str:
+        if "\nMessages:\n" in prompt:
+            packed = prompt.split("\nMessages:\n", 1)[1]
+            return json.dumps([
+                dict(self._triage_one(json.loads(text)), id=int(index))
+                for index, text in _PACKED_LINE.findall(packed)
+            ])
+        return json.dumps(self._triage_one(_user_input(prompt)))
+
+    def _triage_one(self, user_input: str) -> dict:
+        result = self.rules.analyze(user_input)
+        if result is None:
+            return {"accident_type": "unknown", "severity": 1, "dispatch_ambulance": False, "reasoning": "stub"}
+        return {key: result[key] for key in ("accident_type", "severity", "dispatch_ambulance", "reasoning")}
+
+    @staticmethod
+    def _location(prompt: str) -> str:
+        user_input = _user_input(prompt)
+        gazetteer = get_gazetteer()
+        matches = gazetteer.search(user_input) if gazetteer is not None else []
+        if matches:
+            return json.dumps({"address": matches[0]["name"], "lat": matches[0]["lat"], "lon": matches[0]["lon"]})
+        return json.dumps({"address": user_input, "lat": _DEFAULT_FIX[0], "lon": _DEFAULT_FIX[1]})
+
+    @staticmethod
+    def _first_aid(prompt: str) -> str:
+        match = _STEP_INDEX.search(prompt)
+        step = int(match.group(1)) if match else 0
+        completed = step + 1 >= STUB_PROTOCOL_STEPS
+        instruction = f"Step {step + 1}: keep the person still and calm, and tell me if anything changes."
+        if "no JSON" in prompt:
+            return instruction + (" [COMPLETED]" if completed else "")
+        return json.dumps({"instruction": instruction, "next_step_index": step + 1, "completed": completed})
+
+
+def _user_input(prompt: str) -> str:
+    return prompt.rsplit("User Input: ", 1)[-1].strip()
+
+
+def _function_result(content) -> dict:
+    """The tool result inside a function-response message (a genai Content or plain dict)."""
+    try:
+        if isinstance(content, dict):
+            part = content["parts"][0]["function_response"]
+            return dict(part["response"].get("result") or {})
+        function_response = content.parts[0].function_response
+        return type(function_response).to_dict(function_response)["response"].get("result") or {}
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return {}
@@ -1,25 +1,87 @@
+import asyncio
+import os
+import re
+import time
 from typing import Dict, Any
-from agents.triage_agent import TriageAgent
-from agents.location_agent import LocationAgent
-from agents.ambulance_agent import AmbulanceAgent
-from agents.ambulance_agent import AmbulanceAgent
-from agents.first_aid_agent import FirstAidAgent
+from agents import registry
+from agents.first_aid_protocols import get_protocols
+from agents.model_backend import get_backend
+from agents.prefetch import StepPrefetcher
+from agents.registry import LazyAgent
+from agents.streaming import SentenceChunker, split_sentences
+from agents.triage_rules import get_rules
+import metrics
+import tracing
+from memory import journal
+from memory.history import ConversationHistory
+from memory.session_lock import SessionCoordinator
 from memory.session_service import InMemorySessionService
 
+# Street addresses ("123 Main St"), coordinates, or a preposition followed by a named place
+_LOCATION_HINT = re.compile(
+    r"\b\d+\s+(?:[A-Za-z]+\s+){1,3}(?i:st|street|ave|avenue|rd|road|blvd|boulevard|ln|lane|dr|drive|way|ct|court|pl|place|hwy|highway)\b"
+    r"|-?\d{1,3}\.\d+\s*,\s*-?\d{1,3}\.\d+"
+    r"|\b(?i:at|near|outside|opposite|in front of|next to|corner of)\s+(?:the\s+)?(?:\d+|[A-Z][a-z]+)"
+)
+# What the caller is assumed to say when the next first-aid step is prefetched
+PREFETCH_INPUT = "Done. What next?"
+
 class SupervisorAgent:
     """
     The Supervisor Agent orchestrates the entire emergency workflow.
     It routes user messages to specialized agents based on intent + context.
     """
 
+    # Agents are stateless and shared process-wide; session state lives in the
+    # store. Each is built on first use, so a worker starts without any models.
+    triage_agent = LazyAgent("agents.triage_agent", "TriageAgent")
+    first_aid_agent = LazyAgent("agents.first_aid_agent", "FirstAidAgent")
+    location_agent = LazyAgent("agents.location_agent", "LocationAgent")
+    ambulance_agent = LazyAgent("agents.ambulance_agent", "AmbulanceAgent")
+
     def __init__(self):
-        self.triage_agent = TriageAgent()
-        self.first_aid_agent = FirstAidAgent()
-        self.location_agent = LocationAgent()
-        self.ambulance_agent = AmbulanceAgent()
-        
-        # Internal state storage (session-specific)
-        self.state = {
+        self.coordinator = SessionCoordinator(
+            window_seconds=float(os.getenv("COALESCE_WINDOW_SECONDS", "2"))
+        )
+        self.triage_rules = get_rules()
+        self.protocols = get_protocols()
+        self.rules_accept_confidence = float(os.getenv("TRIAGE_RULES_ACCEPT", "0.85"))
+        self.rules_min_confidence = float(os.getenv("TRIAGE_RULES_MIN", "0.6"))
+        # "direct" calls the dispatch tool itself; "llm" lets the ambulance agent drive it
+        self.dispatch_mode = os.getenv("DISPATCH_MODE", "direct").lower()
+        # Direct dispatches can have the LLM re-word the confirmation in the background
+        self.dispatch_phrasing = os.getenv("DISPATCH_LLM_PHRASING", "false").lower() == "true"
+        self.history = ConversationHistory(
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "600")),
+            summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "200")),
+        )
+        # Model-generated first-aid steps are generated one step ahead while the caller works
+        self.prefetch_enabled = os.getenv("FIRST_AID_PREFETCH", "true").lower() == "true"
+        self.prefetch = StepPrefetcher(ttl_seconds=float(os.getenv("FIRST_AID_PREFETCH_TTL_SECONDS", "120")))
+        self._background_tasks = set()
+
+    async def warm_up(self):
+        """
+        Builds every agent and opens the model connections before the first
+        caller needs them. Construction (including the SDK import) runs in a
+        worker thread so requests keep being served meanwhile.
+        """
+        start = time.perf_counter()
+        await asyncio.to_thread(lambda: (self.triage_agent, self.first_aid_agent, self.location_agent, self.ambulance_agent))
+        backend = get_backend()
+        results = await asyncio.gather(*(backend.warm_up(model) for model in registry.models()), return_exceptions=True)
+        for error in (r for r in results if isinstance(r, Exception)):
+            print(f"[WARN] Model warm-up failed: {error}")
+        metrics.observe("warmup_seconds", time.perf_counter() - start)
+        print(f"[DEBUG] Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def new_state() -> Dict[str, Any]:
+        """
+        Fresh per-session state. The supervisor itself holds none; this is
+        written to the session store when a session is created.
+        """
+        return {
             "incident_started": False,
             "severity": None,
             "injury_type": None,
@@ -34,70 +96,171 @@ class SupervisorAgent:
         """
         Public entry point for FastAPI.
         Loads the session state, runs handle_message(), and saves updated state.
+        Messages for one session are serialized, and duplicate in-flight
+        messages share a single result.
         """
         try:
-            print(f"[DEBUG] Processing message for session {session_id}: {user_input}")
-            state = InMemorySessionService.get_state(session_id)
-            print(f"[DEBUG] Loaded state: {state}")
-
-            result = await self.handle_message(user_input, state)
-            print(f"[DEBUG] Result: {result}")
-
-            InMemorySessionService.update_state(session_id, result["state"])
-
-            return result["response"]
+            return await self.coordinator.run(
+                session_id, user_input, lambda: self._process_locked(user_input, session_id)
+            )
         except Exception as e:
             print(f"[ERROR] Exception in process_message: {e}")
             import traceback
             traceback.print_exc()
             return f"Error processing message: {str(e)}"
 
+    async def _process_locked(self, user_input: str, session_id: str) -> str:
+        with tracing.span("message", session_id=session_id) as span:
+            state = InMemorySessionService.get_state(session_id)
+            before = dict(state)
+            result = await self.handle_message(user_input, state, session_id=session_id)
+
+            self.history.record(result["state"], user_input, result["response"])
+            InMemorySessionService.update_state(session_id, result["state"])
+            journal.record_changes(session_id, before, result["state"])
+            self._annotate_turn(span, result["state"])
+
+        return result["response"]
+
+    async def _traced_turn(self, user_input: str, state: Dict[str, Any], session_id: str, stream: asyncio.Queue):
+        with tracing.span("message", session_id=session_id, streaming=True) as span:
+            result = await self.handle_message(user_input, state, session_id=session_id, stream=stream)
+            self._annotate_turn(span, result["state"])
+            return result
+
+    @staticmethod
+    def _annotate_turn(span, state: Dict[str, Any]):
+        span.set(
+            severity=state.get("severity"),
+            injury_type=state.get("injury_type"),
+            step_index=state.get("step_index"),
+            ambulance_dispatched=state.get("ambulance_dispatched", False),
+        )
+
+    async def stream_message(self, user_input: str, session_id: str):
+        """
+        Streaming counterpart of process_message(). Yields (event, data) pairs:
+        state transitions ("triage", "location", "dispatch") as soon as the
+        turn has made them, speakable "chunk"s of the reply as they are
+        generated, and a final "done" with the full text.
+        """
+        start = time.perf_counter()
+        first_chunk = True
+
+        def timed(chunk):
+            nonlocal first_chunk
+            if first_chunk:
+                first_chunk = False
+                metrics.observe("stream_first_chunk_seconds", time.perf_counter() - start)
+            return "chunk", {"text": chunk}
+
+        async with self.coordinator.lock(session_id):
+            state = InMemorySessionService.get_state(session_id)
+            before = dict(state)
+            deltas = asyncio.Queue()
+            task = asyncio.ensure_future(self._traced_turn(user_input, state, session_id, deltas))
+            task.add_done_callback(lambda _: deltas.put_nowait(None))
+            try:
+                chunker, streamed = SentenceChunker(), ""
+                while (delta := await deltas.get()) is not None:
+                    streamed += delta
+                    for chunk in chunker.feed(delta):
+                        yield timed(chunk)
+
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"[ERROR] Exception in stream_message: {e}")
+                    yield "error", {"text": f"Error processing message: {str(e)}"}
+                    return
+
+                self.history.record(result["state"], user_input, result["response"])
+                InMemorySessionService.update_state(session_id, result["state"])
+                journal.record_changes(session_id, before, result["state"])
+
+                for event, data in self._transitions(before, result["state"]):
+                    yield event, data
+                # Whatever was not streamed token by token (non-first-aid stages,
+                # or text appended after the stream) goes out sentence by sentence
+                rest = result["response"][len(streamed):] if result["response"].startswith(streamed) else result["response"]
+                for chunk in chunker.flush() + split_sentences(rest):
+                    yield timed(chunk)
+                yield "done", {"text": result["response"]}
+            finally:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _transitions(before: Dict[str, Any], after: Dict[str, Any]):
+        """State changes made by one turn, as stream events."""
+        if after.get("severity") is not None and after.get("severity") != before.get("severity"):
+            yield "triage", {"severity": after["severity"], "injury_type": after.get("injury_type")}
+        if after.get("location") and after.get("location") != before.get("location"):
+            yield "location", {"address": after["location"].get("address")}
+        if after.get("ambulance_dispatched") and not before.get("ambulance_dispatched"):
+            yield "dispatch", {
+                "dispatch_id": after.get("dispatch_id"),
+                "unit_id": after.get("dispatch_unit"),
+                "eta": after.get("dispatch_eta"),
+            }
+
     # --------------------------------------------------------
     # MAIN ENTRY POINT
     # --------------------------------------------------------
-    async def handle_message(self, user_input: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_message(self, user_input: str, state: Dict[str, Any], session_id: str = None, stream: asyncio.Queue = None) -> Dict[str, Any]:
         """
         Main orchestrator.
         Takes user input + session state → decides which agent to call.
         Returns: { "response": "...", "state": updated_state }
+        If `stream` is given, first-aid text is also pushed to it as it is generated.
         """
 
-        intent = self._detect_intent(user_input)
+        with tracing.span("intent"):
+            intent = self._detect_intent(user_input)
+
+        if session_id is not None and not self.protocols.is_progress(user_input):
+            # Anything but a plain "done, next" may change the situation (a question,
+            # new symptoms, re-triage), so a step prefetched before it is stale
+            self.prefetch.discard(session_id)
 
         # If no accident has started yet
         if not state.get("incident_started", False):
-            return await self._start_incident(user_input, state)
+            # Callers often describe the injury in their first sentence; triage it right away
+            if self.triage_rules.analyze(user_input) is None:
+                return await self._start_incident(user_input, state)
+            self._mark_incident_started(state)
 
-        # Check for severe injury keywords that should trigger re-triage
-        severe_keywords = ["skull", "fracture", "unconscious", "not breathing", "severe bleeding", 
-                          "chest pain", "heart attack", "stroke", "broken bone", "head injury"]
-        should_retriage = any(keyword in user_input.lower() for keyword in severe_keywords)
+        # Check for severe findings (non-negated) that should trigger re-triage
+        should_retriage = self.triage_rules.has_severe_finding(user_input)
         
         # If injury severity is not known yet OR severe keywords detected → (re)triage
         if state.get("severity") is None or (should_retriage and state.get("severity", 0) < 3):
-            return await self._run_triage(user_input, state)
+            # Injury and address in one message → triage and locate concurrently
+            if not state.get("location") and self._looks_like_location(user_input):
+                return await self._run_triage_with_location(user_input, state, session_id)
+            return await self._run_triage(user_input, state, session_id)
 
         # If severity high but not dispatched → dispatch ambulance
         if state.get("severity", 0) >= 3 and not state.get("ambulance_dispatched", False):
             # Check if we have location
             if not state.get("location"):
-                 return await self._run_location_agent(user_input, state)
-            return await self._run_ambulance_dispatch(state)
+                 return await self._run_location_agent(user_input, state, session_id)
+            return await self._run_ambulance_dispatch(state, session_id)
 
         # If no location yet (and not already handled above)
         # Note: Logic slightly adjusted to ensure location is asked if needed for dispatch OR general record
         if not state.get("location") and state.get("severity", 0) >= 3:
-             return await self._run_location_agent(user_input, state)
+             return await self._run_location_agent(user_input, state, session_id)
 
         # If we have injury + location (or low severity) → first aid steps
-        return await self._run_first_aid(user_input, state)
+        return await self._run_first_aid(user_input, state, stream, session_id)
 
 
     # --------------------------------------------------------
     # STAGE 1 — Start Incident
     # --------------------------------------------------------
     async def _start_incident(self, user_input: str, state: Dict[str, Any]):
-        state["incident_started"] = True
+        self._mark_incident_started(state)
         return {
             "response": "I understand. I’m here to help. Can you describe what happened?",
             "state": state,
@@ -106,54 +269,206 @@ class SupervisorAgent:
     # --------------------------------------------------------
     # STAGE 2 — TRIAGE (Assess Injury Severity)
     # --------------------------------------------------------
-    async def _run_triage(self, user_input: str, state: Dict[str, Any]):
-        # Note: calling sync method from async function
-        triage_result = self.triage_agent.analyze(user_input)
+    async def _run_triage(self, user_input: str, state: Dict[str, Any], session_id: str = None):
+        triage_result = await self._triage(user_input, session_id)
+        response = self._apply_triage(triage_result, state)
+
+        if state["severity"] >= 3:
+            response += " This is serious. I may need to dispatch an ambulance."
+            # Prompt for location immediately if serious
+            if not state.get("location"):
+                response += " Please provide your current location."
+
+        return { "response": response, "state": state }
+
+    async def _run_triage_with_location(self, user_input: str, state: Dict[str, Any], session_id: str = None):
+        """
+        Speculative path: triage and location extraction run concurrently, and a
+        serious incident with a resolved address is dispatched in the same turn.
+        """
+        metrics.incr("speculative_triage_location_total")
+        triage_result, loc = await asyncio.gather(
+            self._triage(user_input, session_id),
+            self._extract_location(user_input, state),
+            return_exceptions=True,
+        )
+        if isinstance(triage_result, BaseException):
+            raise triage_result
+        response = self._apply_triage(triage_result, state)
 
+        if isinstance(loc, BaseException):
+            print(f"[WARN] Speculative location extraction failed: {loc}")
+            loc = None
+        if loc and loc.get("address"):
+            state["location"] = loc
+            response += f" I have your location: {loc['address']}."
+
+        if state["severity"] >= 3:
+            if state.get("location"):
+                response += " This is serious. " + await self._dispatch(state, session_id)
+            else:
+                response += " This is serious. I need to dispatch an ambulance. Please provide your current location."
+        elif state.get("location"):
+            response += " Now let's focus on first aid."
+
+        return { "response": response, "state": state }
+
+    def _apply_triage(self, triage_result: Dict[str, Any], state: Dict[str, Any]) -> str:
         state["severity"] = triage_result["severity"]
         # Map accident_type to injury_type
         state["injury_type"] = triage_result.get("accident_type", "unknown")
 
-        response = (
+        return (
             f"Thanks. Based on your description, this seems like a {state['injury_type']} injury "
             f"with severity level {state['severity']}."
         )
 
-        if state["severity"] >= 3:
-            response += " This is serious. I may need to dispatch an ambulance."
-            # Prompt for location immediately if serious
-            if not state.get("location"):
-                response += " Please provide your current location."
+    async def _triage(self, user_input: str, session_id: str = None) -> Dict[str, Any]:
+        with tracing.span("triage") as span:
+            result = await self._triage_untraced(user_input, session_id)
+            span.set(source=result.get("source", "llm"), severity=result.get("severity"))
+            return result
 
-        return { "response": response, "state": state }
+    async def _triage_untraced(self, user_input: str, session_id: str = None) -> Dict[str, Any]:
+        """
+        Rule engine first. Confident matches skip the LLM entirely; plausible
+        matches answer now and are refined by the LLM in the background; the
+        rest wait for the LLM (falling back to the rules if the LLM fails).
+        """
+        rules_result = self.triage_rules.analyze(user_input)
+        confidence = rules_result["confidence"] if rules_result else 0.0
+
+        if confidence >= self.rules_accept_confidence:
+            metrics.incr("triage_rules_accepted_total")
+            return rules_result
+
+        if confidence >= self.rules_min_confidence:
+            metrics.incr("triage_rules_provisional_total")
+            if session_id is not None:
+                self._spawn(self._refine_triage(user_input, session_id))
+            return rules_result
+
+        metrics.incr("triage_llm_total")
+        try:
+            return await self.triage_agent.analyze_async(user_input)
+        except Exception as e:
+            if rules_result is None:
+                raise
+            print(f"[WARN] Triage LLM failed ({e}); using rule-based result")
+            return rules_result
+
+    async def _refine_triage(self, user_input: str, session_id: str):
+        """
+        Background LLM check of a provisional rule-based triage. Only ever
+        raises severity: a refinement never cancels care already under way.
+        """
+        try:
+            llm_result = await self.triage_agent.analyze_async(user_input)
+        except Exception as e:
+            print(f"[WARN] Background triage refinement failed: {e}")
+            return
+
+        async with self.coordinator.lock(session_id):
+            state = InMemorySessionService.get_state(session_id)
+            if not state or state.get("severity") is None:
+                return
+            before = dict(state)
+            state["triage_refined"] = True
+            if llm_result.get("severity", 0) > state["severity"]:
+                metrics.incr("triage_refinement_upgrades_total")
+                state["severity"] = llm_result["severity"]
+                state["injury_type"] = llm_result.get("accident_type", state.get("injury_type"))
+            InMemorySessionService.update_state(session_id, state)
+            journal.record_changes(session_id, before, state)
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        # Keep a strong reference until the task finishes
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
 
     # --------------------------------------------------------
     # STAGE 3 — DISPATCH AMBULANCE
     # --------------------------------------------------------
-    async def _run_ambulance_dispatch(self, state: Dict[str, Any]):
-        print(f"[DEBUG] Dispatching ambulance for {state['injury_type']}")
-        location = state.get("location", {}).get("address", "Unknown location")
-        dispatch_result = self.ambulance_agent.dispatch(
-            injury_type=state["injury_type"],
-            location=location
-        )
-        print(f"[DEBUG] Dispatch result: {dispatch_result}")
+    async def _run_ambulance_dispatch(self, state: Dict[str, Any], session_id: str = None):
+        return {
+            "response": await self._dispatch(state, session_id),
+            "state": state,
+        }
+
+    async def _dispatch(self, state: Dict[str, Any], session_id: str = None) -> str:
+        with tracing.span("dispatch", mode=self.dispatch_mode, injury_type=state["injury_type"]) as span:
+            response = await self._dispatch_untraced(state, session_id)
+            span.set(dispatch_id=state.get("dispatch_id"), unit_id=state.get("dispatch_unit"), eta=state.get("dispatch_eta"))
+            return response
+
+    async def _dispatch_untraced(self, state: Dict[str, Any], session_id: str = None) -> str:
+        """
+        Dispatches an ambulance for the session, records the result in state
+        and returns the confirmation sentence.
+        """
+        location = state.get("location") or {}
+        dispatch_args = {
+            "injury_type": state["injury_type"],
+            "location": location.get("address", "Unknown location"),
+            "lat": location.get("lat"),
+            "lon": location.get("lon"),
+        }
+        if self.dispatch_mode == "direct":
+            dispatch_result = self.ambulance_agent.dispatch_direct(**dispatch_args)
+        else:
+            dispatch_result = await self.ambulance_agent.dispatch_async(**dispatch_args, history=self.history.window(state))
+        metrics.incr(f"dispatch_{self.dispatch_mode}_total")
+
+        if dispatch_result.get("error"):
+            # Nothing was reserved; leave the flag clear so the next turn tries again
+            print(f"[WARN] Dispatch failed: {dispatch_result['error']}")
+            return "I could not assign an ambulance automatically. Please call your local emergency number now while I guide you."
 
         state["ambulance_dispatched"] = True
         state["dispatch_eta"] = dispatch_result.get("eta")
         state["dispatch_id"] = dispatch_result.get("dispatch_id")
+        state["dispatch_unit"] = dispatch_result.get("unit_id")
         state["dispatch_timestamp"] = dispatch_result.get("timestamp")
 
-        return {
-            "response": f"Ambulance dispatched (ID: {state['dispatch_id']}). Estimated arrival time is {state['dispatch_eta']} minutes. Now let's focus on first aid.",
-            "state": state,
-        }
+        if state.get("incident_started_at"):
+            state["time_to_dispatch"] = round(time.time() - state["incident_started_at"], 3)
+            metrics.observe("time_to_dispatch_seconds", state["time_to_dispatch"])
+
+        if self.dispatch_mode == "direct" and self.dispatch_phrasing and session_id is not None:
+            self._spawn(self._phrase_dispatch(dispatch_result, state["injury_type"], session_id))
+
+        return f"Ambulance dispatched (ID: {state['dispatch_id']}). Estimated arrival time is {state['dispatch_eta']} minutes. Now let's focus on first aid."
+
+    async def _phrase_dispatch(self, dispatch_result: Dict[str, Any], injury_type: str, session_id: str):
+        """
+        Background LLM wording of a direct dispatch confirmation, kept in the
+        session as `dispatch_confirmation` for clients that want to speak it.
+        """
+        try:
+            text = await self.ambulance_agent.phrase_confirmation_async(dispatch_result, injury_type)
+        except Exception as e:
+            print(f"[WARN] Dispatch confirmation phrasing failed: {e}")
+            return
+
+        async with self.coordinator.lock(session_id):
+            state = InMemorySessionService.get_state(session_id)
+            if state.get("dispatch_id") == dispatch_result.get("dispatch_id"):
+                state["dispatch_confirmation"] = text
+                InMemorySessionService.update_state(session_id, state)
 
     # --------------------------------------------------------
     # STAGE 4 — LOCATION HANDLING
     # --------------------------------------------------------
-    async def _run_location_agent(self, user_input: str, state: Dict[str, Any]):
-        loc = self.location_agent.extract_location(user_input)
+    async def _extract_location(self, user_input: str, state: Dict[str, Any]):
+        with tracing.span("location") as span:
+            loc = await self.location_agent.extract_location_async(user_input, history=self.history.window(state))
+            span.set(resolved=bool(loc) and loc.get("lat") is not None)
+            return loc
+
+    async def _run_location_agent(self, user_input: str, state: Dict[str, Any], session_id: str = None):
+        loc = await self._extract_location(user_input, state)
 
         if loc and loc.get("address"):
             state["location"] = loc
@@ -162,20 +477,7 @@ class SupervisorAgent:
             
             # If severity is high and ambulance not dispatched, dispatch NOW
             if state.get("severity", 0) >= 3 and not state.get("ambulance_dispatched"):
-                # Actually dispatch the ambulance
-                print(f"[DEBUG] Auto-dispatching ambulance after location provided")
-                dispatch_result = self.ambulance_agent.dispatch(
-                    injury_type=state["injury_type"],
-                    location=loc.get("address", "Unknown location")
-                )
-                print(f"[DEBUG] Dispatch result: {dispatch_result}")
-                
-                state["ambulance_dispatched"] = True
-                state["dispatch_eta"] = dispatch_result.get("eta")
-                state["dispatch_id"] = dispatch_result.get("dispatch_id")
-                state["dispatch_timestamp"] = dispatch_result.get("timestamp")
-                
-                response_text += f" Ambulance dispatched (ID: {state['dispatch_id']}). Estimated arrival time is {state['dispatch_eta']} minutes. Now let's focus on first aid."
+                response_text += " " + await self._dispatch(state, session_id)
             else:
                 response_text += " Now let's focus on first aid."
 
@@ -192,24 +494,73 @@ class SupervisorAgent:
     # --------------------------------------------------------
     # STAGE 5 — FIRST AID GUIDANCE
     # --------------------------------------------------------
-    async def _run_first_aid(self, user_input: str, state: Dict[str, Any]):
-        step_result = self.first_aid_agent.get_next_step(
-            injury_type=state["injury_type"],
-            step_index=state.get("step_index", 0),
-            user_input=user_input
-        )
+    async def _run_first_aid(self, user_input: str, state: Dict[str, Any], stream: asyncio.Queue = None, session_id: str = None):
+        step_args = {
+            "injury_type": state["injury_type"],
+            "step_index": state.get("step_index", 0),
+            "user_input": user_input,
+            "history": self.history.window(state),
+        }
+        with tracing.span("first_aid", step_index=step_args["step_index"], streaming=stream is not None) as span:
+            step_result = await self._prefetched_step(user_input, state, session_id)
+            span.set(prefetched=step_result is not None)
+            if step_result is not None:
+                if stream is not None:
+                    stream.put_nowait(step_result["instruction"])
+            elif stream is None:
+                step_result = await self.first_aid_agent.get_next_step_async(**step_args)
+            else:
+                async for item in self.first_aid_agent.stream_next_step_async(**step_args):
+                    if isinstance(item, dict):
+                        step_result = item
+                    else:
+                        stream.put_nowait(item)
 
         state["step_index"] = step_result["next_step_index"]
         
         response = step_result["instruction"]
         if step_result.get("completed"):
             response += "\n\nYou have completed the first aid steps. Help should be arriving soon."
+        else:
+            self._prefetch_next_step(state, session_id, user_input, response)
 
         return {
             "response": response,
             "state": state
         }
 
+    def _needs_model(self, injury_type: str) -> bool:
+        # Scripted protocol steps are a dictionary lookup; only model-generated steps are worth prefetching
+        return self.prefetch_enabled and self.protocols.resolve(injury_type) is None
+
+    async def _prefetched_step(self, user_input: str, state: Dict[str, Any], session_id: str = None):
+        if session_id is None or not self._needs_model(state["injury_type"]) or not self.protocols.is_progress(user_input):
+            return None
+        return await self.prefetch.take(session_id, (state["injury_type"], state.get("step_index", 0)))
+
+    def _prefetch_next_step(self, state: Dict[str, Any], session_id: str, user_input: str, response: str):
+        if session_id is None or not self._needs_model(state["injury_type"]):
+            return
+        # The turn is recorded only once it is saved; the prefetch must already see it
+        preview = dict(state, history=list(state.get("history") or ()),
+                       history_summary=list(state.get("history_summary") or ()))
+        self.history.record(preview, user_input, response)
+        step_args = {
+            "injury_type": state["injury_type"],
+            "step_index": state["step_index"],
+            "user_input": PREFETCH_INPUT,
+            "history": self.history.window(preview),
+        }
+        self.prefetch.start(
+            session_id,
+            (step_args["injury_type"], step_args["step_index"]),
+            lambda: self.first_aid_agent.get_next_step_async(**step_args),
+        )
+
+    def _mark_incident_started(self, state: Dict[str, Any]):
+        state["incident_started"] = True
+        state.setdefault("incident_started_at", time.time())
+
     # --------------------------------------------------------
     # INTENT DETECTION (Placeholder)
     # --------------------------------------------------------
@@ -226,3 +577,10 @@ class SupervisorAgent:
             return "END_SESSION"
 
         return "UNSPECIFIED"
+
+    def _looks_like_location(self, text: str) -> bool:
+        """
+        Cheap check for an address or place reference, used to decide whether
+        location extraction is worth running speculatively alongside triage.
+        """
+        return bool(_LOCATION_HINT.search(text))
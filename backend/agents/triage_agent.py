@@ -1,37 +1,120 @@
-import google.generativeai as genai
 import json
 
+import metrics
+from agents.prompts import instruction
+from agents.registry import get_model
+from agents.response_cache import cached_response, get_response_cache
+from agents.schemas import (TRIAGE, TRIAGE_BATCH, TRIAGE_ENTRY, SchemaError, decode, parse_response,
+                            parse_response_async, response_text)
+from memory.history import log_prompt_tokens, log_usage
 from utils import retry_with_backoff
 
+PARSE_FAILURE = "Failed to parse response"
+
 class TriageAgent:
     def __init__(self, model_name="gemini-2.0-flash"):
-        self.model = genai.GenerativeModel(model_name)
-        self.system_instruction = """
+        # The output shape is the response schema in generation_config, not prompt text
+        self.system_instruction = instruction("""
         You are a Triage Agent for a medical emergency system.
         Your goal is to:
         1. Identify the accident type (e.g., bleeding, unconscious, seizure, burns).
         2. Estimate the severity level (1-5), where 5 is most critical.
         3. Determine if an ambulance should be dispatched (Severity >= 3).
-        
-        Output JSON:
-        {
-            "accident_type": "string",
-            "severity": int,
-            "dispatch_ambulance": bool,
-            "reasoning": "string"
-        }
-        """
+        """)
+        self.model = get_model(model_name, system_instruction=self.system_instruction)
+        self.generation_config = TRIAGE.generation_config
 
+    @cached_response("triage", key=lambda self, user_input: user_input, accept=lambda r: r.get("reasoning") != PARSE_FAILURE)
     @retry_with_backoff(retries=2, initial_delay=0.5)
     def analyze(self, user_input: str) -> dict:
-        prompt = f"{self.system_instruction}\n\nUser Input: {user_input}"
-        response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        prompt = self._build_prompt(user_input)
+        log_prompt_tokens("triage", prompt, system_instruction=self.system_instruction)
+        response = self.model.generate_content(prompt, generation_config=self.generation_config)
+        log_usage("triage", response)
+        return parse_response(TRIAGE, response, self.model, self._parse_failure)
+
+    @cached_response("triage", key=lambda self, user_input: user_input, accept=lambda r: r.get("reasoning") != PARSE_FAILURE)
+    @retry_with_backoff(retries=2, initial_delay=0.5)
+    async def analyze_async(self, user_input: str) -> dict:
+        """
+        Non-blocking variant of analyze() for the FastAPI request path.
+        """
+        prompt = self._build_prompt(user_input)
+        log_prompt_tokens("triage", prompt, system_instruction=self.system_instruction)
+        response = await self.model.generate_content_async(prompt, generation_config=self.generation_config)
+        log_usage("triage", response)
+        return await parse_response_async(TRIAGE, response, self.model, self._parse_failure)
+
+    @retry_with_backoff(retries=2, initial_delay=0.5)
+    async def _analyze_packed_async(self, user_inputs: list) -> list:
+        prompt = self._build_batch_prompt(user_inputs)
+        log_prompt_tokens("triage", prompt, system_instruction=self.system_instruction)
+        response = await self.model.generate_content_async(prompt, generation_config=TRIAGE_BATCH.generation_config)
+        log_usage("triage", response)
+        return self._parse_batch_response(response, len(user_inputs))
+
+    async def analyze_batch_async(self, user_inputs: list) -> list:
+        """
+        Triage several independent utterances in one model request. Cached
+        utterances are answered from the response cache; any utterance the
+        packed answer leaves out (or garbles) is retried on its own.
+        """
+        cache = get_response_cache()
+        results = [cache.get("triage", text) if cache.ttl_for("triage") > 0 else None for text in user_inputs]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if len(pending) > 1:
+            packed = await self._analyze_packed_async([user_inputs[i] for i in pending])
+            for i, result in zip(pending, packed):
+                if result is not None:
+                    results[i] = result
+                    cache.put("triage", user_inputs[i], result)
+
+        for i, result in enumerate(results):
+            if result is None:
+                if len(pending) > 1:
+                    metrics.incr("structured_triage_batch_repairs_total")
+                results[i] = await self.analyze_async(user_inputs[i])
+        return results
+
+    def _build_prompt(self, user_input: str) -> str:
+        return f"User Input: {user_input}"
+
+    def _build_batch_prompt(self, user_inputs: list) -> str:
+        messages = "\n".join(f"{i}. {json.dumps(text)}" for i, text in enumerate(user_inputs))
+        return (
+            "Triage each numbered caller message below independently. Output a JSON array "
+            "with one object per message, each with an \"id\" field holding the message number.\n\n"
+            f"Messages:\n{messages}"
+        )
+
+    def _parse_batch_response(self, response, count: int) -> list:
+        """One result (or None where the model skipped or garbled an entry) per packed message."""
+        results = [None] * count
+        metrics.incr("structured_triage_batch_total")
         try:
-            return json.loads(response.text)
-        except json.JSONDecodeError:
-            return {
-                "accident_type": "unknown",
-                "severity": 0,
-                "dispatch_ambulance": False,
-                "reasoning": "Failed to parse response"
-            }
+            entries = decode(response_text(response))
+        except SchemaError:
+            metrics.incr("structured_triage_batch_invalid_total")
+            return results
+        if isinstance(entries, dict):
+            entries = entries.get("results", [])
+        for entry in entries if isinstance(entries, list) else ():
+            try:
+                entry = TRIAGE_ENTRY.validate(entry)
+            except SchemaError:
+                metrics.incr("structured_triage_batch_invalid_total")
+                continue
+            index = entry.pop("id")
+            if index < count and results[index] is None:
+                results[index] = entry
+        return results
+
+    @staticmethod
+    def _parse_failure(text: str) -> dict:
+        return {
+            "accident_type": "unknown",
+            "severity": 0,
+            "dispatch_ambulance": False,
+            "reasoning": PARSE_FAILURE
+        }
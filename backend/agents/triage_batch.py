@@ -0,0 +1,219 @@
+"""
+Bulk triage of JSONL utterances, for replaying call transcripts in QA.
+
+Each input line is {"id"?, "text", "accident_type"?, "severity"?} ("message"
+and "utterance" are accepted for "text"; labels, when present, are scored).
+Utterances go through the same path as a live call: the rule engine answers
+confident matches, and the rest are packed several to a model request with
+a bounded number of requests in flight. Results are yielded as JSON-ready
+dicts as soon as each pack completes, so they can be streamed.
+
+Usage (from backend/):
+    python -m agents.triage_batch calls.jsonl > triaged.jsonl
+    python -m agents.triage_batch benchmarks/data/triage_corpus.jsonl --stub --stub-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import metrics
+from agents.registry import get_agent
+from agents.triage_agent import TriageAgent
+from agents.triage_rules import get_rules
+
+_TEXT_FIELDS = ("text", "message", "utterance")
+_DONE = object()
+
+
+class TriageBatch:
+    def __init__(self, agent=None, rules=None, concurrency: int = None, pack_size: int = None,
+                 use_rules: bool = True, accept_confidence: float = None):
+        self.agent = agent or get_agent(TriageAgent)
+        self.rules = rules or get_rules()
+        self.concurrency = max(1, concurrency or int(os.getenv("TRIAGE_BATCH_CONCURRENCY", "4")))
+        self.pack_size = max(1, pack_size or int(os.getenv("TRIAGE_BATCH_PACK_SIZE", "8")))
+        self.use_rules = use_rules
+        self.accept_confidence = accept_confidence or float(os.getenv("TRIAGE_RULES_ACCEPT", "0.85"))
+        self._start = self._end = None
+        self._requests = 0
+        self._sources = Counter()
+        self._severities = Counter()
+        self._types = Counter()
+        self._errors = 0
+        self._labeled = Counter()
+
+    async def run(self, lines):
+        """Triages an iterable of JSONL lines, yielding one result dict per utterance."""
+        self._start = time.perf_counter()
+        results = asyncio.Queue()
+        packs = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def produce():
+            pack = []
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = self._record(line, number)
+                except ValueError as e:
+                    results.put_nowait(self._failure({"id": number}, e))
+                    continue
+                quick = self.rules.analyze(record["text"]) if self.use_rules else None
+                if quick is not None and quick["confidence"] >= self.accept_confidence:
+                    results.put_nowait(self._result(record, quick, "rules"))
+                    continue
+                pack.append(record)
+                if len(pack) == self.pack_size:
+                    await packs.put(pack)
+                    pack = []
+                # Yield to the workers between lines of a large input
+                await asyncio.sleep(0)
+            if pack:
+                await packs.put(pack)
+            for _ in range(self.concurrency):
+                await packs.put(None)
+
+        async def work():
+            while (pack := await packs.get()) is not None:
+                self._requests += 1
+                started = time.perf_counter()
+                try:
+                    triaged = await self.agent.analyze_batch_async([record["text"] for record in pack])
+                except Exception as e:
+                    print(f"[WARN] Batch triage pack of {len(pack)} failed: {e}")
+                    for record in pack:
+                        results.put_nowait(self._failure(record, e))
+                    continue
+                metrics.observe("triage_batch_pack_seconds", time.perf_counter() - started)
+                for record, result in zip(pack, triaged):
+                    results.put_nowait(self._result(record, result, "llm"))
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work()) for _ in range(self.concurrency)]
+
+        async def drive():
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                results.put_nowait(_DONE)
+
+        driver = asyncio.create_task(drive())
+        try:
+            while (item := await results.get()) is not _DONE:
+                yield item
+            await driver
+        finally:
+            # A failed producer or an abandoned stream must not leave workers parked on the queue
+            for task in tasks + [driver]:
+                task.cancel()
+            self._end = time.perf_counter()
+
+    def stats(self) -> dict:
+        """Throughput and severity distribution of the last run (plus accuracy if inputs were labeled)."""
+        elapsed = ((self._end or time.perf_counter()) - self._start) if self._start else 0.0
+        total = sum(self._sources.values())
+        stats = {
+            "utterances": total,
+            "errors": self._errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "utterances_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+            "model_requests": self._requests,
+            "sources": dict(self._sources),
+            "severity_distribution": {str(k): v for k, v in sorted(self._severities.items())},
+            "accident_types": dict(self._types.most_common()),
+        }
+        labeled = self._labeled["labeled"]
+        if labeled:
+            stats["labeled"] = labeled
+            stats["severity_exact"] = round(self._labeled["severity_exact"] / labeled, 3)
+            stats["severity_within_one"] = round(self._labeled["severity_within_one"] / labeled, 3)
+            stats["accident_type_accuracy"] = round(self._labeled["type_ok"] / labeled, 3)
+        return stats
+
+    @staticmethod
+    def _record(line: str, number: int) -> dict:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {number}: invalid JSON ({e.msg})")
+        if isinstance(record, str):
+            record = {"text": record}
+        text = next((record[field] for field in _TEXT_FIELDS if isinstance(record.get(field), str)), None)
+        if not text:
+            raise ValueError(f"line {number}: no text field")
+        return dict(record, id=record.get("id", number), text=text)
+
+    def _result(self, record: dict, triage: dict, source: str) -> dict:
+        result = {
+            "id": record["id"],
+            "accident_type": triage.get("accident_type", "unknown"),
+            "severity": triage.get("severity", 0),
+            "dispatch_ambulance": triage.get("dispatch_ambulance", False),
+            "reasoning": triage.get("reasoning", ""),
+            "source": source,
+        }
+        self._sources[source] += 1
+        self._severities[result["severity"]] += 1
+        self._types[result["accident_type"]] += 1
+        metrics.incr(f"triage_batch_{source}_total")
+        if "severity" in record:
+            self._score(record, result)
+        return result
+
+    def _score(self, record: dict, result: dict):
+        self._labeled["labeled"] += 1
+        try:
+            gap = abs(int(record["severity"]) - int(result["severity"]))
+        except (TypeError, ValueError):
+            gap = None
+        self._labeled["severity_exact"] += gap == 0
+        self._labeled["severity_within_one"] += gap is not None and gap <= 1
+        self._labeled["type_ok"] += record.get("accident_type") == result["accident_type"]
+
+    def _failure(self, record: dict, error: Exception) -> dict:
+        self._errors += 1
+        metrics.incr("triage_batch_errors_total")
+        return {"id": record["id"], "error": str(error)}
+
+
+async def _run_cli(args):
+    if args.stub:
+        from agents.model_backend import set_backend
+        from agents.stub_model import StubBackend
+        set_backend(StubBackend(latency=args.stub_latency))
+    batch = TriageBatch(concurrency=args.concurrency, pack_size=args.pack_size,
+                        use_rules=not args.no_rules)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        # Agent debug logging goes to stderr so stdout stays valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            async for result in batch.run(source):
+                sink.write(json.dumps(result) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(json.dumps(batch.stats(), indent=2), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of utterances ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Where to write JSONL results (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Model requests in flight")
+    parser.add_argument("--pack-size", type=int, default=None, help="Utterances per model request")
+    parser.add_argument("--no-rules", action="store_true", help="Send every utterance to the model")
+    parser.add_argument("--stub", action="store_true", help="Use the offline stub model (same as MODEL_BACKEND=stub)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds per stub model request")
+    asyncio.run(_run_cli(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
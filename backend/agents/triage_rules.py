@@ -0,0 +1,106 @@
+"""
+Deterministic triage fast-path.
+
+The lexicon (phrase -> accident type, severity, weight) is compiled into one
+alternation regex, longest phrases first, so a single scan finds every hit.
+Hits preceded by a negator in the same clause ("he is not bleeding") are
+discounted. The result mirrors TriageAgent's output plus a `confidence` the
+supervisor uses to decide whether the LLM is needed at all.
+"""
+import json
+import os
+import re
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "triage_lexicon.json")
+
+_CLAUSE_BREAK = re.compile(r"[.,;!?]|\bbut\b|\bthough\b|\bhowever\b")
+_NEGATION_WINDOW = 4  # words before a hit that can negate it
+
+
+class TriageRules:
+    def __init__(self, lexicon: dict):
+        self.version = lexicon.get("version", 1)
+        self.negators = frozenset(lexicon.get("negators", []))
+        self._entries = {}
+        for entry in lexicon["entries"]:
+            for phrase in entry["phrases"]:
+                key = self._normalize(phrase)
+                existing = self._entries.get(key)
+                # A phrase listed twice keeps its most severe meaning
+                if existing is None or entry["severity"] > existing["severity"]:
+                    self._entries[key] = {
+                        "type": entry["type"],
+                        "severity": entry["severity"],
+                        "weight": entry["weight"],
+                    }
+        alternation = "|".join(
+            re.escape(phrase).replace(r"\ ", r"\s+")
+            for phrase in sorted(self._entries, key=len, reverse=True)
+        )
+        self._pattern = re.compile(rf"(?<![\w'])(?:{alternation})(?![\w'])", re.IGNORECASE)
+
+    @classmethod
+    def from_file(cls, path: str = None):
+        with open(path or DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def _is_negated(self, text: str, start: int) -> bool:
+        prefix = text[max(0, start - 60):start]
+        clause = _CLAUSE_BREAK.split(prefix)[-1]
+        words = clause.lower().split()[-_NEGATION_WINDOW:]
+        return any(word in self.negators for word in words)
+
+    def analyze(self, user_input: str):
+        """
+        Returns a triage dict with `confidence` in [0, 1], or None when nothing matched.
+        """
+        hits = []
+        negated = []
+        for match in self._pattern.finditer(user_input):
+            entry = self._entries[self._normalize(match.group(0))]
+            if self._is_negated(user_input, match.start()):
+                negated.append(entry)
+            else:
+                hits.append((entry, match.group(0)))
+
+        if not hits:
+            return None
+
+        top, _ = max(hits, key=lambda hit: (hit[0]["severity"], hit[0]["weight"]))
+        confidence = top["weight"]
+        # Independent phrases pointing at the same condition corroborate each other
+        corroborating = sum(1 for entry, _ in hits if entry["type"] == top["type"]) - 1
+        confidence += 0.03 * corroborating
+        # A negated, more severe finding makes the utterance ambiguous
+        if any(entry["severity"] > top["severity"] for entry in negated):
+            confidence -= 0.2
+        confidence = round(max(0.0, min(0.99, confidence)), 2)
+
+        matched = sorted({phrase.lower() for _, phrase in hits})
+        return {
+            "accident_type": top["type"],
+            "severity": top["severity"],
+            "dispatch_ambulance": top["severity"] >= 3,
+            "reasoning": f"Matched: {', '.join(matched)}",
+            "confidence": confidence,
+            "source": "rules",
+        }
+
+    def has_severe_finding(self, user_input: str) -> bool:
+        result = self.analyze(user_input)
+        return result is not None and result["severity"] >= 3
+
+
+_default_rules = None
+
+
+def get_rules() -> TriageRules:
+    """Returns the process-wide rule engine, compiled once from TRIAGE_LEXICON_PATH."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = TriageRules.from_file(os.getenv("TRIAGE_LEXICON_PATH") or None)
+    return _default_rules
@@ -0,0 +1,120 @@
+"""
+Throughput benchmark for the /agent endpoint under concurrent sessions.
+
+Every agent model is replaced with a fake that answers after a fixed latency,
+either by awaiting (async path) or by sleeping the thread (the old blocking
+behaviour). With the async path, throughput should grow with the number of
+sessions in flight; with the blocking path it stays flat.
+
+Every session sends the same messages, so the agent response cache is off
+unless --response-cache is given (then only the first session per run pays
+model latency).
+
+Usage (from backend/):
+    python benchmarks/bench_agent_concurrency.py --latency 0.2 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the orchestration layer, not the shared LLM rate limiter
+os.environ.setdefault("LLM_RATE_PER_SEC", "100000")
+os.environ.setdefault("LLM_BURST", "100000")
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "1024")
+
+import httpx
+
+from agents.response_cache import ResponseCache, set_response_cache
+from main import app, supervisor
+
+# An injury with no rule match and no scripted protocol, so both turns reach a model
+TRIAGE_JSON = json.dumps({"accident_type": "dizziness", "severity": 2, "dispatch_ambulance": False, "reasoning": "bench"})
+FIRST_AID_JSON = json.dumps({"instruction": "Apply pressure.", "next_step_index": 1, "completed": False})
+
+
+class _Part:
+    function_call = None
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [_Part()]
+
+
+class _FakeChat:
+    def __init__(self, model):
+        self.model = model
+
+    async def send_message_async(self, content, **kwargs):
+        return await self.model.generate_content_async(content)
+
+
+class FakeModel:
+    def __init__(self, text, latency, blocking):
+        self.text = text
+        self.latency = latency
+        self.blocking = blocking
+
+    async def generate_content_async(self, prompt, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return _Response(self.text)
+
+    def start_chat(self, history=None):
+        return _FakeChat(self)
+
+
+def install_fake_models(latency: float, blocking: bool):
+    supervisor.triage_agent.model = FakeModel(TRIAGE_JSON, latency, blocking)
+    supervisor.first_aid_agent.model = FakeModel(FIRST_AID_JSON, latency, blocking)
+
+
+async def run_session(client: httpx.AsyncClient):
+    session_id = (await client.post("/new-session")).json()["session_id"]
+    for message in ("Help, I had an accident", "My grandmother feels dizzy and strange", "What do I do now?"):
+        await client.post("/agent", json={"session_id": session_id, "message": message})
+
+
+async def measure(concurrency: int, sessions: int, response_cache: bool) -> float:
+    ttls = None if response_cache else {"triage": 0, "first_aid": 0, "location": 0}
+    set_response_cache(ResponseCache(ttls=ttls))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded():
+            async with semaphore:
+                await run_session(client)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded() for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+    # Three /agent calls per session, two of which hit a model
+    return sessions * 3 / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake model latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--sessions-per-worker", type=int, default=2)
+    parser.add_argument("--response-cache", action="store_true", help="Leave the agent response cache on")
+    args = parser.parse_args()
+
+    for blocking in (True, False):
+        install_fake_models(args.latency, blocking)
+        mode = "blocking" if blocking else "async"
+        for concurrency in args.concurrency:
+            rps = asyncio.run(measure(concurrency, concurrency * args.sessions_per_worker, args.response_cache))
+            print(f"{mode:>8}  concurrency={concurrency:<4} throughput={rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Throughput and latency of the dispatch engine under concurrent dispatches.
+
+Every worker assigns the nearest unit to a random incident and releases it
+again, so the fleet stays partly busy for the whole run.
+
+Usage (from backend/):
+    python benchmarks/bench_dispatch.py --units 5000 --dispatches 20000 --workers 16
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.dispatch_engine import DispatchEngine
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=5000)
+    parser.add_argument("--dispatches", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--busy-fraction", type=float, default=0.5, help="share of the fleet held busy during the run")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = DispatchEngine.synthetic(args.units, seed=0)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    lat0, lon0 = engine.center
+    incidents = [(lat0 + rng.uniform(-0.2, 0.2), lon0 + rng.uniform(-0.2, 0.2)) for _ in range(args.dispatches)]
+
+    # Hold part of the fleet busy so queries have to skip over gaps
+    for lat, lon in incidents[:int(args.units * args.busy_fraction)]:
+        engine.assign(lat, lon)
+
+    def dispatch(incident):
+        t = time.perf_counter()
+        record = engine.assign(*incident)
+        elapsed = time.perf_counter() - t
+        if record is not None:
+            engine.release(record["unit_id"])
+        return elapsed, record
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(dispatch, incidents))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed * 1e6 for elapsed, _ in results]
+    etas = [record["eta"] for _, record in results if record is not None]
+    print(f"units               {args.units} ({engine.available_count()} available)")
+    print(f"fleet build         {build_seconds * 1000:.1f} ms")
+    print(f"dispatches          {len(results)} with {args.workers} workers")
+    print(f"throughput          {len(results) / wall:,.0f} dispatches/s")
+    print(f"assign latency      p50 {statistics.median(latencies):.1f} us   p99 {percentile(latencies, 0.99):.1f} us")
+    print(f"eta                 median {statistics.median(etas)} min   max {max(etas)} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Load time and lookup latency of the offline gazetteer on a synthetic service area.
+
+Usage (from backend/):
+    python benchmarks/bench_gazetteer.py --places 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.gazetteer import Gazetteer, compile_csv
+
+SYLLABLES = ["ka", "ra", "ma", "na", "pa", "ta", "li", "ni", "gu", "ba", "ve", "so", "de", "ha", "ja", "ku", "mi", "ro", "sa", "ti"]
+SUFFIXES = ["Street", "Road", "Avenue", "Lane", "Hospital", "Market", "School", "Junction", "Colony", "Nagar"]
+
+
+def synthetic_csv(path, places, seed=7):
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("name,lat,lon,kind\n")
+        for i in range(places):
+            name = f"{word()} {word()} {rng.choice(SUFFIXES)}"
+            f.write(f"{name},{17.2 + rng.random() * 0.4:.6f},{78.2 + rng.random() * 0.5:.6f},place\n")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "places.csv")
+        index_path = os.path.join(tmp, "places.gzx")
+        synthetic_csv(csv_path, args.places)
+
+        start = time.perf_counter()
+        compile_csv(csv_path, index_path)
+        compile_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        gazetteer = Gazetteer(index_path)
+        load_seconds = time.perf_counter() - start
+
+        rng = random.Random(11)
+        ids = [rng.randrange(gazetteer.count) for _ in range(args.queries)]
+
+        exact = []
+        for place_id in ids:
+            name = gazetteer.name(place_id)
+            t = time.perf_counter()
+            gazetteer.search(name)
+            exact.append((time.perf_counter() - t) * 1e6)
+
+        fuzzy = []
+        fuzzy_correct = 0
+        for place_id in ids[:500]:
+            # Drop a character to force the trigram path
+            name = gazetteer.name(place_id)
+            typo = name[:3] + name[4:]
+            t = time.perf_counter()
+            matches = gazetteer.search(typo)
+            fuzzy.append((time.perf_counter() - t) * 1e6)
+            fuzzy_correct += bool(matches) and matches[0]["display_name"] == name
+
+        nearest = []
+        for _ in range(args.queries):
+            lat, lon = 17.2 + rng.random() * 0.4, 78.2 + rng.random() * 0.5
+            t = time.perf_counter()
+            gazetteer.nearest(lat, lon)
+            nearest.append((time.perf_counter() - t) * 1e6)
+
+        print(f"places              {gazetteer.count}")
+        print(f"index size          {os.path.getsize(index_path) / 1e6:.1f} MB")
+        print(f"compile             {compile_seconds:.2f} s")
+        print(f"load + index build  {load_seconds:.2f} s")
+        print(f"fuzzy recall        {fuzzy_correct / len(fuzzy):.1%}")
+        for label, values in (("exact search", exact), ("fuzzy search", fuzzy), ("nearest", nearest)):
+            print(f"{label:<18}  p50 {statistics.median(values):8.1f} us   p99 {percentile(values, 0.99):8.1f} us")
+        gazetteer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Write and replay throughput of the incident journal.
+
+The write pass appends a realistic event mix (session start, triage,
+location, dispatch, first-aid steps) from several threads, reporting append
+latency on the caller side, how many events each group commit carried and
+the time until everything is durable. The replay pass memory-maps the
+segments back: raw records, decoded events, and session state rebuilt
+from them.
+
+Usage (from backend/):
+    python benchmarks/bench_journal.py --events 1000000 --threads 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from memory.journal import Journal, load_sessions, replay, segment_paths
+
+STEPS_PER_SESSION = 8
+
+
+def session_events(n: int):
+    """One caller's incident, as the supervisor would journal it."""
+    session_id = f"00000000-0000-4000-8000-{n:012d}"
+    yield "session_start", session_id, {"incident_started": True, "incident_started_at": 1.7e9 + n}
+    yield "triage", session_id, {"severity": 4, "injury_type": "bleeding"}
+    yield "location", session_id, {"location": {"address": "Gandhi Hospital, Musheerabad", "lat": 17.4239, "lon": 78.5010}}
+    yield "dispatch", session_id, {"ambulance_dispatched": True, "dispatch_id": f"D-{n:08d}", "dispatch_unit": "AMB-0042",
+                                   "dispatch_eta": 7, "dispatch_timestamp": "2026-01-01T00:00:00", "time_to_dispatch": 21.5}
+    for step in range(1, STEPS_PER_SESSION + 1):
+        yield "first_aid", session_id, {"step_index": step}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def write_pass(directory: str, events: int, threads: int, flush_interval: float, fsync: bool) -> dict:
+    journal = Journal(directory, segment_bytes=32 * 1024 * 1024, flush_interval=flush_interval, fsync=fsync)
+    per_session = 4 + STEPS_PER_SESSION
+    sessions = events // per_session
+    latencies = [[] for _ in range(threads)]
+
+    def writer(worker: int):
+        sample = latencies[worker]
+        for n in range(worker, sessions, threads):
+            for kind, session_id, data in session_events(n):
+                start = time.perf_counter()
+                journal.append(kind, session_id, data)
+                sample.append(time.perf_counter() - start)
+
+    metrics.reset()
+    start = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    appended = time.perf_counter() - start
+    journal.flush()
+    durable = time.perf_counter() - start
+    journal.close()
+
+    appends = [value for sample in latencies for value in sample]
+    snapshot = metrics.snapshot()
+    commits = snapshot.get("journal_commits_total", 0)
+    return {
+        "events": len(appends),
+        "append_events_per_second": round(len(appends) / appended),
+        "durable_events_per_second": round(len(appends) / durable),
+        "append_p50_us": round(percentile(appends, 0.5) * 1e6, 2),
+        "append_p99_us": round(percentile(appends, 0.99) * 1e6, 2),
+        "commits": int(commits),
+        "events_per_commit": round(len(appends) / commits, 1) if commits else 0,
+        "segments": len(segment_paths(directory)),
+        "bytes": sum(os.path.getsize(path) for path in segment_paths(directory)),
+    }
+
+
+def replay_pass(directory: str) -> dict:
+    start = time.perf_counter()
+    raw = sum(1 for _ in replay(directory, decode=False))
+    raw_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = sum(1 for _ in replay(directory))
+    decoded_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sessions = load_sessions(directory)
+    rebuild_seconds = time.perf_counter() - start
+    return {
+        "raw_events_per_second": round(raw / raw_seconds),
+        "decoded_events_per_second": round(decoded / decoded_seconds),
+        "rebuild_seconds": round(rebuild_seconds, 3),
+        "rebuild_events_per_second": round(decoded / rebuild_seconds),
+        "sessions_rebuilt": len(sessions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--flush-ms", type=float, default=5.0, help="Group commit window")
+    parser.add_argument("--no-fsync", action="store_true")
+    parser.add_argument("--dir", help="Journal directory to write (default: a temporary one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir or tmp
+        report = {
+            "write": write_pass(directory, args.events, args.threads, args.flush_ms / 1000, not args.no_fsync),
+            "replay": replay_pass(directory),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
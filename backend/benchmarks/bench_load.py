@@ -0,0 +1,291 @@
+"""
+Load test of the full emergency flow: many concurrent simulated callers
+driven through /new-session and /agent, fully offline.
+
+Models come from the stub backend, locations resolve through the sample
+gazetteer (the stub geocoder: Nominatim is never called), and ambulances
+from a synthetic fleet just large enough that none run out. Half the callers are
+critical (rule-based triage, location, dispatch, scripted first aid), half
+minor (model triage and model first aid, the next step prefetched while the
+caller works). Reports per-stage latency quantiles, throughput, event-loop
+lag, memory per session and model calls per session. --think-time pauses
+each caller between messages, as a real caller carrying out a step would.
+
+--write-baseline stores the report; --check reruns with the baseline's
+configuration and exits 1 if it regressed (tests/test_load_regression.py
+does the same in CI).
+
+Usage (from backend/):
+    python benchmarks/bench_load.py --sessions 2000 --concurrency 64
+    python benchmarks/bench_load.py --sessions 200 --latency 0.3 --think-time 1.0
+    python benchmarks/bench_load.py --check
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import main
+import utils
+from agents import registry
+from agents.model_backend import set_backend
+from agents.response_cache import DEFAULT_TTLS, ResponseCache, set_response_cache
+from agents.stub_model import StubBackend
+from agents.supervisor_agent import SupervisorAgent
+from memory.journal import Journal, set_journal
+from tools.dispatch_engine import DispatchEngine, set_dispatch_engine
+from tools.gazetteer import Gazetteer, set_gazetteer
+from tools.geocode import GeocodeCache, set_cache
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_GAZETTEER = os.path.join(BACKEND_DIR, "tools", "data", "gazetteer_sample.csv")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "load_baseline.json")
+PLACES = ["Gandhi Hospital", "Osmania General Hospital", "Nizam's Institute of Medical Sciences", "Apollo Hospitals Jubilee Hills"]
+
+SCENARIOS = [
+    ("critical", [
+        ("start", "Help, there has been an accident"),
+        ("triage", "My dad collapsed and is not breathing"),
+        ("location", "We are at {place}"),
+        ("first_aid", "what do I do now"),
+        ("first_aid", "done, next"),
+    ]),
+    ("minor", [
+        ("start", "Help"),
+        ("triage", "Caller {n} feels dizzy and their head hurts"),
+        ("first_aid", "what should I do"),
+        ("first_aid", "ok next"),
+    ]),
+]
+
+LAG_INTERVAL = 0.005
+
+
+def quantiles(values: list) -> dict:
+    if not values:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    ordered = sorted(values)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"count": len(ordered), "p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+@contextlib.contextmanager
+def offline_stack(latency: float = 0.0, response_cache: bool = False, fleet_size: int = 1000):
+    """Stub model, stub geocoder, a synthetic fleet and a scratch journal behind main.app, restored afterwards."""
+    backend = StubBackend(latency=latency)
+    journal_dir = tempfile.TemporaryDirectory()
+    journal = Journal(journal_dir.name)
+    previous_supervisor, previous_limiter = main.supervisor, utils.llm_rate_limiter
+    set_backend(backend)
+    registry.clear()
+    set_gazetteer(Gazetteer.load(SAMPLE_GAZETTEER))
+    set_cache(GeocodeCache(path=None))
+    set_dispatch_engine(DispatchEngine.synthetic(fleet_size, seed=0))
+    set_journal(journal)
+    set_response_cache(ResponseCache() if response_cache else ResponseCache(ttls={agent: 0 for agent in DEFAULT_TTLS}))
+    # Measure the orchestration layer, not the shared LLM rate limiter
+    utils.llm_rate_limiter = utils.RateLimiter(rate=1e9, burst=10**9, max_concurrency=100_000)
+    main.supervisor = SupervisorAgent()
+    try:
+        yield backend
+    finally:
+        main.supervisor, utils.llm_rate_limiter = previous_supervisor, previous_limiter
+        set_backend(None)
+        registry.clear()
+        set_gazetteer(None)
+        set_cache(None)
+        set_dispatch_engine(None)
+        set_response_cache(None)
+        set_journal(None)
+        journal.close()
+        journal_dir.cleanup()
+
+
+async def _caller(client, n: int, latencies: dict, errors: list, think_time: float = 0.0):
+    _, script = SCENARIOS[n % len(SCENARIOS)]
+    place = PLACES[n % len(PLACES)]
+    try:
+        start = time.perf_counter()
+        response = await client.post("/new-session")
+        response.raise_for_status()
+        latencies["new_session"].append(time.perf_counter() - start)
+        session_id = response.json()["session_id"]
+        for stage, message in script:
+            # In-process requests never suspend on a socket; yield as a real round trip would
+            await asyncio.sleep(think_time if stage == "first_aid" else 0)
+            start = time.perf_counter()
+            response = await client.post("/agent", json={
+                "session_id": session_id, "message": message.format(place=place, n=n),
+            })
+            response.raise_for_status()
+            latencies[stage].append(time.perf_counter() - start)
+    except Exception as e:
+        errors.append(f"caller {n}: {e!r}")
+
+
+async def _drive(sessions: int, concurrency: int, offset: int = 0, think_time: float = 0.0):
+    latencies = defaultdict(list)
+    errors = []
+    lag = []
+    loop = asyncio.get_running_loop()
+
+    async def monitor():
+        while True:
+            before = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            lag.append(max(0.0, loop.time() - before - LAG_INTERVAL))
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def bounded(n):
+        async with slots:
+            await _caller(client, n, latencies, errors, think_time)
+
+    watcher = asyncio.create_task(monitor())
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(offset + n) for n in range(sessions)))
+        elapsed = time.perf_counter() - start
+    watcher.cancel()
+    return latencies, errors, lag, elapsed
+
+
+def _measure_memory(sessions: int, concurrency: int) -> float:
+    """Bytes retained per session (state, history, coordinator bookkeeping) after whole calls."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        asyncio.run(_drive(sessions, concurrency, offset=10**6))
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / sessions
+
+
+def run_load(sessions: int = 400, concurrency: int = 32, latency: float = 0.0,
+             memory_sessions: int = 100, response_cache: bool = False, think_time: float = 0.0) -> dict:
+    config = {"sessions": sessions, "concurrency": concurrency, "latency": latency,
+              "memory_sessions": memory_sessions, "response_cache": response_cache, "think_time": think_time}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            offline_stack(latency, response_cache, fleet_size=sessions + memory_sessions + 100) as backend:
+        # One warm-up call so imports and first-use setup are not timed
+        asyncio.run(_drive(2, 2, offset=-10))
+        calls_before = backend.requests
+        latencies, errors, lag, elapsed = asyncio.run(_drive(sessions, concurrency, think_time=think_time))
+        model_calls = backend.requests - calls_before
+        memory = _measure_memory(memory_sessions, concurrency) if memory_sessions else 0.0
+
+    requests = sum(len(values) for values in latencies.values())
+    lag_stats = quantiles(lag)
+    return {
+        "config": config,
+        "requests": requests,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "sessions_per_second": round(sessions / elapsed, 1),
+        "stages": {stage: quantiles(values) for stage, values in sorted(latencies.items())},
+        "event_loop_lag_ms": {"p50": lag_stats["p50_ms"], "p99": lag_stats["p99_ms"],
+                              "max": round(max(lag, default=0.0) * 1000, 3)},
+        "memory_per_session_kb": round(memory / 1024, 2),
+        "model_calls_per_session": round(model_calls / sessions, 3),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 1.0, memory_tolerance: float = 0.5,
+            floor_ms: float = 5.0) -> list:
+    """
+    Regressions of `report` against `baseline`, as readable strings (empty if none).
+    Timings may be up to (1 + tolerance) times the baseline, and are ignored
+    when within `floor_ms` of it; model calls per session must match exactly.
+    """
+    regressions = []
+    if report["errors"]:
+        regressions.append(f"{report['errors']} failed callers, e.g. {report['error_samples'][0]}")
+
+    for stage, base in baseline["stages"].items():
+        current = report["stages"].get(stage)
+        if current is None:
+            regressions.append(f"stage {stage} no longer reached")
+            continue
+        for q in ("p50_ms", "p95_ms"):
+            if current[q] > base[q] * (1 + tolerance) and current[q] - base[q] > floor_ms:
+                regressions.append(f"{stage} {q} {current[q]} > baseline {base[q]}")
+
+    if report["requests_per_second"] < baseline["requests_per_second"] / (1 + tolerance):
+        regressions.append(f"throughput {report['requests_per_second']} req/s < baseline {baseline['requests_per_second']}")
+
+    lag, base_lag = report["event_loop_lag_ms"]["p99"], baseline["event_loop_lag_ms"]["p99"]
+    if lag > base_lag * (1 + tolerance) and lag - base_lag > floor_ms:
+        regressions.append(f"event-loop lag p99 {lag} ms > baseline {base_lag}")
+
+    memory, base_memory = report["memory_per_session_kb"], baseline["memory_per_session_kb"]
+    if memory > base_memory * (1 + memory_tolerance) and memory - base_memory > 1:
+        regressions.append(f"memory per session {memory} KB > baseline {base_memory}")
+
+    # Deterministic: more model calls means a cache, rule or script path stopped working
+    calls, base_calls = report["model_calls_per_session"], baseline["model_calls_per_session"]
+    if abs(calls - base_calls) > 0.01:
+        regressions.append(f"model calls per session {calls} != baseline {base_calls}")
+    return regressions
+
+
+def load_baseline(path: str = DEFAULT_BASELINE) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub model latency per call, seconds")
+    parser.add_argument("--memory-sessions", type=int, default=100, help="Sessions in the memory pass (0 skips it)")
+    parser.add_argument("--response-cache", action="store_true", help="Leave the agent response cache on")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Caller pause before each first-aid message, seconds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--check", action="store_true", help="Rerun the baseline's configuration; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("LOAD_TEST_TOLERANCE", "1.0")))
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline) if args.check else None
+    config = baseline["config"] if baseline else {
+        "sessions": args.sessions, "concurrency": args.concurrency, "latency": args.latency,
+        "memory_sessions": args.memory_sessions, "response_cache": args.response_cache,
+        "think_time": args.think_time,
+    }
+    report = run_load(**config)
+    print(json.dumps(report, indent=2))
+
+    if args.write_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    if baseline:
+        regressions = compare(report, baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,59 @@
+"""
+Input tokens per model call, by agent, over the offline load-test flow.
+
+Runs the bench_load callers (stub models, so nothing leaves the machine and
+every call is counted) and reports, per agent, the mean estimated input
+tokens of a call: in total, the share that is the agent's system
+instruction (the fixed prefix the API can serve from its context cache), and
+the rest (history plus the per-call prompt). Estimates use the same
+characters-per-token rule as the history budget; against Gemini, the
+model_input_tokens_* and model_cached_tokens_* metrics report what the API
+actually billed.
+
+Usage (from backend/):
+    python benchmarks/bench_prompt_tokens.py --sessions 200
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from bench_load import run_load
+
+AGENTS = ("triage", "location", "ambulance", "first_aid")
+
+
+def token_report(snapshot: dict) -> dict:
+    report = {}
+    for agent in AGENTS:
+        calls = snapshot.get(f"prompt_tokens_{agent}_count", 0)
+        if not calls:
+            continue
+        total = snapshot[f"prompt_tokens_{agent}_sum"] / calls
+        system = snapshot.get(f"prompt_system_tokens_{agent}_sum", 0) / calls
+        report[agent] = {
+            "calls": calls,
+            "input_tokens": round(total, 1),
+            "system_tokens": round(system, 1),
+            "per_call_tokens": round(total - system, 1),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    metrics.reset()
+    run_load(sessions=args.sessions, concurrency=args.concurrency, memory_sessions=0)
+    print(json.dumps(token_report(metrics.snapshot()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
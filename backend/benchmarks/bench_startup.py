@@ -0,0 +1,120 @@
+"""
+Cold-start cost of a backend worker: import time of `main`, and the time
+from spawning uvicorn to the first /agent answer.
+
+Every run is a fresh interpreter, as for a new uvicorn worker or an
+autoscaled replica. The stub model backend keeps the first-response pass
+offline (MODEL_BACKEND=stub); --backend gemini measures imports with the
+real SDK configuration. The first /agent message is a critical call with an
+address, so triage, location and dispatch are all exercised.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --backend gemini --imports-only
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_GAZETTEER = os.path.join(BACKEND_DIR, "tools", "data", "gazetteer_sample.csv")
+FIRST_MESSAGE = "My father collapsed and is not breathing, we are at Gandhi Hospital"
+
+IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker_env(backend: str, scratch: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "MODEL_BACKEND": backend,
+        "GAZETTEER_PATH": SAMPLE_GAZETTEER,
+        "GEOCODE_CACHE_PATH": "",
+        "JOURNAL_DIR": os.path.join(scratch, "journal"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    return env
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_response(env: dict, timeout: float = 60.0) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=url, timeout=timeout) as client:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError("server did not come up")
+                try:
+                    session_id = client.post("/new-session").json()["session_id"]
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            accepting = time.perf_counter() - start
+
+            request_start = time.perf_counter()
+            response = client.post("/agent", json={"session_id": session_id, "message": FIRST_MESSAGE})
+            response.raise_for_status()
+            done = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "accepting_seconds": accepting,
+        "first_request_seconds": done - request_start,
+        "first_response_seconds": done - start,
+    }
+
+
+def summarize(values: list) -> dict:
+    return {"median": round(statistics.median(values), 3), "min": round(min(values), 3), "max": round(max(values), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", default="stub", choices=["stub", "gemini"])
+    parser.add_argument("--imports-only", action="store_true", help="Skip the uvicorn first-response pass")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = worker_env(args.backend, scratch)
+        report = {"backend": args.backend, "runs": args.runs,
+                  "import_seconds": summarize([measure_import(env) for _ in range(args.runs)])}
+        if not args.imports_only:
+            runs = [measure_first_response(env) for _ in range(args.runs)]
+            for key in ("accepting_seconds", "first_request_seconds", "first_response_seconds"):
+                report[key] = summarize([run[key] for run in runs])
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
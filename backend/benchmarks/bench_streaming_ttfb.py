@@ -0,0 +1,144 @@
+"""
+Time to first byte and to first speakable sentence: /agent vs /agent/stream.
+
+Runs the real FastAPI app under uvicorn on a local port, with the first-aid
+model replaced by a fake that emits tokens at a fixed rate after an initial
+delay, so the numbers isolate what streaming buys over the buffered endpoint.
+
+Usage (from backend/):
+    python benchmarks/bench_streaming_ttfb.py --requests 20 --first-token-ms 400 --token-ms 25
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+
+import main
+from memory.session_service import InMemorySessionService
+
+STEP = (
+    "Kneel beside the person and place the heel of your hand on the centre of their chest. "
+    "Put your other hand on top and interlock your fingers. "
+    "Push down hard and fast, about two inches deep, twice per second. "
+    "Keep going until the ambulance arrives or the person starts breathing."
+)
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChat:
+    def __init__(self, first_token, per_token):
+        self.first_token = first_token
+        self.per_token = per_token
+
+    async def send_message_async(self, prompt, stream=False):
+        tokens = [word + " " for word in STEP.split(" ")]
+        if not stream:
+            await asyncio.sleep(self.first_token + self.per_token * len(tokens))
+            return _Chunk(json.dumps({"instruction": STEP, "next_step_index": 1, "completed": False}))
+
+        async def generate():
+            await asyncio.sleep(self.first_token)
+            for token in tokens:
+                await asyncio.sleep(self.per_token)
+                yield _Chunk(token)
+        return generate()
+
+
+class FakeModel:
+    def __init__(self, first_token, per_token):
+        self.first_token = first_token
+        self.per_token = per_token
+
+    def start_chat(self, history=None):
+        return FakeChat(self.first_token, self.per_token)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_aid_session():
+    session_id = main.session_service.create_session()
+    state = InMemorySessionService.get_state(session_id)
+    state.update({"incident_started": True, "severity": 2, "injury_type": "unconscious"})
+    InMemorySessionService.update_state(session_id, state)
+    return session_id
+
+
+async def measure_buffered(client, url):
+    body = {"session_id": first_aid_session(), "message": "what do I do"}
+    start = time.perf_counter()
+    ttfb = None
+    async with client.stream("POST", f"{url}/agent", json=body) as response:
+        async for _ in response.aiter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+    # The whole reply arrives at once, so the first sentence comes with the first byte
+    return ttfb, ttfb, time.perf_counter() - start
+
+
+async def measure_stream(client, url):
+    body = {"session_id": first_aid_session(), "message": "what do I do"}
+    start = time.perf_counter()
+    ttfb = first_sentence = None
+    async with client.stream("POST", f"{url}/agent/stream", json=body) as response:
+        async for line in response.aiter_lines():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            if first_sentence is None and line == "event: chunk":
+                first_sentence = time.perf_counter() - start
+    return ttfb, first_sentence, time.perf_counter() - start
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--token-ms", type=float, default=25)
+    args = parser.parse_args()
+
+    main.supervisor.first_aid_agent.model = FakeModel(args.first_token_ms / 1000, args.token_ms / 1000)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}"
+
+    async def run():
+        async with httpx.AsyncClient(timeout=30) as client:
+            results = {}
+            for label, measure in (("/agent", measure_buffered), ("/agent/stream", measure_stream)):
+                results[label] = [await measure(client, url) for _ in range(args.requests)]
+            return results
+
+    results = asyncio.run(run())
+    server.should_exit = True
+    thread.join()
+
+    print(f"fake model: first token {args.first_token_ms:.0f} ms, {args.token_ms:.0f} ms/token, {len(STEP.split())} tokens")
+    for label, samples in results.items():
+        ttfb, sentence, total = (statistics.median(values) * 1000 for values in zip(*samples))
+        print(f"{label:<14}  ttfb {ttfb:7.1f} ms   first sentence {sentence:7.1f} ms   complete {total:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main_()
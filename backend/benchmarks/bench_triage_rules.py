@@ -0,0 +1,80 @@
+"""
+Accuracy and latency of the rule-based triage fast-path on a labeled corpus.
+
+For each utterance the rule engine either answers (coverage) or defers to the
+LLM. Accuracy is measured on the answered utterances against the labels.
+
+Usage (from backend/):
+    python benchmarks/bench_triage_rules.py [--corpus benchmarks/data/triage_corpus.jsonl]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.triage_rules import TriageRules
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "triage_corpus.jsonl")
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--lexicon", default=None)
+    parser.add_argument("--accept", type=float, default=0.85, help="Confidence at which the LLM is skipped")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per utterance")
+    args = parser.parse_args()
+
+    rules = TriageRules.from_file(args.lexicon)
+    corpus = load_corpus(args.corpus)
+
+    answered = accepted = exact = within_one = dispatch_ok = type_ok = 0
+    misses = []
+    for row in corpus:
+        result = rules.analyze(row["text"])
+        if result is None:
+            continue
+        answered += 1
+        if result["confidence"] >= args.accept:
+            accepted += 1
+        exact += result["severity"] == row["severity"]
+        within_one += abs(result["severity"] - row["severity"]) <= 1
+        dispatch_ok += (result["severity"] >= 3) == (row["severity"] >= 3)
+        type_ok += result["accident_type"] == row["accident_type"]
+        if (result["severity"] >= 3) != (row["severity"] >= 3):
+            misses.append((row["text"], row["severity"], result["severity"]))
+
+    timings = []
+    for row in corpus:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            rules.analyze(row["text"])
+        timings.append((time.perf_counter() - start) / args.repeat * 1e6)
+    timings.sort()
+
+    total = len(corpus)
+    print(f"utterances            {total}")
+    print(f"answered by rules     {answered} ({answered / total:.0%})")
+    print(f"skip LLM (>= {args.accept})   {accepted} ({accepted / total:.0%})")
+    if answered:
+        print(f"severity exact        {exact / answered:.0%}")
+        print(f"severity within 1     {within_one / answered:.0%}")
+        print(f"dispatch decision     {dispatch_ok / answered:.0%}")
+        print(f"accident type         {type_ok / answered:.0%}")
+    print(f"latency p50           {statistics.median(timings):.1f} us")
+    print(f"latency p99           {timings[int(len(timings) * 0.99) - 1]:.1f} us")
+    for text, expected, got in misses:
+        print(f"  dispatch mismatch: expected {expected}, got {got}: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@ import os
 import traceback
 import google.generativeai as genai
 
-# Mock API key
-os.environ["GOOGLE_API_KEY"] = "AIzaSyD-mock-key"
+# Offline stub models unless a backend is chosen explicitly (no API key needed)
+os.environ.setdefault("MODEL_BACKEND", "stub")
 
 def test_triage():
     print("Testing TriageAgent...")
@@ -11,6 +11,7 @@ def test_triage():
         from agents.triage_agent import TriageAgent
         agent = TriageAgent()
         print("TriageAgent init ok")
+        print(agent.analyze("I cut my hand and it's bleeding"))
     except:
         traceback.print_exc()
 
@@ -20,6 +21,7 @@ def test_location():
         from agents.location_agent import LocationAgent
         agent = LocationAgent()
         print("LocationAgent init ok")
+        print(agent.extract_location("I'm at Abids Road"))
     except:
         traceback.print_exc()
 
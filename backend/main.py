@@ -1,25 +1,49 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from memory.session import InMemorySessionService
+from memory.session_service import InMemorySessionService as SessionStore
 from agents.supervisor_agent import SupervisorAgent
+from agents.model_backend import get_backend
+from agents.registry import get_agent
+from agents.triage_batch import TriageBatch
 from fastapi.middleware.cors import CORSMiddleware
+from tools.http_client import get_http_client
+from memory.journal import close_journal
+from contextlib import asynccontextmanager
+import metrics
+import tracing
+import asyncio
+import json
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 load_dotenv()
 
-# Explicitly configure GenAI
+# GenAI itself is imported and configured when the first model is built (the stub backend needs no key)
 api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
+if get_backend().name == "stub":
+    print("Using the offline stub model backend (MODEL_BACKEND=stub)")
+elif not api_key:
     print("WARNING: GOOGLE_API_KEY not found in environment variables!")
 else:
     print(f"GOOGLE_API_KEY found: {api_key[:5]}...")
-    genai.configure(api_key=api_key)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up = None
+    if os.getenv("WARMUP_ON_START", "true").lower() == "true":
+        # Runs in the background: the server accepts traffic without waiting for it
+        warm_up = asyncio.create_task(supervisor.warm_up())
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    await get_http_client().aclose()
+    close_journal()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -31,7 +55,7 @@ app.add_middleware(
 )
 
 session_service = InMemorySessionService()
-supervisor = SupervisorAgent()
+supervisor = get_agent(SupervisorAgent)
 
 class MessageRequest(BaseModel):
     session_id: str
@@ -58,6 +82,69 @@ async def agent_chat(payload: UserMessage):
     )
     return {"text": response}
 
+@app.post("/agent/stream")
+async def agent_stream(payload: UserMessage):
+    """
+    Server-sent events version of /agent: `chunk` events carry speakable
+    sentences as they are generated, `triage`/`location`/`dispatch` carry
+    state transitions, and `done` carries the full reply.
+    """
+    async def events():
+        async for event, data in supervisor.stream_message(payload.message, payload.session_id):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/agent/ws")
+async def agent_ws(websocket: WebSocket):
+    """
+    WebSocket version of /agent/stream. Each client message is
+    {"session_id", "message"}; each server message is {"event", ...data}.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            payload = UserMessage(**await websocket.receive_json())
+            async for event, data in supervisor.stream_message(payload.message, payload.session_id):
+                await websocket.send_json({"event": event, **data})
+    except WebSocketDisconnect:
+        pass
+
+@app.post("/triage/batch")
+async def triage_batch(request: Request, concurrency: int = None, pack_size: int = None, rules: bool = True):
+    """
+    Bulk triage for QA replays. The body is JSONL of {"id", "text"} records;
+    the response streams one JSON result per line as packs complete, then a
+    final {"stats": ...} line with throughput and severity distribution.
+    """
+    body = (await request.body()).decode("utf-8")
+    batch = TriageBatch(concurrency=concurrency, pack_size=pack_size, use_rules=rules)
+
+    async def results():
+        async for result in batch.run(body.splitlines()):
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"stats": batch.stats()}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """Prometheus text exposition by default; ?format=json for the flat JSON snapshot."""
+    metrics.set_gauge("session_store_entries", SessionStore.size())
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces")
+async def get_traces(limit: int = 20):
+    """Recent sampled traces (TRACE_SAMPLE_RATE), newest first."""
+    return {"sample_rate": tracing.SAMPLE_RATE, "traces": tracing.recent_traces(limit)}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,348 @@
+"""
+Session storage backends.
+
+Every backend bounds what it keeps: entries expire after a sliding TTL and the
+least recently used entries are evicted once the entry or byte cap is hit.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import metrics
+
+
+class SessionBackend:
+    """Interface shared by all session backends."""
+
+    def get(self, session_id: str):
+        """Returns the stored state dict, or None if missing/expired."""
+        raise NotImplementedError
+
+    def set(self, session_id: str, state: dict):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryBackend(SessionBackend):
+    """
+    LRU + TTL dict. State dicts are stored as-is (no serialization); their JSON
+    size is measured on write to enforce the byte cap.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # session_id -> (state, nbytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            state, nbytes, expires_at = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                self._remove(session_id)
+                metrics.incr("session_store_expired_total")
+                return None
+            self._entries[session_id] = (state, nbytes, now + self.ttl_seconds)
+            self._entries.move_to_end(session_id)
+            return state
+
+    def set(self, session_id: str, state: dict):
+        nbytes = len(json.dumps(state, default=str))
+        with self._lock:
+            self._remove(session_id)
+            self._entries[session_id] = (state, nbytes, time.monotonic() + self.ttl_seconds)
+            self._bytes += nbytes
+            self._evict()
+            self._publish()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+            self._publish()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [sid for sid, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+            for sid in expired:
+                self._remove(sid)
+            self._publish()
+        metrics.incr("session_store_expired_total", len(expired))
+        return len(expired)
+
+    def _remove(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+            or next(iter(self._entries.values()))[2] <= now
+        ):
+            session_id = next(iter(self._entries))
+            self._remove(session_id)
+            metrics.incr("session_store_evictions_total")
+
+    def _publish(self):
+        metrics.set_gauge("session_store_entries", len(self._entries))
+        metrics.set_gauge("session_store_bytes", self._bytes)
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    File-backed store so sessions survive restarts and can be shared by
+    several uvicorn workers on one host (WAL mode allows concurrent readers).
+    """
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: float = 3600, max_entries: int = 100000,
+                 max_bytes: int = 256 * 1024 * 1024, purge_every: int = 500):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, nbytes INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions (accessed_at)")
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at > ?", (session_id, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET expires_at = ?, accessed_at = ? WHERE id = ?",
+                (now + self.ttl_seconds, now, session_id),
+            )
+        return json.loads(row[0])
+
+    def set(self, session_id: str, state: dict):
+        data = json.dumps(state, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, nbytes, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, data, len(data), now + self.ttl_seconds, now),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(now)
+            self._evict()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM sessions").fetchone()[0]
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge(time.time())
+
+    def _purge(self, now: float) -> int:
+        removed = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+        metrics.incr("session_store_expired_total", removed)
+        return removed
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM sessions").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT id, nbytes FROM sessions ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (row[0],))
+            count -= 1
+            total -= row[1]
+            metrics.incr("session_store_evictions_total")
+        metrics.set_gauge("session_store_entries", count)
+        metrics.set_gauge("session_store_bytes", total)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisProtocolClient:
+    """
+    Minimal RESP2 client: one pooled connection, request/response under a lock.
+    Enough for the session store without adding a redis dependency.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: str = None, timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password, **kwargs)
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._roundtrip("AUTH", self.password)
+        if self.db:
+            self._roundtrip("SELECT", self.db)
+
+    def execute(self, *args):
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                return self._roundtrip(*args)
+            except (OSError, ConnectionError):
+                # One reconnect attempt on a dropped connection
+                self._close()
+                self._connect()
+                return self._roundtrip(*args)
+
+    def _roundtrip(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RuntimeError(f"Unexpected RESP reply: {line!r}")
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class RedisBackend(SessionBackend):
+    """
+    Store sessions on a Redis-protocol server, shared by every worker and host.
+    TTL is enforced server-side with EX; capacity is the server's maxmemory
+    policy (configure allkeys-lru or volatile-lru).
+    """
+
+    def __init__(self, client: RedisProtocolClient, ttl_seconds: float = 3600, prefix: str = "session:"):
+        self.client = client
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+
+    def get(self, session_id: str):
+        # GETEX refreshes the sliding TTL in the same round trip
+        data = self.client.execute("GETEX", self.prefix + session_id, "EX", self.ttl_seconds)
+        return json.loads(data) if data is not None else None
+
+    def set(self, session_id: str, state: dict):
+        self.client.execute("SET", self.prefix + session_id, json.dumps(state, default=str), "EX", self.ttl_seconds)
+
+    def delete(self, session_id: str):
+        self.client.execute("DEL", self.prefix + session_id)
+
+    def size(self) -> int:
+        size = self.client.execute("DBSIZE")
+        metrics.set_gauge("session_store_entries", size)
+        return size
+
+    def close(self):
+        self.client.close()
+
+
+def create_backend_from_env() -> SessionBackend:
+    """
+    Builds the backend selected by SESSION_BACKEND (memory | sqlite | redis).
+    """
+    kind = os.getenv("SESSION_BACKEND", "memory").lower()
+    ttl = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+    max_entries = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+    max_bytes = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("SESSION_SQLITE_PATH", "sessions.db"), ttl, max_entries, max_bytes)
+    if kind == "redis":
+        client = RedisProtocolClient.from_url(os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0"))
+        return RedisBackend(client, ttl)
+    if kind != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND: {kind}")
+    return InMemoryBackend(ttl, max_entries, max_bytes)
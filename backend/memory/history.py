@@ -0,0 +1,106 @@
+"""
+Bounded per-session conversation history.
+
+Turns are recorded compactly in the session state (`history` plus a running
+`history_summary` of one-line gists). Agents get the key facts from the
+state, the summary, and the most recent turns that fit a token budget.
+Turns that fall out of the window are folded into the summary one exchange
+at a time, and the summary itself is capped, so the prompt size stays
+bounded however long the call goes on. Summarization is extractive and
+local: it costs no model call and never blocks the request path.
+"""
+import re
+
+import metrics
+import tracing
+
+CHARS_PER_TOKEN = 4  # rough English average, good enough for budgeting
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def log_prompt_tokens(agent: str, prompt: str, history: list = None, system_instruction: str = None) -> int:
+    """
+    Records the (estimated) input tokens of one model call, on the metrics and
+    the current span. The system instruction is counted too, since every
+    request carries it, and also on its own: it is the fixed prefix the API
+    can serve from its context cache.
+    """
+    system = estimate_tokens(system_instruction or "")
+    tokens = system + estimate_tokens(prompt) + sum(
+        estimate_tokens(part) for turn in history or () for part in turn["parts"]
+    )
+    metrics.observe(f"prompt_tokens_{agent}", tokens)
+    metrics.observe(f"prompt_system_tokens_{agent}", system)
+    tracing.annotate(prompt_tokens=tokens, system_tokens=system, history_turns=len(history or ()))
+    return tokens
+
+
+def log_usage(agent: str, response):
+    """Records the input tokens the API reports billing for a response, and how many came from its cache."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    metrics.observe(f"model_input_tokens_{agent}", usage.prompt_token_count)
+    metrics.observe(f"model_cached_tokens_{agent}", getattr(usage, "cached_content_token_count", 0))
+
+
+class ConversationHistory:
+    def __init__(self, token_budget: int = 600, summary_tokens: int = 200, turn_chars: int = 600, gist_chars: int = 120):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.turn_chars = turn_chars
+        self.gist_chars = gist_chars
+
+    def record(self, state: dict, user_text: str, agent_text: str):
+        """Appends one exchange and folds old turns until the window fits the budget."""
+        turns = state.setdefault("history", [])
+        turns.append({"role": "user", "text": user_text[:self.turn_chars]})
+        turns.append({"role": "model", "text": agent_text[:self.turn_chars]})
+
+        # Fold whole exchanges (user + model) so the window always starts with the user
+        while len(turns) > 2 and self._turn_tokens(turns) > self.token_budget:
+            self._fold(state, turns.pop(0), turns.pop(0))
+        metrics.set_gauge("history_window_tokens_last", self._turn_tokens(turns))
+
+    def window(self, state: dict) -> list:
+        """The history to pass to an agent's start_chat(), in Gemini content format."""
+        history = []
+        context = " ".join(filter(None, [self._facts(state), " ".join(state.get("history_summary") or ())]))
+        if context:
+            history.append({"role": "user", "parts": [f"Earlier in this call: {context}"]})
+            history.append({"role": "model", "parts": ["Understood."]})
+        history.extend({"role": turn["role"], "parts": [turn["text"]]} for turn in state.get("history", ()))
+        return history
+
+    def _turn_tokens(self, turns: list) -> int:
+        return sum(estimate_tokens(turn["text"]) for turn in turns)
+
+    def _fold(self, state: dict, user_turn: dict, model_turn: dict):
+        gists = state.setdefault("history_summary", [])
+        gists.append(f"Caller said \"{self._gist(user_turn['text'])}\"; was told \"{self._gist(model_turn['text'])}\".")
+        # Oldest gists drop out first once the summary reaches its own cap;
+        # the key facts survive in the session state regardless
+        while len(gists) > 1 and sum(estimate_tokens(gist) for gist in gists) > self.summary_tokens:
+            gists.pop(0)
+        metrics.incr("history_turns_folded_total")
+
+    def _gist(self, text: str) -> str:
+        first = _SENTENCE.split(text.strip(), 1)[0]
+        return first if len(first) <= self.gist_chars else first[:self.gist_chars - 3].rstrip() + "..."
+
+    @staticmethod
+    def _facts(state: dict) -> str:
+        facts = []
+        if state.get("injury_type"):
+            facts.append(f"Injury: {state['injury_type']} (severity {state.get('severity')}).")
+        if state.get("location"):
+            facts.append(f"Location: {state['location'].get('address')}.")
+        if state.get("ambulance_dispatched"):
+            facts.append(f"Ambulance dispatched, ETA {state.get('dispatch_eta')} minutes.")
+        if state.get("step_index"):
+            facts.append(f"First-aid steps given: {state['step_index']}.")
+        return " ".join(facts)
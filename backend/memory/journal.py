@@ -0,0 +1,296 @@
+"""
+Append-only journal of incident events.
+
+Every change a turn makes to the fields that matter after the call
+(incident start, triage, location, dispatch, first-aid step) is appended as
+one binary record, so incidents and dispatch ids survive a restart even when
+sessions live in memory. Files are rotated into numbered segments:
+
+    segment  b"ABAJRNL1" | record*
+    record   payload size (uint32) | crc32 of payload (uint32) | unix time (float64)
+             | kind (uint8) | session id size (uint16) | payload
+    payload  session id (utf-8) | compact JSON of the changed state fields
+
+Appends only encode the record and queue it; a writer thread commits
+everything queued in one write + fsync per JOURNAL_FLUSH_MS window (group
+commit), so the request path never waits on the disk. Readers memory-map the
+segments and stop at the first torn or corrupt record (a crash mid-write).
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, NamedTuple
+
+import metrics
+
+MAGIC = b"ABAJRNL1"
+_RECORD = struct.Struct("<IIdBH")
+_SEGMENT_NAME = re.compile(r"^journal-(\d{8})\.log$")
+
+# Event kind -> the session state fields it carries. The codes stored on disk
+# are positions in this table, so new kinds go at the end.
+EVENT_FIELDS = {
+    "session_start": ("incident_started", "incident_started_at"),
+    "triage": ("severity", "injury_type", "triage_refined"),
+    "location": ("location",),
+    "dispatch": ("ambulance_dispatched", "dispatch_id", "dispatch_unit", "dispatch_eta",
+                 "dispatch_timestamp", "time_to_dispatch"),
+    "first_aid": ("step_index",),
+}
+_KINDS = list(EVENT_FIELDS)
+_CODES = {kind: code for code, kind in enumerate(_KINDS, 1)}
+
+
+class JournalEvent(NamedTuple):
+    timestamp: float
+    kind: str
+    session_id: str
+    data: Any  # dict, or the raw JSON bytes when read with decode=False
+
+
+def encode_record(kind: str, session_id: str, data: dict, timestamp: float = None) -> bytes:
+    sid = session_id.encode()
+    payload = sid + json.dumps(data, separators=(",", ":"), default=str).encode()
+    header = _RECORD.pack(len(payload), zlib.crc32(payload), timestamp or time.time(), _CODES[kind], len(sid))
+    return header + payload
+
+
+class Journal:
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 flush_interval: float = 0.005, fsync: bool = True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        # A restart always opens a fresh segment, so a torn tail left by a
+        # crash stays at the end of its own file
+        existing = segment_paths(directory)
+        self._segment = _segment_index(existing[-1]) + 1 if existing else 1
+        self._file = self._open_segment()
+
+        self._pending = []
+        self._appended = 0
+        self._committed = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, kind: str, session_id: str, data: dict) -> int:
+        """Queues one event and returns its sequence number; never blocks on I/O."""
+        record = encode_record(kind, session_id, data)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Journal is closed")
+            self._pending.append(record)
+            self._appended += 1
+            if len(self._pending) == 1:
+                self._cond.notify_all()
+            return self._appended
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until everything appended so far is on disk; False on timeout."""
+        with self._cond:
+            target = self._appended
+            return self._cond.wait_for(lambda: self._committed >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._file.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                closing = self._closed
+            if self.flush_interval and not closing:
+                # Let concurrent turns join this commit
+                time.sleep(self.flush_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                sequence = self._appended
+            self._commit(batch)
+            with self._cond:
+                self._committed = sequence
+                self._cond.notify_all()
+
+    def _commit(self, batch: list):
+        start = time.perf_counter()
+        try:
+            self._file.write(b"".join(batch))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if self._file.tell() >= self.segment_bytes:
+                self._file.close()
+                self._segment += 1
+                self._file = self._open_segment()
+        except OSError as e:
+            print(f"[WARN] Journal commit of {len(batch)} events failed: {e}")
+            metrics.incr("journal_write_errors_total")
+            return
+        metrics.incr("journal_events_total", len(batch))
+        metrics.incr("journal_commits_total")
+        metrics.observe("journal_commit_seconds", time.perf_counter() - start)
+
+    def _open_segment(self):
+        f = open(os.path.join(self.directory, f"journal-{self._segment:08d}.log"), "ab")
+        if f.tell() == 0:
+            f.write(MAGIC)
+        return f
+
+
+def segment_paths(directory: str) -> list:
+    """The journal's segment files, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if _SEGMENT_NAME.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _segment_index(path: str) -> int:
+    return int(_SEGMENT_NAME.match(os.path.basename(path)).group(1))
+
+
+def read_segment(path: str, decode: bool = True) -> Iterator[JournalEvent]:
+    loads = json.loads
+    for timestamp, code, payload, sid_size in _records(path):
+        data = payload[sid_size:]
+        yield JournalEvent(timestamp, _KINDS[code - 1], payload[:sid_size].decode(), loads(data) if decode else data)
+
+
+def _records(path: str):
+    """(timestamp, kind code, payload, session id size) for every intact record of a segment."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a journal segment")
+            unpack, header_size, crc32 = _RECORD.unpack_from, _RECORD.size, zlib.crc32
+            offset = len(MAGIC)
+            while offset < size:
+                if offset + header_size > size:
+                    _torn(path, offset)
+                    return
+                length, crc, timestamp, code, sid_size = unpack(mm, offset)
+                start = offset + header_size
+                offset = start + length
+                payload = mm[start:offset]
+                if len(payload) != length or crc32(payload) != crc:
+                    _torn(path, start - header_size)
+                    return
+                yield timestamp, code, payload, sid_size
+
+
+def _torn(path: str, offset: int):
+    print(f"[WARN] Journal {path} ends in a torn or corrupt record at byte {offset}; ignoring the rest")
+    metrics.incr("journal_torn_records_total")
+
+
+def replay(directory: str, decode: bool = True) -> Iterator[JournalEvent]:
+    """Every event in the journal, in the order it was committed."""
+    for path in segment_paths(directory):
+        yield from read_segment(path, decode)
+
+
+def rebuild_sessions(events, new_state: Callable[[], dict] = dict) -> Dict[str, dict]:
+    """
+    Folds events into the latest known state of each session. Each kind owns
+    its own fields, so only the last event per session and kind matters; with
+    raw events (replay(decode=False)) only those are decoded.
+    """
+    latest = {}
+    for _, kind, session_id, data in events:
+        latest[session_id, kind] = data
+    return _fold(latest, new_state)
+
+
+def load_sessions(directory: str, new_state: Callable[[], dict] = dict) -> Dict[str, dict]:
+    """rebuild_sessions(replay(directory)) without building an event per record."""
+    latest = {}
+    for path in segment_paths(directory):
+        for _, code, payload, sid_size in _records(path):
+            latest[payload[:sid_size], code] = payload[sid_size:]
+    return _fold(latest, new_state)
+
+
+def _fold(latest: dict, new_state: Callable[[], dict]) -> Dict[str, dict]:
+    values = list(latest.values())
+    if values and isinstance(values[0], bytes):
+        # One parse of a JSON array is far cheaper than a loads() per event
+        values = json.loads(b"[" + b",".join(values) + b"]")
+    sessions = {}
+    for (session_id, _), data in zip(latest, values):
+        if isinstance(session_id, bytes):
+            session_id = session_id.decode()
+        state = sessions.get(session_id)
+        if state is None:
+            state = sessions[session_id] = new_state()
+        state.update(data)
+    return sessions
+
+
+def record_changes(session_id: str, before: dict, after: dict):
+    """Journals the events a turn produced by comparing the state around it."""
+    journal = get_journal()
+    if journal is None or session_id is None:
+        return
+    for kind, fields in EVENT_FIELDS.items():
+        if any(before.get(field) != after.get(field) for field in fields):
+            journal.append(kind, session_id, {field: after.get(field) for field in fields if field in after})
+
+
+_journal = None
+_journal_configured = False
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Returns the journal in JOURNAL_DIR (default "journal"), or None if JOURNAL_DIR is empty."""
+    global _journal, _journal_configured
+    if not _journal_configured:
+        with _journal_lock:
+            if not _journal_configured:
+                directory = os.getenv("JOURNAL_DIR", "journal")
+                if directory:
+                    _journal = Journal(
+                        directory,
+                        segment_bytes=int(os.getenv("JOURNAL_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+                        flush_interval=float(os.getenv("JOURNAL_FLUSH_MS", "5")) / 1000,
+                        fsync=os.getenv("JOURNAL_FSYNC", "true").lower() == "true",
+                    )
+                _journal_configured = True
+    return _journal
+
+
+def set_journal(journal):
+    """Replaces the process journal without closing the old one; None goes back to JOURNAL_DIR."""
+    global _journal, _journal_configured
+    with _journal_lock:
+        _journal = journal
+        _journal_configured = journal is not None
+
+
+def close_journal():
+    """Commits and closes the process journal (on shutdown); a later event reopens it."""
+    global _journal, _journal_configured
+    with _journal_lock:
+        journal, _journal, _journal_configured = _journal, None, False
+    if journal is not None:
+        journal.close()
@@ -1,14 +1,18 @@
+from agents.registry import get_agent
 from agents.supervisor_agent import SupervisorAgent
+from memory.session_service import InMemorySessionService as SessionStore
 import uuid
 
 class InMemorySessionService:
-    def __init__(self):
-        self.sessions = {}
+    """
+    Creates sessions. Only the session's state is stored per caller;
+    the supervisor (and the agents and models behind it) is shared.
+    """
 
     def create_session(self) -> str:
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = SupervisorAgent()
+        SessionStore.update_state(session_id, SupervisorAgent.new_state())
         return session_id
 
     def get_agent(self, session_id: str) -> SupervisorAgent:
-        return self.sessions.get(session_id)
+        return get_agent(SupervisorAgent)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import weakref
+from collections import OrderedDict
+
+import metrics
+
+class SessionCoordinator:
+    """
+    Serializes message handling per session and coalesces duplicates.
+
+    Messages for the same session run one at a time, so the load → handle →
+    save cycle cannot interleave and lose writes. A message identical to one
+    already in flight for that session (or answered within `window_seconds`,
+    e.g. a client-side retry) shares that result instead of running again.
+    Coordination is per process; run one worker per session-affinity group
+    when sessions are shared across workers.
+    """
+
+    def __init__(self, window_seconds: float = 2.0):
+        self.window_seconds = window_seconds
+        self._locks = weakref.WeakValueDictionary()
+        self._recent = OrderedDict()  # (session_id, message) -> (future, started_at)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    @staticmethod
+    def _normalize(message: str) -> str:
+        return " ".join(message.lower().split())
+
+    def _prune(self, now: float):
+        while self._recent:
+            key, (future, started_at) = next(iter(self._recent.items()))
+            if not future.done() or now - started_at < self.window_seconds:
+                break
+            self._recent.popitem(last=False)
+
+    async def run(self, session_id: str, message: str, handler):
+        """
+        Runs `handler()` (a coroutine factory) under the session lock, unless an
+        identical message for this session can share an existing result.
+        """
+        now = time.monotonic()
+        self._prune(now)
+        key = (session_id, self._normalize(message))
+
+        entry = self._recent.get(key)
+        if entry is not None and (not entry[0].done() or now - entry[1] < self.window_seconds):
+            metrics.incr("session_coalesced_requests_total")
+            return await asyncio.shield(entry[0])
+
+        future = asyncio.get_running_loop().create_future()
+        self._recent[key] = (future, now)
+        try:
+            async with self.lock(session_id):
+                result = await handler()
+        except BaseException as e:
+            # Failures are not shared with later retries
+            self._recent.pop(key, None)
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved so unobserved failures are not logged twice
+                future.exception()
+            raise
+        future.set_result(result)
+        return result
+
+    def inflight(self) -> int:
+        return sum(1 for future, _ in self._recent.values() if not future.done())
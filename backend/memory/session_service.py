@@ -1,14 +1,42 @@
+from memory.backends import SessionBackend, create_backend_from_env
+
 class InMemorySessionService:
     """
-    Minimal in-memory session manager.
+    Session manager backed by a bounded, TTL-evicting store.
     Stores session-specific state for each user.
+
+    The backend is picked from SESSION_BACKEND (memory by default; sqlite and
+    redis let sessions survive restarts and be shared across workers).
     """
-    _sessions = {}
+    _backend: SessionBackend = None
+
+    @classmethod
+    def backend(cls) -> SessionBackend:
+        if cls._backend is None:
+            cls._backend = create_backend_from_env()
+        return cls._backend
+
+    @classmethod
+    def configure(cls, backend: SessionBackend):
+        if cls._backend is not None and cls._backend is not backend:
+            cls._backend.close()
+        cls._backend = backend
 
     @classmethod
     def get_state(cls, session_id: str) -> dict:
-        return cls._sessions.setdefault(session_id, {})
+        # Unknown ids get an empty state that is only stored once written back,
+        # so probing random ids cannot grow the store
+        state = cls.backend().get(session_id)
+        return state if state is not None else {}
 
     @classmethod
     def update_state(cls, session_id: str, state: dict):
-        cls._sessions[session_id] = state
+        cls.backend().set(session_id, state)
+
+    @classmethod
+    def delete_session(cls, session_id: str):
+        cls.backend().delete(session_id)
+
+    @classmethod
+    def size(cls) -> int:
+        return cls.backend().size()
@@ -0,0 +1,122 @@
+"""
+Process-wide counters and gauges.
+
+Kept deliberately tiny so it can be called from hot paths (sync or async)
+without pulling in a metrics library.
+"""
+import re
+import threading
+from collections import defaultdict, deque
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_summaries = {}
+
+SUMMARY_WINDOW = 1024  # recent observations kept per summary for quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+class _Summary:
+    __slots__ = ("count", "total", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=SUMMARY_WINDOW)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def incr(name: str, value: float = 1):
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float):
+    """Records one observation (e.g. a latency) for count/sum/quantile reporting."""
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            summary = _summaries[name] = _Summary()
+        summary.count += 1
+        summary.total += value
+        summary.recent.append(value)
+
+
+def quantile(name: str, q: float) -> float:
+    with _lock:
+        summary = _summaries.get(name)
+        return summary.quantile(q) if summary else 0.0
+
+
+def get(name: str, default: float = 0):
+    with _lock:
+        if name in _gauges:
+            return _gauges[name]
+        return _counters.get(name, default)
+
+
+def snapshot() -> dict:
+    with _lock:
+        data = dict(_counters)
+        data.update(_gauges)
+        for name, summary in _summaries.items():
+            data[f"{name}_count"] = summary.count
+            data[f"{name}_sum"] = summary.total
+            data[f"{name}_p50"] = summary.quantile(0.5)
+            data[f"{name}_p95"] = summary.quantile(0.95)
+            data[f"{name}_p99"] = summary.quantile(0.99)
+        return data
+
+
+def render_prometheus() -> str:
+    """Everything in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        summaries = [
+            (name, summary.count, summary.total, [(q, summary.quantile(q)) for q in QUANTILES])
+            for name, summary in sorted(_summaries.items())
+        ]
+
+    lines = []
+    for kind, items in (("counter", counters), ("gauge", gauges)):
+        for name, value in items:
+            name = _metric_name(name)
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_number(value)}")
+    for name, count, total, quantiles in summaries:
+        name = _metric_name(name)
+        lines.append(f"# TYPE {name} summary")
+        for q, value in quantiles:
+            lines.append(f'{name}{{quantile="{q}"}} {_number(value)}')
+        lines.append(f"{name}_sum {_number(total)}")
+        lines.append(f"{name}_count {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _metric_name(name: str) -> str:
+    name = _INVALID_NAME_CHARS.sub("_", name)
+    return name if not name[:1].isdigit() else f"_{name}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if not isinstance(value, bool) else str(int(value))
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _summaries.clear()
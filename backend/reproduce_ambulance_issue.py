@@ -2,28 +2,28 @@ import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 from agents.ambulance_agent import AmbulanceAgent
+from agents.model_backend import get_backend
 
 # Load environment variables
 load_dotenv()
 
-# Configure GenAI
+# Configure GenAI (MODEL_BACKEND=stub runs offline without a key)
 api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    print("Error: GOOGLE_API_KEY not found.")
-    exit(1)
-
-genai.configure(api_key=api_key)
+if get_backend().name != "stub":
+    if not api_key:
+        print("Error: GOOGLE_API_KEY not found.")
+        exit(1)
+    genai.configure(api_key=api_key)
 
 def test_ambulance_agent():
     print("Initializing AmbulanceAgent...")
     agent = AmbulanceAgent()
     
     # Test query that should trigger dispatch_ambulance
-    user_input = "Dispatch to 123 Main St for severe bleeding"
-    print(f"Sending query: {user_input}")
+    print("Dispatching to 123 Main St for severe bleeding")
     
     try:
-        response = agent.process(user_input)
+        response = agent.dispatch("severe bleeding", "123 Main St")
         print("\nResponse received:")
         print(response)
         print("\nSUCCESS: Agent handled function call and returned text.")
@@ -0,0 +1,45 @@
+import sys
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.dispatch_engine import DispatchEngine, Unit, haversine_km
+
+
+def test_nearest_matches_brute_force():
+    engine = DispatchEngine.synthetic(2000, seed=1)
+    units = list(engine._units.values())
+    rng = random.Random(2)
+    for _ in range(50):
+        lat, lon = 17.2 + rng.random() * 0.4, 78.3 + rng.random() * 0.4
+        expected = sorted(units, key=lambda u: haversine_km(lat, lon, u.lat, u.lon))[:3]
+        found = engine.nearest(lat, lon, k=3)
+        assert [u["unit_id"] for u in found] == [u.unit_id for u in expected]
+
+
+def test_concurrent_assignments_never_share_a_unit():
+    engine = DispatchEngine.synthetic(300, seed=3)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        records = list(pool.map(lambda _: engine.assign(17.385, 78.4867), range(400)))
+
+    assigned = [r["unit_id"] for r in records if r is not None]
+    assert len(assigned) == 300
+    assert len(set(assigned)) == 300
+    assert records.count(None) == 100
+    assert engine.available_count() == 0
+
+
+def test_release_returns_unit_at_new_position():
+    engine = DispatchEngine([Unit("A", 17.40, 78.40), Unit("B", 17.50, 78.50)])
+    first = engine.assign(17.41, 78.41)
+    assert first["unit_id"] == "A"
+    assert engine.assign(17.41, 78.41)["unit_id"] == "B"
+    assert engine.assign(17.41, 78.41) is None
+
+    engine.release("A", lat=17.60, lon=78.60)
+    record = engine.assign(17.61, 78.61)
+    assert record["unit_id"] == "A"
+    assert record["eta"] < first["eta"] + 5
@@ -0,0 +1,71 @@
+import sys
+import os
+import json
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agents.first_aid_agent import FirstAidAgent
+from agents.first_aid_protocols import get_protocols
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Chat:
+    def __init__(self, model):
+        self.model = model
+
+    def send_message(self, prompt, **kwargs):
+        self.model.prompts.append(prompt)
+        return _Response(json.dumps({"instruction": "Small sips only.", "next_step_index": 9, "completed": False}))
+
+
+class _RecordingModel:
+    def __init__(self):
+        self.prompts = []
+
+    def start_chat(self, history=None):
+        return _Chat(self)
+
+
+def make_agent():
+    agent = FirstAidAgent()
+    agent.model = _RecordingModel()
+    return agent
+
+
+def test_injury_types_resolve_to_protocols():
+    protocols = get_protocols()
+    assert protocols.resolve("Severe bleeding") == "bleeding"
+    assert protocols.resolve("cardiac arrest") == "cpr"
+    assert protocols.resolve("broken arm") == "fracture"
+    assert protocols.resolve("head injury") is None
+
+
+def test_scripted_steps_skip_the_model():
+    metrics.reset()
+    agent = make_agent()
+
+    first = agent.get_next_step("Severe bleeding", 0, "what do I do?")
+    second = agent.get_next_step("Severe bleeding", 1, "done, what next?")
+    repeat = agent.get_next_step("Severe bleeding", 2, "can you say that again")
+
+    assert first["next_step_index"] == 1
+    assert "Press firmly" in second["instruction"]
+    assert repeat == {**second, "next_step_index": 2}
+    assert agent.model.prompts == []
+    assert metrics.get("first_aid_scripted_total") == 3
+
+
+def test_off_script_question_goes_to_the_model_without_advancing():
+    agent = make_agent()
+
+    result = agent.get_next_step("burns", 2, "Can I give him some water?")
+
+    assert result["instruction"] == "Small sips only."
+    assert result["next_step_index"] == 2
+    assert "Burns and scalds protocol" in agent.model.prompts[0]
@@ -0,0 +1,125 @@
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from tools import geocode
+from tools.gazetteer import Gazetteer, set_gazetteer
+from tools.geocode_cache import GeocodeCache, normalize_query
+
+PLACES = {
+    "123 main st, springfield": {"lat": "39.80", "lon": "-89.64", "display_name": "123 Main Street, Springfield", "osm_id": 1},
+}
+
+
+class _NominatimStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        query = parse_qs(urlparse(self.path).query)["q"][0].lower()
+        body = json.dumps([PLACES[query]] if query in PLACES else []).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _NominatimStub)
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(geocode, "NOMINATIM_URL", f"http://127.0.0.1:{server.server_address[1]}/search")
+    metrics.reset()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_normalization_merges_equivalent_queries():
+    assert normalize_query("123 Main St., Springfield") == normalize_query("123  main street springfield")
+    assert normalize_query("5th Ave N") == "5th avenue north"
+
+
+def test_repeat_lookups_are_served_from_cache(nominatim, tmp_path):
+    geocode.set_cache(GeocodeCache(str(tmp_path / "geo.db")))
+
+    first = geocode.reverse_geocode("123 Main St, Springfield")
+    second = geocode.reverse_geocode("123 MAIN STREET springfield")
+
+    assert first == second
+    assert first["display_name"] == "123 Main Street, Springfield"
+    assert nominatim.requests == 1
+    assert metrics.get("geocode_cache_hit_rate") == 0.5
+
+
+def test_not_found_is_negatively_cached(nominatim, tmp_path):
+    geocode.set_cache(GeocodeCache(str(tmp_path / "geo.db")))
+
+    assert geocode.reverse_geocode("nowhere at all") == {"error": "Location not found"}
+    assert geocode.reverse_geocode("Nowhere at all") == {"error": "Location not found"}
+    assert nominatim.requests == 1
+    assert metrics.get("geocode_cache_negative_hits_total") == 1
+
+
+def test_cache_persists_on_disk(nominatim, tmp_path):
+    path = str(tmp_path / "geo.db")
+    geocode.set_cache(GeocodeCache(path))
+    geocode.reverse_geocode("123 Main St, Springfield")
+    geocode.get_cache().close()
+
+    geocode.set_cache(GeocodeCache(path))
+    assert geocode.reverse_geocode("123 main st springfield")["lat"] == "39.80"
+    assert nominatim.requests == 1
+    assert metrics.get("geocode_cache_disk_hits_total") == 1
+
+
+SAMPLE_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "data", "gazetteer_sample.csv")
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    csv_path = tmp_path / "places.csv"
+    csv_path.write_text(open(SAMPLE_GAZETTEER, encoding="utf-8").read(), encoding="utf-8")
+    gazetteer = Gazetteer.load(str(csv_path))
+    yield gazetteer
+    gazetteer.close()
+
+
+def test_gazetteer_exact_and_fuzzy_search(gazetteer):
+    assert gazetteer.search("gandhi hospital")[0]["display_name"] == "Gandhi Hospital"
+    assert gazetteer.search("Secunderabad railway stn")[0]["display_name"] == "Secunderabad Railway Station"
+    assert gazetteer.search("Osmania Generl Hospitl")[0]["display_name"] == "Osmania General Hospital"
+    assert gazetteer.search("1600 Pennsylvania Avenue") == []
+
+
+def test_gazetteer_nearest_place(gazetteer):
+    place = gazetteer.nearest(17.3620, 78.4750)
+    assert place["display_name"] == "Charminar"
+    assert gazetteer.nearest(17.2410, 78.4300)["kind"] == "airport"
+
+
+def test_reverse_geocode_prefers_gazetteer(nominatim, gazetteer, tmp_path):
+    geocode.set_cache(GeocodeCache(str(tmp_path / "geo.db")))
+    set_gazetteer(gazetteer)
+    try:
+        result = geocode.reverse_geocode("Charminar")
+        assert result["source"] == "gazetteer"
+        assert nominatim.requests == 0
+
+        geocode.reverse_geocode("123 Main St, Springfield")
+        assert nominatim.requests == 1
+    finally:
+        set_gazetteer(None)
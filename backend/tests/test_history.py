@@ -0,0 +1,59 @@
+import sys
+import os
+import asyncio
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory.history import ConversationHistory, estimate_tokens
+from memory.session_service import InMemorySessionService
+from test_supervisor import make_supervisor
+
+
+def window_tokens(window):
+    return sum(estimate_tokens(part) for turn in window for part in turn["parts"])
+
+
+def test_window_stays_bounded_over_a_long_call():
+    history = ConversationHistory(token_budget=300, summary_tokens=100)
+    state = {"injury_type": "bleeding", "severity": 4, "location": {"address": "Abids Road"}}
+
+    sizes = []
+    for i in range(200):
+        history.record(state, f"Turn {i}: he is still bleeding and I am pressing on it. What else?",
+                       f"Keep pressing firmly for turn {i}. Do not lift the cloth. Tell me if it soaks through.")
+        sizes.append(window_tokens(history.window(state)))
+
+    assert max(sizes) <= 300 + 100 + 80
+    assert max(sizes[100:]) == max(sizes[-10:])  # flat, not growing
+    window = history.window(state)
+    assert "Injury: bleeding" in window[0]["parts"][0]
+    assert "Turn 199" in window[-2]["parts"][0]
+    assert [turn["role"] for turn in window[::2]] == ["user"] * (len(window) // 2)
+
+
+def test_supervisor_records_turns_and_passes_the_window():
+    supervisor = make_supervisor()
+    seen = []
+
+    async def get_next_step_async(injury_type, step_index, user_input, history=None):
+        seen.append(history)
+        return {"instruction": f"Step {step_index}.", "next_step_index": step_index + 1, "completed": False}
+
+    supervisor.first_aid_agent.get_next_step_async = get_next_step_async
+    session_id = "history-test"
+    InMemorySessionService.update_state(session_id, {
+        "incident_started": True, "severity": 2, "injury_type": "dizziness", "step_index": 0, "history": [],
+    })
+
+    async def run():
+        await supervisor.process_message("what now", session_id)
+        await supervisor.process_message("and then?", session_id)
+
+    try:
+        asyncio.run(run())
+        state = InMemorySessionService.get_state(session_id)
+        assert [turn["text"] for turn in state["history"]] == ["what now", "Step 0.", "and then?", "Step 1."]
+        assert seen[1][-2:] == [{"role": "user", "parts": ["what now"]}, {"role": "model", "parts": ["Step 0."]}]
+    finally:
+        InMemorySessionService.delete_session(session_id)
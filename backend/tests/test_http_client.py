@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.http_client import AsyncHTTPClient, CircuitOpenError, HostPolicy
+from utils import RateLimitExceeded
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        status = 500 if self.path.startswith("/fail") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_circuit_opens_after_repeated_failures(upstream):
+    server, base = upstream
+    client = AsyncHTTPClient()
+    client.set_policy(base[len("http://"):], HostPolicy(failure_threshold=3, reset_timeout=60))
+
+    async def run():
+        for _ in range(3):
+            assert (await client.get(f"{base}/fail")).status_code == 500
+        with pytest.raises(CircuitOpenError):
+            await client.get(f"{base}/ok")
+        await client.aclose()
+
+    asyncio.run(run())
+    assert server.requests == 3
+
+
+def test_rate_limited_host_fails_fast_instead_of_queueing(upstream):
+    server, base = upstream
+    client = AsyncHTTPClient()
+    client.set_policy(base[len("http://"):], HostPolicy(rate=1, burst=1, max_concurrency=1, max_queue_wait=0.5))
+
+    async def run():
+        results = await asyncio.gather(*(client.get(f"{base}/ok") for _ in range(3)), return_exceptions=True)
+        await client.aclose()
+        return results
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    assert time.perf_counter() - start < 0.4
+    assert sum(isinstance(r, httpx.Response) for r in results) == 1
+    assert sum(isinstance(r, RateLimitExceeded) for r in results) == 2
+
+
+def test_read_timeout_is_enforced(upstream):
+    _, base = upstream
+    client = AsyncHTTPClient(read_timeout=0.1)
+
+    async def run():
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get(f"{base}/slow")
+        await client.aclose()
+
+    asyncio.run(run())
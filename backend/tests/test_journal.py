@@ -0,0 +1,68 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.supervisor_agent import SupervisorAgent
+from memory.journal import Journal, rebuild_sessions, replay, segment_paths, set_journal
+from memory.session_service import InMemorySessionService
+from test_supervisor import FakeLocation, FakeTriage, make_supervisor
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(str(tmp_path), flush_interval=0)
+    set_journal(journal)
+    yield journal
+    set_journal(None)
+    journal.close()
+
+
+def test_events_replay_in_order_across_segments_and_a_torn_tail(tmp_path):
+    journal = Journal(str(tmp_path), segment_bytes=512, flush_interval=0.001)
+    for i in range(200):
+        journal.append("first_aid", f"s{i % 3}", {"step_index": i})
+    assert journal.flush(timeout=5)
+    journal.close()
+
+    # A crash mid-write leaves a partial record at the end of the last segment
+    with open(segment_paths(str(tmp_path))[-1], "ab") as f:
+        f.write(b"\x40\x00\x00\x00partial")
+
+    assert len(segment_paths(str(tmp_path))) > 1
+    assert [event.data["step_index"] for event in replay(str(tmp_path))] == list(range(200))
+    sessions = rebuild_sessions(replay(str(tmp_path)))
+    assert sessions["s2"]["step_index"] == 197
+
+    # Reopening starts a new segment after the torn one
+    reopened = Journal(str(tmp_path), flush_interval=0)
+    reopened.append("first_aid", "s0", {"step_index": 200})
+    reopened.close()
+    assert [event.data["step_index"] for event in replay(str(tmp_path))][-1] == 200
+
+
+def test_supervisor_turns_are_journaled_and_rebuild_the_session(journal):
+    supervisor = make_supervisor(
+        triage=FakeTriage({"accident_type": "bleeding", "severity": 4}),
+        location=FakeLocation({"address": "123 Main St", "lat": 1.0, "lon": 2.0}),
+    )
+    session_id = "journaled"
+    InMemorySessionService.update_state(session_id, SupervisorAgent.new_state())
+    try:
+        asyncio.run(supervisor.process_message("Help, there was an accident", session_id))
+        asyncio.run(supervisor.process_message("I'm bleeding heavily at 123 Main St", session_id))
+        asyncio.run(supervisor.process_message("what do I do", session_id))
+    finally:
+        InMemorySessionService.delete_session(session_id)
+    journal.flush(timeout=5)
+
+    events = list(replay(journal.directory))
+    assert [event.kind for event in events] == ["session_start", "triage", "location", "dispatch", "first_aid"]
+    state = rebuild_sessions(events, SupervisorAgent.new_state)[session_id]
+    assert state["dispatch_id"] == "D-1" and state["ambulance_dispatched"] is True
+    assert state["location"]["address"] == "123 Main St"
+    assert state["severity"] == 4 and state["step_index"] == 1
@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Add backend and the benchmark suite to sys.path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "benchmarks"))
+
+from bench_load import compare, load_baseline, run_load
+
+
+def test_full_flow_has_not_regressed_against_the_stored_baseline():
+    """
+    Offline load run of the whole call flow, compared with
+    benchmarks/data/load_baseline.json. Timings get LOAD_TEST_TOLERANCE
+    headroom (CI machines differ from the one that wrote the baseline);
+    failures, memory growth and extra model calls per session do not.
+    Refresh the baseline with `python benchmarks/bench_load.py --write-baseline`
+    after an intended change.
+    """
+    baseline = load_baseline()
+    report = run_load(**baseline["config"])
+    regressions = compare(report, baseline, tolerance=float(os.getenv("LOAD_TEST_TOLERANCE", "2.0")))
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,50 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+from google.api_core import exceptions
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import registry
+from agents.model_backend import set_backend
+from agents.response_cache import ResponseCache, set_response_cache
+from agents.stub_model import StubBackend
+from agents.ambulance_agent import AmbulanceAgent
+from agents.triage_agent import TriageAgent
+
+
+@pytest.fixture
+def stub():
+    backend = StubBackend(responses=[
+        {"match": "Triage Agent", "text": json.dumps({"accident_type": "burns", "severity": 3,
+                                                       "dispatch_ambulance": True, "reasoning": "canned"})},
+    ])
+    set_backend(backend)
+    registry.clear()
+    set_response_cache(ResponseCache(ttls={"triage": 0}))
+    yield backend
+    set_backend(None)
+    registry.clear()
+    set_response_cache(None)
+
+
+def test_agents_run_offline_on_canned_answers_and_function_calls(stub):
+    triage = TriageAgent()
+    assert asyncio.run(triage.analyze_async("anything at all"))["reasoning"] == "canned"
+
+    # The built-in ambulance answer calls the real dispatch tool and reports its result
+    result = asyncio.run(AmbulanceAgent().dispatch_async("bleeding", "Abids Road", lat=17.39, lon=78.47))
+    assert result["unit_id"].startswith("AMB-") and result["eta"] is not None
+    assert stub.requests == 3
+
+
+def test_injected_errors_go_through_the_retry_path(stub):
+    stub.error_rate = 1.0
+    with pytest.raises(exceptions.ServiceUnavailable):
+        asyncio.run(TriageAgent().analyze_async("help"))
+    # The first attempt plus both retries
+    assert stub.requests == 3
@@ -0,0 +1,71 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from memory.session_service import InMemorySessionService
+from test_supervisor import make_supervisor
+
+
+class FakeFirstAid:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = []
+
+    async def get_next_step_async(self, injury_type, step_index, user_input, history=None):
+        self.calls.append((step_index, user_input, history))
+        await asyncio.sleep(self.latency)
+        return {"instruction": f"Step {step_index}.", "next_step_index": step_index + 1, "completed": False}
+
+
+def run_turns(supervisor, session_id, messages):
+    InMemorySessionService.update_state(session_id, {
+        "incident_started": True, "severity": 2, "injury_type": "dizziness", "step_index": 0, "history": [],
+    })
+
+    async def run():
+        replies = []
+        for message in messages:
+            start = time.perf_counter()
+            replies.append((await supervisor.process_message(message, session_id), time.perf_counter() - start))
+            await asyncio.sleep(0.15)  # the caller carries out the step
+        return replies
+
+    try:
+        return asyncio.run(run())
+    finally:
+        InMemorySessionService.delete_session(session_id)
+
+
+def test_next_step_is_generated_while_the_caller_works():
+    metrics.reset()
+    supervisor = make_supervisor()
+    supervisor.first_aid_agent = first_aid = FakeFirstAid(latency=0.1)
+
+    replies = run_turns(supervisor, "prefetch-hit", ["what do I do", "done, what next?"])
+
+    assert [reply for reply, _ in replies] == ["Step 0.", "Step 1."]
+    assert replies[1][1] < 0.05
+    # The prefetch already saw the turn that produced step 0
+    assert first_aid.calls[1][2][-2:] == [{"role": "user", "parts": ["what do I do"]}, {"role": "model", "parts": ["Step 0."]}]
+    snapshot = metrics.snapshot()
+    assert snapshot["first_aid_prefetch_hits_total"] == 1
+    assert snapshot["first_aid_prefetch_saved_seconds_count"] == 1
+
+
+def test_a_question_discards_the_prefetched_step():
+    metrics.reset()
+    supervisor = make_supervisor()
+    supervisor.first_aid_agent = first_aid = FakeFirstAid()
+
+    replies = run_turns(supervisor, "prefetch-discard", ["what do I do", "can he drink some water?"])
+
+    # The question is answered afresh, then the step after it is prefetched
+    assert [call[1] for call in first_aid.calls[1:]] == ["Done. What next?", "can he drink some water?", "Done. What next?"]
+    assert [reply for reply, _ in replies] == ["Step 0.", "Step 1."]
+    assert metrics.get("first_aid_prefetch_discarded_total") == 1
+    assert metrics.get("first_aid_prefetch_hits_total") == 0
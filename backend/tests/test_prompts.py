@@ -0,0 +1,52 @@
+import sys
+import os
+import asyncio
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agents import registry
+from agents.first_aid_agent import FirstAidAgent
+from agents.model_backend import set_backend
+from agents.response_cache import ResponseCache, set_response_cache
+from agents.stub_model import StubBackend
+from agents.triage_agent import TriageAgent
+
+
+def test_fixed_instructions_go_to_the_model_once_not_into_every_message():
+    set_backend(StubBackend())
+    registry.clear()
+    set_response_cache(ResponseCache(ttls={"triage": 0}))
+    metrics.reset()
+    try:
+        triage = TriageAgent()
+        assert triage.model.system_instruction == triage.system_instruction
+        assert triage.model is registry.get_model("gemini-2.0-flash", system_instruction=triage.system_instruction)
+        assert triage._build_prompt("my hand is burnt") == "User Input: my hand is burnt"
+        assert not triage.system_instruction.startswith(" ")
+
+        result = asyncio.run(triage.analyze_async("my hand is burnt"))
+        assert result["accident_type"] == "burns"
+        snapshot = metrics.snapshot()
+        assert 0 < snapshot["prompt_system_tokens_triage_sum"] < snapshot["prompt_tokens_triage_sum"]
+    finally:
+        set_backend(None)
+        registry.clear()
+        set_response_cache(None)
+
+
+def test_per_call_step_instructions_are_rendered_once():
+    set_backend(StubBackend())
+    registry.clear()
+    try:
+        agent = FirstAidAgent()
+        first = agent._build_prompt("snake bite", 2, "done")
+        second = agent._build_prompt("snake bite", 2, "what now?")
+        assert first.replace("done", "what now?") == second
+        assert "Current step index: 2." in first and agent.system_instruction not in first
+        agent._build_stream_prompt("snake bite", 2, "done")
+        assert agent._step_prompts.size() == 2
+    finally:
+        set_backend(None)
+        registry.clear()
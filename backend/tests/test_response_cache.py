@@ -0,0 +1,80 @@
+import sys
+import os
+import asyncio
+import json
+import time
+
+import pytest
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agents.response_cache import ResponseCache, cached_response, set_response_cache
+from agents.triage_agent import TriageAgent
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return _Response(json.dumps({"accident_type": "bleeding", "severity": 3, "dispatch_ambulance": True, "reasoning": "cut"}))
+
+
+@pytest.fixture
+def cache():
+    metrics.reset()
+    cache = ResponseCache(max_bytes=1 << 20, similarity=0.5)
+    set_response_cache(cache)
+    yield cache
+    set_response_cache(None)
+
+
+def test_repeated_triage_is_served_from_cache(cache):
+    agent = TriageAgent()
+    agent.model = _CountingModel()
+
+    async def run():
+        first = await agent.analyze_async("I cut my hand and it's bleeding")
+        second = await agent.analyze_async("i cut my hand, and it's BLEEDING!")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert agent.model.calls == 1
+    assert metrics.get("response_cache_triage_hits_total") == 1
+    assert metrics.get("response_cache_saved_seconds_total") >= 0.01
+
+
+def test_lru_eviction_and_ttl(cache):
+    small = ResponseCache(max_bytes=600, ttls={"triage": 0.05})
+    for i in range(10):
+        small.put("triage", f"message number {i}", {"text": "x" * 40})
+    assert small.get("triage", "message number 0") is None
+    assert small.get("triage", "message number 9") == {"text": "x" * 40}
+    assert metrics.get("response_cache_bytes") <= 600
+
+    time.sleep(0.06)
+    assert small.get("triage", "message number 9") is None
+
+
+def test_similarity_tier_respects_negation(cache):
+    prompt = "bleeding | step 2 | my friend is bleeding a lot from the leg, should I lift the leg up"
+    cache.put("first_aid", prompt, {"instruction": "Yes, raise it."}, similar=True)
+
+    near = "bleeding | step 2 | my friend is bleeding a lot from his leg, should I lift the leg up"
+    negated = "bleeding | step 2 | my friend is not bleeding a lot from the leg, should I lift the leg up"
+    assert cache.get("first_aid", near, similar=True) == {"instruction": "Yes, raise it."}
+    assert cache.get("first_aid", negated, similar=True) is None
+    assert cache.get("first_aid", near) is None  # exact tier only
+
+    with pytest.raises(ValueError):
+        cached_response("ambulance", key=lambda *a: "x")
@@ -0,0 +1,84 @@
+import sys
+import os
+import asyncio
+import time
+import pytest
+from google.api_core import exceptions
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from utils import RateLimiter, retry_hint_seconds, retry_with_backoff
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_retry_hint_is_parsed_from_message():
+    assert retry_hint_seconds(exceptions.ResourceExhausted("Quota exceeded. Please retry in 1.5s.")) == 1.5
+    assert retry_hint_seconds(exceptions.ResourceExhausted("Quota exceeded")) is None
+
+
+def test_async_retry_does_not_block_event_loop():
+    limiter = RateLimiter(rate=1000, burst=1000, max_concurrency=4)
+    calls = []
+
+    @retry_with_backoff(retries=2, initial_delay=0.01, limiter=limiter)
+    async def flaky():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise exceptions.ResourceExhausted("Please retry in 0.05s")
+        return "ok"
+
+    async def ticker(ticks):
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks.append(1)
+
+    async def run():
+        ticks = []
+        result, _ = await asyncio.gather(flaky(), ticker(ticks))
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result == "ok"
+    assert len(ticks) == 10
+    assert calls[1] - calls[0] >= 0.05
+    assert metrics.get("llm_retries_total") == 2
+    assert metrics.get("llm_retry_hints_total") == 2
+
+
+def test_quota_error_trips_shared_cooldown():
+    limiter = RateLimiter(rate=1000, burst=1000, max_concurrency=4)
+
+    @retry_with_backoff(retries=0, limiter=limiter)
+    def always_exhausted():
+        raise exceptions.ResourceExhausted("Please retry in 30s")
+
+    @retry_with_backoff(retries=1, max_wait=5, limiter=limiter)
+    def other_agent():
+        raise exceptions.ResourceExhausted("Please retry in 30s")
+
+    with pytest.raises(exceptions.ResourceExhausted):
+        always_exhausted()
+    # Gives up immediately: the hinted delay exceeds the wait budget
+    with pytest.raises(exceptions.ResourceExhausted):
+        other_agent()
+    assert metrics.get("llm_retry_giveups_total") == 2
+
+    limiter.trip(60)
+    with pytest.raises(exceptions.ResourceExhausted, match="cooling down"):
+        other_agent()
+
+
+def test_token_bucket_spaces_out_callers():
+    limiter = RateLimiter(rate=10, burst=2, max_concurrency=4)
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits[0] == 0 and waits[1] == 0
+    assert waits[2] == pytest.approx(0.1, abs=0.02)
+    assert waits[3] == pytest.approx(0.2, abs=0.02)
@@ -0,0 +1,79 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+import google.ai.generativelanguage as glm
+from google.generativeai.types import generation_types
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agents import registry
+from agents.model_backend import set_backend
+from agents.response_cache import ResponseCache, set_response_cache
+from agents.schemas import DISPATCH, FIRST_AID, LOCATION, TRIAGE, TRIAGE_BATCH, SchemaError
+from agents.stub_model import StubBackend
+from agents.triage_agent import PARSE_FAILURE, TriageAgent
+
+
+def test_answers_are_decoded_validated_and_coerced():
+    fenced = '```json\n{"instruction": "Press on the wound.", "next_step_index": "2", "completed": false}\n```'
+    assert FIRST_AID.parse(fenced) == {"instruction": "Press on the wound.", "next_step_index": 2, "completed": False}
+    assert LOCATION.parse("null") is None
+    assert DISPATCH.parse('Dispatched: {"eta": 7.0, "dispatch_id": "D-9", "unit_id": "AMB-1"}')["eta"] == 7
+
+    for bad in ('{"accident_type": "burns", "severity": 0, "dispatch_ambulance": false}',
+                '{"accident_type": "burns", "severity": "high", "dispatch_ambulance": false}',
+                '{"accident_type": "burns", "dispatch_ambulance": false}',
+                "It looks like a burn."):
+        with pytest.raises(SchemaError):
+            TRIAGE.parse(bad)
+
+    # What is sent to the model is a schema the Gemini SDK accepts
+    for schema in (TRIAGE, TRIAGE_BATCH, LOCATION, DISPATCH, FIRST_AID):
+        glm.GenerationConfig(**generation_types.to_generation_config_dict(schema.generation_config))
+
+
+@pytest.fixture
+def stub_with(request):
+    backend = StubBackend(responses=request.param)
+    set_backend(backend)
+    registry.clear()
+    set_response_cache(ResponseCache(ttls={"triage": 0}))
+    metrics.reset()
+    yield backend
+    set_backend(None)
+    registry.clear()
+    set_response_cache(None)
+
+
+REPAIRED = json.dumps({"accident_type": "burns", "severity": 3, "dispatch_ambulance": True, "reasoning": "repaired"})
+
+
+@pytest.mark.parametrize("stub_with", [[
+    {"match": "does not match the required JSON schema", "text": REPAIRED},
+    {"match": "Triage Agent", "text": "Severity: high, it is a burn"},
+]], indirect=True)
+def test_invalid_answer_is_repaired_in_one_extra_round_trip(stub_with):
+    result = asyncio.run(TriageAgent().analyze_async("My hand is burnt"))
+
+    assert result["reasoning"] == "repaired"
+    assert stub_with.requests == 2
+    snapshot = metrics.snapshot()
+    assert snapshot["structured_triage_invalid_total"] == 1
+    assert snapshot["structured_triage_repairs_total"] == 1
+
+
+@pytest.mark.parametrize("stub_with", [[
+    {"match": "does not match the required JSON schema", "text": "still not JSON"},
+    {"match": "Triage Agent", "text": "Severity: high, it is a burn"},
+]], indirect=True)
+def test_failed_repair_falls_back_without_retrying_again(stub_with):
+    result = asyncio.run(TriageAgent().analyze_async("My hand is burnt"))
+
+    assert result["reasoning"] == PARSE_FAILURE
+    assert stub_with.requests == 2
+    assert metrics.snapshot()["structured_triage_repair_failures_total"] == 1
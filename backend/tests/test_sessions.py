@@ -0,0 +1,169 @@
+import sys
+import os
+import asyncio
+import socketserver
+import threading
+import time
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agents import registry
+from agents.supervisor_agent import SupervisorAgent
+from agents.triage_agent import TriageAgent
+from memory.backends import InMemoryBackend, RedisBackend, RedisProtocolClient, SQLiteBackend
+from memory.session import InMemorySessionService
+from memory.session_lock import SessionCoordinator
+from memory.session_service import InMemorySessionService as SessionStore
+
+
+def test_sessions_share_agents_and_models():
+    service = InMemorySessionService()
+    first = service.create_session()
+    second = service.create_session()
+
+    assert service.get_agent(first) is service.get_agent(second)
+    triage = registry.get_agent(TriageAgent)
+    assert triage.model is registry.get_model("gemini-2.0-flash", system_instruction=triage.system_instruction)
+    assert SessionStore.get_state(first) == SupervisorAgent.new_state()
+    assert SessionStore.get_state(first) is not SessionStore.get_state(second)
+
+
+def test_memory_backend_evicts_lru_and_expired():
+    backend = InMemoryBackend(ttl_seconds=0.05, max_entries=2)
+    backend.set("a", {"n": 1})
+    backend.set("b", {"n": 2})
+    backend.get("a")
+    backend.set("c", {"n": 3})
+
+    assert backend.get("b") is None
+    assert backend.get("a") == {"n": 1}
+    assert backend.size() == 2
+
+    time.sleep(0.06)
+    assert backend.get("a") is None
+    assert backend.purge_expired() == 1
+    assert backend.size() == 0
+
+
+def test_memory_backend_respects_byte_cap():
+    backend = InMemoryBackend(max_entries=1000, max_bytes=200)
+    for i in range(20):
+        backend.set(str(i), {"history": ["x" * 30]})
+    assert backend.nbytes() <= 200
+    assert backend.get("19") is not None
+    assert backend.get("0") is None
+
+
+def test_unknown_session_ids_are_not_stored():
+    SessionStore.configure(InMemoryBackend())
+    try:
+        for i in range(100):
+            assert SessionStore.get_state(f"random-{i}") == {}
+        assert SessionStore.size() == 0
+    finally:
+        SessionStore.configure(None)
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    backend = SQLiteBackend(path, max_entries=2)
+    backend.set("a", {"severity": 4})
+    backend.set("b", {"severity": 1})
+    backend.get("a")
+    backend.set("c", {"severity": 2})
+    backend.close()
+
+    reopened = SQLiteBackend(path)
+    assert reopened.get("a") == {"severity": 4}
+    assert reopened.get("b") is None
+    assert reopened.size() == 2
+    reopened.close()
+
+
+class _RedisStandIn(socketserver.StreamRequestHandler):
+    """Speaks just enough RESP for RedisBackend."""
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            command = args[0].upper()
+            now = time.monotonic()
+            for key in [k for k, (_, exp) in data.items() if exp <= now]:
+                del data[key]
+            if command == b"PING":
+                self.wfile.write(b"+PONG\r\n")
+            elif command == b"SET":
+                data[args[1]] = (args[2], now + int(args[4]))
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"GETEX":
+                if args[1] not in data:
+                    self.wfile.write(b"$-1\r\n")
+                    continue
+                value = data[args[1]][0]
+                data[args[1]] = (value, now + int(args[3]))
+                self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif command == b"DEL":
+                self.wfile.write(b":%d\r\n" % int(data.pop(args[1], None) is not None))
+            elif command == b"DBSIZE":
+                self.wfile.write(b":%d\r\n" % len(data))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+def test_redis_backend_against_stand_in():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RedisStandIn)
+    server.data = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"redis://127.0.0.1:{server.server_address[1]}/0"
+        backend = RedisBackend(RedisProtocolClient.from_url(url), ttl_seconds=60)
+        backend.set("a", {"location": {"address": "123 Main St"}})
+        assert backend.get("a") == {"location": {"address": "123 Main St"}}
+        assert backend.get("missing") is None
+        assert backend.size() == 1
+        backend.delete("a")
+        assert backend.size() == 0
+        backend.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_duplicate_messages_are_coalesced_and_sessions_serialized():
+    coordinator = SessionCoordinator(window_seconds=1)
+    calls = []
+    active = {"a": 0}
+    overlaps = []
+
+    async def handler(text):
+        calls.append(text)
+        active["a"] += 1
+        overlaps.append(active["a"])
+        await asyncio.sleep(0.02)
+        active["a"] -= 1
+        return f"reply to {text}"
+
+    async def run():
+        return await asyncio.gather(
+            coordinator.run("a", "I am bleeding", lambda: handler("I am bleeding")),
+            coordinator.run("a", "i am  BLEEDING", lambda: handler("I am bleeding")),
+            coordinator.run("a", "at 123 Main St", lambda: handler("at 123 Main St")),
+        )
+
+    before = metrics.get("session_coalesced_requests_total")
+    results = asyncio.run(run())
+
+    assert results[0] == results[1] == "reply to I am bleeding"
+    assert calls == ["I am bleeding", "at 123 Main St"]
+    assert max(overlaps) == 1
+    assert metrics.get("session_coalesced_requests_total") - before == 1
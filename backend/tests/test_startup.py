@@ -0,0 +1,40 @@
+import sys
+import os
+import asyncio
+import subprocess
+
+# Add backend to sys.path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from agents import registry
+from agents.model_backend import set_backend
+from agents.stub_model import StubBackend
+from agents.supervisor_agent import SupervisorAgent
+
+
+def test_importing_the_app_builds_no_models_and_skips_the_sdk():
+    probe = (
+        "import sys, main\n"
+        "from agents import registry\n"
+        "assert 'google.generativeai' not in sys.modules, 'SDK imported at startup'\n"
+        "assert 'agents.location_agent' not in sys.modules, 'agents imported at startup'\n"
+        "assert registry.models() == []\n"
+    )
+    env = dict(os.environ, MODEL_BACKEND="gemini", JOURNAL_DIR="", GOOGLE_API_KEY="")
+    result = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_warm_up_builds_every_agent_and_model():
+    set_backend(StubBackend())
+    registry.clear()
+    try:
+        supervisor = SupervisorAgent()
+        asyncio.run(supervisor.warm_up())
+        assert {"triage_agent", "first_aid_agent", "location_agent", "ambulance_agent"} <= vars(supervisor).keys()
+        # One per agent instruction, the dispatch phrasing model and the plain repair model
+        assert len(registry.models()) == 6
+    finally:
+        set_backend(None)
+        registry.clear()
@@ -0,0 +1,94 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.first_aid_agent import FirstAidAgent
+from agents.streaming import SentenceChunker
+from memory.session_service import InMemorySessionService
+from test_supervisor import make_supervisor
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _StreamingChat:
+    def __init__(self, pieces, delay):
+        self.pieces = pieces
+        self.delay = delay
+
+    async def send_message_async(self, prompt, stream=False):
+        async def generate():
+            for piece in self.pieces:
+                await asyncio.sleep(self.delay)
+                yield _Chunk(piece)
+        return generate()
+
+
+class _StreamingModel:
+    def __init__(self, pieces, delay=0.0):
+        self.pieces = pieces
+        self.delay = delay
+
+    def start_chat(self, history=None):
+        return _StreamingChat(self.pieces, self.delay)
+
+
+def streaming_first_aid(pieces, delay=0.0):
+    agent = FirstAidAgent()
+    agent.model = _StreamingModel(pieces, delay)
+    return agent
+
+
+def test_chunker_releases_whole_sentences():
+    chunker = SentenceChunker()
+    chunks = []
+    for char in "Call 911. Press hard on the wound, and keep pressing! Good":
+        chunks += chunker.feed(char)
+    assert chunks == ["Call 911.", "Press hard on the wound, and keep pressing!"]
+    assert chunker.flush() == ["Good"]
+
+
+def test_completion_marker_is_never_streamed():
+    agent = streaming_first_aid(["Keep the person ", "still. [COMP", "LETED]"])
+
+    async def collect():
+        return [item async for item in agent.stream_next_step_async("head injury", 2, "done")]
+
+    items = asyncio.run(collect())
+    assert "".join(i for i in items if isinstance(i, str)) == "Keep the person still. "
+    assert items[-1] == {"instruction": "Keep the person still.", "next_step_index": 3, "completed": True}
+
+
+def test_first_sentence_arrives_before_generation_ends():
+    supervisor = make_supervisor()
+    supervisor.first_aid_agent = streaming_first_aid(
+        ["Keep them lying ", "still and calm. ", "Hold a cold pack ", "against the swelling."], delay=0.05
+    )
+    session_id = "stream-test"
+    InMemorySessionService.update_state(session_id, {
+        "incident_started": True, "severity": 2, "injury_type": "head injury",
+        "ambulance_dispatched": False, "location": None, "step_index": 0,
+    })
+
+    async def collect():
+        start = time.perf_counter()
+        events = []
+        async for event, data in supervisor.stream_message("what do I do", session_id):
+            events.append((time.perf_counter() - start, event, data))
+        return events
+
+    try:
+        events = asyncio.run(collect())
+        chunks = [(t, data["text"]) for t, event, data in events if event == "chunk"]
+        assert chunks[0][1] == "Keep them lying still and calm."
+        assert chunks[0][0] < 0.15
+        assert events[-1][1] == "done"
+        assert InMemorySessionService.get_state(session_id)["step_index"] == 1
+    finally:
+        InMemorySessionService.delete_session(session_id)
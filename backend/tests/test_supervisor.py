@@ -0,0 +1,117 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agents.ambulance_agent import AmbulanceAgent
+from agents.supervisor_agent import SupervisorAgent
+from tools.dispatch_engine import DispatchEngine, Unit, set_dispatch_engine
+
+
+class FakeTriage:
+    def __init__(self, result, latency=0.0):
+        self.result = result
+        self.latency = latency
+
+    async def analyze_async(self, user_input):
+        await asyncio.sleep(self.latency)
+        return dict(self.result)
+
+
+class FakeLocation:
+    def __init__(self, result, latency=0.0):
+        self.result = result
+        self.latency = latency
+        self.calls = 0
+
+    async def extract_location_async(self, user_input, history=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self.result
+
+
+class FakeAmbulance:
+    def dispatch_direct(self, injury_type, location="Unknown location", lat=None, lon=None):
+        return {"eta": 7, "dispatch_id": "D-1", "timestamp": "now"}
+
+    async def dispatch_async(self, injury_type, location="Unknown location", lat=None, lon=None, history=None):
+        return {"eta": 7, "dispatch_id": "D-1", "timestamp": "now"}
+
+
+def make_supervisor(triage=None, location=None):
+    supervisor = SupervisorAgent()
+    supervisor.triage_agent = triage or FakeTriage({"accident_type": "unknown", "severity": 2})
+    supervisor.location_agent = location or FakeLocation(None)
+    supervisor.ambulance_agent = FakeAmbulance()
+    return supervisor
+
+
+def test_injury_and_address_in_first_message_dispatch_in_one_turn():
+    metrics.reset()
+    location = FakeLocation({"address": "123 Main St, Springfield", "lat": 1.0, "lon": 2.0}, latency=0.05)
+    supervisor = make_supervisor(location=location)
+    state = SupervisorAgent.new_state()
+
+    result = asyncio.run(supervisor.handle_message("I'm bleeding heavily at 123 Main St", state))
+
+    assert result["state"]["ambulance_dispatched"] is True
+    assert result["state"]["location"]["address"] == "123 Main St, Springfield"
+    assert "Ambulance dispatched (ID: D-1)" in result["response"]
+    assert metrics.get("speculative_triage_location_total") == 1
+    assert metrics.snapshot()["time_to_dispatch_seconds_count"] == 1
+
+
+def test_triage_and_location_run_concurrently():
+    triage = FakeTriage({"accident_type": "unknown", "severity": 3}, latency=0.1)
+    location = FakeLocation({"address": "Central Park", "lat": None, "lon": None}, latency=0.1)
+    supervisor = make_supervisor(triage=triage, location=location)
+    state = {"incident_started": True, "severity": None}
+
+    start = time.perf_counter()
+    result = asyncio.run(supervisor.handle_message("My friend fell near Central Park", state))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.18
+    assert result["state"]["ambulance_dispatched"] is True
+
+
+def test_greeting_still_starts_incident_without_triage():
+    location = FakeLocation(None)
+    supervisor = make_supervisor(location=location)
+    state = SupervisorAgent.new_state()
+
+    result = asyncio.run(supervisor.handle_message("Help, I had an accident", state))
+
+    assert "describe what happened" in result["response"].lower()
+    assert result["state"]["severity"] is None
+    assert location.calls == 0
+
+
+class _NoModel:
+    def start_chat(self, **kwargs):
+        raise AssertionError("direct dispatch must not call the model")
+
+
+def test_direct_dispatch_skips_the_model():
+    set_dispatch_engine(DispatchEngine([Unit("AMB-1", 17.40, 78.48), Unit("AMB-2", 17.60, 78.60)]))
+    try:
+        supervisor = make_supervisor()
+        supervisor.dispatch_mode = "direct"
+        supervisor.ambulance_agent = AmbulanceAgent()
+        supervisor.ambulance_agent.model = _NoModel()
+        state = {"incident_started": True, "severity": 4, "injury_type": "bleeding",
+                 "location": {"address": "Abids", "lat": "17.39", "lon": "78.47"}}
+
+        start = time.perf_counter()
+        result = asyncio.run(supervisor.handle_message("please hurry", state))
+
+        assert time.perf_counter() - start < 0.05
+        assert result["state"]["dispatch_unit"] == "AMB-1"
+        assert result["state"]["dispatch_eta"] >= 1
+        assert "Ambulance dispatched" in result["response"]
+    finally:
+        set_dispatch_engine(None)
@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+import tracing
+from memory.session_service import InMemorySessionService
+from test_supervisor import FakeLocation, FakeTriage, make_supervisor
+
+
+@pytest.fixture(autouse=True)
+def sampling():
+    previous = tracing.SAMPLE_RATE
+    metrics.reset()
+    tracing.clear()
+    yield
+    tracing.set_sample_rate(previous)
+    tracing.clear()
+
+
+def run_critical_message(session_id):
+    supervisor = make_supervisor(
+        triage=FakeTriage({"accident_type": "bleeding", "severity": 4}),
+        location=FakeLocation({"address": "123 Main St", "lat": 1.0, "lon": 2.0}),
+    )
+    InMemorySessionService.update_state(session_id, {"incident_started": True, "severity": None, "history": []})
+    try:
+        asyncio.run(supervisor.process_message("I'm bleeding heavily at 123 Main St", session_id))
+    finally:
+        InMemorySessionService.delete_session(session_id)
+
+
+def test_sampled_message_records_a_span_tree():
+    tracing.set_sample_rate(1.0)
+    run_critical_message("trace-sampled")
+
+    [trace] = tracing.recent_traces()
+    spans = {span["name"]: span for span in trace}
+    root = spans["message"]
+    assert root["parent_span_id"] is None
+    assert root["attributes"]["ambulance_dispatched"] is True
+    for stage in ("intent", "triage", "location", "dispatch"):
+        assert spans[stage]["trace_id"] == root["trace_id"]
+        assert spans[stage]["parent_span_id"] == root["span_id"]
+    assert spans["dispatch"]["attributes"]["dispatch_id"] == "D-1"
+
+
+def test_unsampled_messages_still_time_every_stage():
+    tracing.set_sample_rate(0.0)
+    run_critical_message("trace-unsampled")
+
+    assert tracing.recent_traces() == []
+    snapshot = metrics.snapshot()
+    for stage in ("message", "intent", "triage", "location", "dispatch"):
+        assert snapshot[f"span_{stage}_seconds_count"] == 1
+
+
+def test_metrics_endpoint_speaks_prometheus_and_json():
+    import main
+
+    metrics.incr("dispatch_direct_total")
+    metrics.observe("span_triage_seconds", 0.25)
+    client = TestClient(main.app)
+
+    text = client.get("/metrics").text
+    assert "# TYPE dispatch_direct_total counter\ndispatch_direct_total 1.0" in text
+    assert 'span_triage_seconds{quantile="0.99"} 0.25' in text
+    assert "# TYPE session_store_entries gauge" in text
+    assert client.get("/metrics?format=json").json()["span_triage_seconds_count"] == 1
@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.registry import get_agent
+from agents.response_cache import ResponseCache, set_response_cache
+from agents.stub_model import StubBackend, StubResponse
+from agents.triage_agent import TriageAgent
+from agents.triage_batch import TriageBatch
+
+
+class _ForgetfulBackend(StubBackend):
+    """Packed answers drop the last message, as a model sometimes does."""
+
+    def respond(self, model, content):
+        response = super().respond(model, content)
+        results = json.loads(response.text)
+        return StubResponse(json.dumps(results[:-1])) if isinstance(results, list) else response
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    set_response_cache(ResponseCache())
+    yield
+    set_response_cache(None)
+
+
+def stub_agent(backend):
+    agent = TriageAgent()
+    agent.model = backend.create("gemini-2.0-flash", system_instruction=agent.system_instruction)
+    return agent
+
+
+def test_packs_utterances_and_retries_what_the_model_skipped():
+    backend = _ForgetfulBackend()
+    batch = TriageBatch(agent=stub_agent(backend), concurrency=2, pack_size=4, use_rules=False)
+    lines = [json.dumps({"id": f"call-{i}", "text": f"He has a broken arm, call {i}", "severity": 3})
+             for i in range(8)]
+    lines.insert(3, "not json")
+
+    async def collect():
+        return [result async for result in batch.run(lines)]
+
+    results = asyncio.run(collect())
+    triaged = {r["id"]: r for r in results if "error" not in r}
+    assert set(triaged) == {f"call-{i}" for i in range(8)}
+    assert all(r["accident_type"] == "fracture" for r in triaged.values())
+    assert [r for r in results if "error" in r] == [{"id": 4, "error": "line 4: invalid JSON (Expecting value)"}]
+    # Two packed requests plus one single retry per pack for the dropped message
+    assert backend.requests == 4
+    stats = batch.stats()
+    assert stats["utterances"] == 8 and stats["errors"] == 1 and stats["model_requests"] == 2
+    assert stats["labeled"] == 8
+
+
+def test_batch_endpoint_streams_jsonl_and_stats():
+    import main
+
+    agent = get_agent(TriageAgent)
+    original = agent.model
+    agent.model = StubBackend().create("gemini-2.0-flash", system_instruction=agent.system_instruction)
+    body = "\n".join([
+        json.dumps({"id": "a", "text": "My dad collapsed and is not breathing"}),
+        json.dumps({"id": "b", "text": "I feel a bit dizzy"}),
+        json.dumps({"id": "c", "text": "my wrist hurts after a fall"}),
+    ])
+    try:
+        response = TestClient(main.app).post("/triage/batch?pack_size=2", content=body)
+    finally:
+        agent.model = original
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results = {line["id"]: line for line in lines[:-1]}
+    assert results["a"]["severity"] == 5 and results["a"]["source"] == "rules"
+    assert results["b"]["source"] == "llm"
+    stats = lines[-1]["stats"]
+    assert stats["utterances"] == 3
+    assert sum(stats["severity_distribution"].values()) == 3
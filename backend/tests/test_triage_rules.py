@@ -0,0 +1,51 @@
+import sys
+import os
+import asyncio
+
+# Add backend to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.supervisor_agent import SupervisorAgent
+from agents.triage_rules import get_rules
+
+
+def test_clear_cut_cases_are_confident():
+    rules = get_rules()
+    result = rules.analyze("My dad collapsed and is not breathing")
+    assert result["severity"] == 5
+    assert result["accident_type"] == "cardiac arrest"
+    assert result["confidence"] >= 0.9
+
+    result = rules.analyze("I am bleeding heavily from a deep cut on my leg")
+    assert result["severity"] == 4
+    assert result["dispatch_ambulance"] is True
+
+
+def test_negated_findings_are_ignored():
+    rules = get_rules()
+    assert rules.analyze("he is not bleeding") is None
+    assert rules.analyze("Doesn't look like a fracture, just a bruise")["severity"] == 1
+    assert not rules.has_severe_finding("she is not unconscious")
+    assert rules.has_severe_finding("he is unconscious")
+
+
+def test_supervisor_skips_llm_for_confident_triage():
+    supervisor = SupervisorAgent()
+    calls = []
+
+    class FakeTriage:
+        async def analyze_async(self, user_input):
+            calls.append(user_input)
+            return {"accident_type": "unknown", "severity": 2}
+
+    supervisor.triage_agent = FakeTriage()
+    state = {"incident_started": True}
+
+    result = asyncio.run(supervisor.handle_message("He's not breathing!", state))
+    assert result["state"]["severity"] == 5
+    assert calls == []
+
+    state = {"incident_started": True}
+    result = asyncio.run(supervisor.handle_message("Something happened to my friend", state))
+    assert result["state"]["severity"] == 2
+    assert calls == ["Something happened to my friend"]
@@ -0,0 +1,256 @@
+"""
+Ambulance fleet state and nearest-unit dispatch.
+
+Available units are kept in a fixed-degree grid so a k-nearest query only
+looks at the cells around the incident, searching outward ring by ring.
+ETAs come from great-circle distance, a road-network detour factor and an
+average response speed. Picking a unit and marking it busy happen under one
+lock, so concurrent dispatches never get the same unit.
+"""
+import csv
+import heapq
+import math
+import os
+import random
+import threading
+import time
+import uuid
+
+import metrics
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Unit:
+    __slots__ = ("unit_id", "lat", "lon", "available", "dispatch_id")
+
+    def __init__(self, unit_id: str, lat: float, lon: float):
+        self.unit_id = unit_id
+        self.lat = lat
+        self.lon = lon
+        self.available = True
+        self.dispatch_id = None
+
+
+class DispatchEngine:
+    def __init__(self, units, cell_degrees: float = 0.02, speed_kmh: float = 40.0,
+                 road_factor: float = 1.3, turnout_minutes: float = 1.0,
+                 auto_release_seconds: float = 3600.0, max_rings: int = 100):
+        self.cell_degrees = cell_degrees
+        self.speed_kmh = speed_kmh
+        self.road_factor = road_factor
+        self.turnout_minutes = turnout_minutes
+        self.auto_release_seconds = auto_release_seconds
+        self.max_rings = max_rings
+
+        self._lock = threading.Lock()
+        self._units = {}
+        self._grid = {}
+        self._available = 0
+        # (release_at, dispatch_id, unit_id) for units that never got an explicit release
+        self._release_heap = []
+        for unit in units:
+            self._units[unit.unit_id] = unit
+            self._grid_add(unit)
+        count = max(1, len(self._units))
+        # Fallback incident position when the caller's location has no coordinates
+        self.center = (
+            sum(unit.lat for unit in self._units.values()) / count,
+            sum(unit.lon for unit in self._units.values()) / count,
+        )
+        self._publish_gauges()
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs):
+        """Loads a fleet from a CSV with unit_id, lat, lon columns."""
+        with open(path, newline="", encoding="utf-8") as f:
+            units = [Unit(row["unit_id"], float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)]
+        return cls(units, **kwargs)
+
+    @classmethod
+    def synthetic(cls, size: int, center=(17.385, 78.4867), radius_km: float = 25.0, seed: int = None, **kwargs):
+        """A fleet spread uniformly over a disc around `center`, for demos and benchmarks."""
+        rng = random.Random(seed)
+        lat0, lon0 = center
+        units = []
+        for i in range(size):
+            distance = radius_km * math.sqrt(rng.random())
+            bearing = rng.random() * 2 * math.pi
+            lat = lat0 + math.degrees(distance * math.cos(bearing) / EARTH_RADIUS_KM)
+            lon = lon0 + math.degrees(distance * math.sin(bearing) / EARTH_RADIUS_KM) / math.cos(math.radians(lat0))
+            units.append(Unit(f"AMB-{i + 1:04d}", lat, lon))
+        return cls(units, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Spatial index
+    # ------------------------------------------------------------------
+    def _cell(self, lat: float, lon: float):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _grid_add(self, unit: Unit):
+        self._grid.setdefault(self._cell(unit.lat, unit.lon), set()).add(unit.unit_id)
+        self._available += 1
+
+    def _grid_remove(self, unit: Unit):
+        cell = self._cell(unit.lat, unit.lon)
+        members = self._grid.get(cell)
+        if members is not None and unit.unit_id in members:
+            members.remove(unit.unit_id)
+            self._available -= 1
+            if not members:
+                del self._grid[cell]
+
+    def _nearest_locked(self, lat: float, lon: float, k: int):
+        k = min(k, self._available)
+        if k <= 0:
+            return []
+        row, col = self._cell(lat, lon)
+        # Lower bound on the distance covered by one cell, for the stopping rule
+        cell_km = math.radians(self.cell_degrees) * EARTH_RADIUS_KM * min(1.0, math.cos(math.radians(lat)))
+        best = []  # max-heap of (-distance, unit_id), k long
+        for ring in range(self.max_rings + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if ring and abs(r - row) != ring and abs(c - col) != ring:
+                        continue
+                    for unit_id in self._grid.get((r, c), ()):
+                        unit = self._units[unit_id]
+                        distance = haversine_km(lat, lon, unit.lat, unit.lon)
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, unit_id))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, unit_id))
+            # Anything in a further ring is at least `ring` cells away (or every
+            # available unit has already been seen)
+            if len(best) == k and (k == self._available or -best[0][0] <= ring * cell_km):
+                break
+        return sorted((-d, unit_id) for d, unit_id in best)
+
+    # ------------------------------------------------------------------
+    # Queries and assignment
+    # ------------------------------------------------------------------
+    def eta_minutes(self, distance_km: float) -> int:
+        return max(1, math.ceil(self.turnout_minutes + distance_km * self.road_factor / self.speed_kmh * 60))
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        """The k closest available units as dicts, closest first. Nothing is reserved."""
+        with self._lock:
+            found = self._nearest_locked(lat, lon, k)
+            return [self._describe(self._units[unit_id], distance) for distance, unit_id in found]
+
+    def assign(self, lat: float, lon: float, incident: str = None):
+        """
+        Reserves the closest available unit for an incident at (lat, lon).
+        Returns the dispatch record, or None if no unit is available.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._release_overdue_locked()
+            found = self._nearest_locked(lat, lon, 1)
+            if not found:
+                metrics.incr("dispatch_no_unit_total")
+                return None
+            distance, unit_id = found[0]
+            unit = self._units[unit_id]
+            self._grid_remove(unit)
+            unit.available = False
+            unit.dispatch_id = dispatch_id = str(uuid.uuid4())
+            heapq.heappush(self._release_heap, (time.time() + self.auto_release_seconds, dispatch_id, unit_id))
+            record = self._describe(unit, distance)
+            self._publish_gauges()
+
+        record["dispatch_id"] = dispatch_id
+        record["incident"] = incident
+        metrics.incr("dispatch_assignments_total")
+        metrics.observe("dispatch_assign_seconds", time.perf_counter() - start)
+        return record
+
+    def release(self, unit_id: str, lat: float = None, lon: float = None):
+        """Returns a unit to service, optionally at a new position (e.g. the hospital)."""
+        with self._lock:
+            unit = self._units[unit_id]
+            if unit.available:
+                self._grid_remove(unit)
+            if lat is not None and lon is not None:
+                unit.lat, unit.lon = lat, lon
+            unit.available = True
+            unit.dispatch_id = None
+            self._grid_add(unit)
+            self._publish_gauges()
+
+    def update_position(self, unit_id: str, lat: float, lon: float):
+        with self._lock:
+            unit = self._units[unit_id]
+            if unit.available:
+                self._grid_remove(unit)
+                unit.lat, unit.lon = lat, lon
+                self._grid_add(unit)
+            else:
+                unit.lat, unit.lon = lat, lon
+
+    def available_count(self) -> int:
+        with self._lock:
+            return self._available
+
+    def _release_overdue_locked(self):
+        now = time.time()
+        while self._release_heap and self._release_heap[0][0] <= now:
+            _, dispatch_id, unit_id = heapq.heappop(self._release_heap)
+            unit = self._units[unit_id]
+            # Skip entries for units that were released (and maybe re-dispatched) since
+            if not unit.available and unit.dispatch_id == dispatch_id:
+                unit.available = True
+                unit.dispatch_id = None
+                self._grid_add(unit)
+
+    def _describe(self, unit: Unit, distance_km: float) -> dict:
+        return {
+            "unit_id": unit.unit_id,
+            "unit_lat": unit.lat,
+            "unit_lon": unit.lon,
+            "distance_km": round(distance_km, 2),
+            "eta": self.eta_minutes(distance_km),
+        }
+
+    def _publish_gauges(self):
+        metrics.set_gauge("fleet_units_available", self._available)
+        metrics.set_gauge("fleet_units_busy", len(self._units) - self._available)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_dispatch_engine() -> DispatchEngine:
+    """
+    Returns the process-wide engine. The fleet comes from FLEET_PATH if set,
+    otherwise a synthetic fleet of FLEET_SIZE units around FLEET_CENTER.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                kwargs = {
+                    "speed_kmh": float(os.getenv("FLEET_SPEED_KMH", "40")),
+                    "auto_release_seconds": float(os.getenv("FLEET_AUTO_RELEASE_SECONDS", "3600")),
+                }
+                path = os.getenv("FLEET_PATH")
+                if path:
+                    _engine = DispatchEngine.from_csv(path, **kwargs)
+                else:
+                    lat, lon = (float(v) for v in os.getenv("FLEET_CENTER", "17.385,78.4867").split(","))
+                    _engine = DispatchEngine.synthetic(int(os.getenv("FLEET_SIZE", "200")), center=(lat, lon), seed=0, **kwargs)
+    return _engine
+
+
+def set_dispatch_engine(engine: DispatchEngine):
+    global _engine
+    _engine = engine
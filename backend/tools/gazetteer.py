@@ -0,0 +1,221 @@
+"""
+Offline gazetteer geocoder.
+
+A CSV of named places (name, lat, lon[, kind]) for the service area is
+compiled once into a compact binary index that is memory-mapped on load:
+
+    header   b"GZX1" | count (uint32) | names blob size (uint32)
+    lat      float64[count]
+    lon      float64[count]
+    offsets  uint32[count + 1]   (into the names blob)
+    names    utf-8 bytes, "name\\x1fkind" per place
+
+Name lookups go through an exact-match table and then a trigram index for
+fuzzy matches; reverse lookups use a fixed-degree grid. Everything is local,
+so location resolution keeps working when the network is degraded.
+"""
+import csv
+import heapq
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import defaultdict
+
+from tools.geocode_cache import normalize_query
+
+MAGIC = b"GZX1"
+_HEADER = struct.Struct("<4sII")
+_SEPARATOR = "\x1f"
+_VERIFY_CANDIDATES = 32
+_MIN_CANDIDATE_GRAMS = 4
+_POSTING_BUDGET = 4000
+
+
+def compile_csv(csv_path: str, index_path: str) -> int:
+    """Compiles a gazetteer CSV into the binary index format. Returns the place count."""
+    lats, lons, offsets, blob = array("d"), array("d"), array("I", [0]), bytearray()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            name = row["name"].strip()
+            if not name:
+                continue
+            lats.append(float(row["lat"]))
+            lons.append(float(row["lon"]))
+            blob += f"{name}{_SEPARATOR}{row.get('kind') or ''}".encode("utf-8")
+            offsets.append(len(blob))
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(lats), len(blob)))
+        lats.tofile(f)
+        lons.tofile(f)
+        offsets.tofile(f)
+        f.write(blob)
+    os.replace(tmp_path, index_path)
+    return len(lats)
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    def __init__(self, index_path: str, cell_degrees: float = 0.01, min_score: float = 0.45):
+        self.index_path = index_path
+        self.cell_degrees = cell_degrees
+        self.min_score = min_score
+
+        self._file = open(index_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, blob_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path} is not a gazetteer index")
+        self.count = count
+
+        view = memoryview(self._mmap)
+        position = _HEADER.size
+        self._lat = view[position:position + 8 * count].cast("d")
+        position += 8 * count
+        self._lon = view[position:position + 8 * count].cast("d")
+        position += 8 * count
+        self._offsets = view[position:position + 4 * (count + 1)].cast("I")
+        position += 4 * (count + 1)
+        self._names = view[position:position + blob_size]
+
+        self._build_indexes()
+
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        """Loads an index, compiling it first if `path` is a CSV newer than its index."""
+        if path.endswith(".csv"):
+            index_path = path[:-4] + ".gzx"
+            if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+                compile_csv(path, index_path)
+            path = index_path
+        return cls(path, **kwargs)
+
+    def _build_indexes(self):
+        exact = {}
+        postings = defaultdict(lambda: array("I"))
+        grid = defaultdict(lambda: array("I"))
+        gram_counts = array("H")
+        for place_id in range(self.count):
+            key = normalize_query(self.name(place_id))
+            exact.setdefault(key, place_id)
+            grams = _trigrams(key)
+            gram_counts.append(min(len(grams), 65535))
+            for gram in grams:
+                postings[gram].append(place_id)
+            grid[self._cell(self._lat[place_id], self._lon[place_id])].append(place_id)
+        self._exact = exact
+        self._gram_counts = gram_counts
+        self._postings = dict(postings)
+        self._grid = dict(grid)
+
+    def _cell(self, lat: float, lon: float):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _record(self, place_id: int):
+        raw = bytes(self._names[self._offsets[place_id]:self._offsets[place_id + 1]]).decode("utf-8")
+        return raw.split(_SEPARATOR, 1)
+
+    def name(self, place_id: int) -> str:
+        return self._record(place_id)[0]
+
+    def place(self, place_id: int, score: float = 1.0) -> dict:
+        name, kind = self._record(place_id)
+        return {
+            "lat": self._lat[place_id],
+            "lon": self._lon[place_id],
+            "display_name": name,
+            "kind": kind or None,
+            "osm_id": None,
+            "score": round(score, 3),
+            "source": "gazetteer",
+        }
+
+    def search(self, query: str, limit: int = 1) -> list:
+        """Best matching places for a free-text name, most similar first."""
+        key = normalize_query(query)
+        if not key:
+            return []
+        place_id = self._exact.get(key)
+        if place_id is not None:
+            return [self.place(place_id)]
+
+        query_grams = _trigrams(key)
+        # Candidates come from the rarest trigrams first, within a posting
+        # budget: a typo only breaks the few trigrams around it, so the rare
+        # ones that survive still single out the intended place
+        ordered = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+        shared = defaultdict(int)
+        scanned = 0
+        for position, gram in enumerate(ordered):
+            postings = self._postings.get(gram, ())
+            if position >= _MIN_CANDIDATE_GRAMS and scanned + len(postings) > _POSTING_BUDGET:
+                break
+            scanned += len(postings)
+            for candidate in postings:
+                shared[candidate] += 1
+        if not shared:
+            return []
+
+        # Verify only the candidates sharing the most rare trigrams
+        scored = []
+        for candidate in heapq.nlargest(_VERIFY_CANDIDATES, shared, key=shared.get):
+            common = len(query_grams & _trigrams(normalize_query(self.name(candidate))))
+            # Jaccard similarity over trigram sets
+            score = common / (len(query_grams) + self._gram_counts[candidate] - common)
+            if score >= self.min_score:
+                scored.append((score, candidate))
+        scored.sort(reverse=True)
+        return [self.place(candidate, score) for score, candidate in scored[:limit]]
+
+    def nearest(self, lat: float, lon: float, max_rings: int = 50):
+        """Closest named place to a coordinate, searching outward ring by ring."""
+        row, col = self._cell(lat, lon)
+        lon_scale = math.cos(math.radians(lat))
+        best, best_distance = None, float("inf")
+        for ring in range(max_rings + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if ring and abs(r - row) != ring and abs(c - col) != ring:
+                        continue
+                    for place_id in self._grid.get((r, c), ()):
+                        distance = (self._lat[place_id] - lat) ** 2 + ((self._lon[place_id] - lon) * lon_scale) ** 2
+                        if distance < best_distance:
+                            best, best_distance = place_id, distance
+            # Anything in a further ring is at least `ring` cells away
+            if best is not None and math.sqrt(best_distance) <= ring * self.cell_degrees * min(1.0, lon_scale):
+                break
+        return self.place(best) if best is not None else None
+
+    def close(self):
+        for view in (self._lat, self._lon, self._offsets, self._names):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Returns the gazetteer configured by GAZETTEER_PATH, or None if there is none."""
+    global _gazetteer
+    path = os.getenv("GAZETTEER_PATH")
+    if _gazetteer is None and path:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load(path)
+    return _gazetteer
+
+
+def set_gazetteer(gazetteer):
+    global _gazetteer
+    _gazetteer = gazetteer
@@ -1,40 +1,134 @@
+import os
+
+import httpx
 import requests
 
+import metrics
+import tracing
+from tools.gazetteer import get_gazetteer
+from tools.geocode_cache import GeocodeCache
+from tools.http_client import CircuitOpenError, get_http_client
+from utils import RateLimitExceeded
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODE_TIMEOUT = (3.05, 5)  # (connect, read) seconds
+
+# One keep-alive session for every lookup instead of a new connection per call
+_session = requests.Session()
+_session.headers.update({"User-Agent": "AgentBeforeAmbulance/1.0"})
+
+_cache = None
+
+
+def get_cache() -> GeocodeCache:
+    global _cache
+    if _cache is None:
+        _cache = GeocodeCache(
+            path=os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.db") or None,
+            max_entries=int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "4096")),
+            negative_ttl_seconds=float(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", "3600")),
+        )
+    return _cache
+
+
+def set_cache(cache: GeocodeCache):
+    global _cache
+    _cache = cache
+
+
 def reverse_geocode(location_text: str) -> dict:
     """
     Geocodes a location string using OpenStreetMap Nominatim API.
-    
+
     Args:
         location_text: The address or location description to geocode.
-        
+
     Returns:
         A dictionary containing the geocoded information (lat, lon, display_name) or an error.
     """
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
+    with tracing.span("geocode") as span:
+        local = _lookup_gazetteer(location_text)
+        if local is not None:
+            span.set(source="gazetteer")
+            return local
+
+        cache = get_cache()
+        cached = cache.get(location_text)
+        if cached is not None:
+            span.set(source="cache")
+            return cached
+
+        span.set(source="nominatim")
+        try:
+            response = _session.get(NOMINATIM_URL, params=_params(location_text), timeout=GEOCODE_TIMEOUT)
+            response.raise_for_status()
+            result = _to_result(response.json())
+            cache.put(location_text, result)
+            return result
+
+        except requests.RequestException as e:
+            # Transient failures are not cached
+            return {"error": f"Geocoding failed: {str(e)}"}
+
+
+async def reverse_geocode_async(location_text: str) -> dict:
+    """
+    Non-blocking reverse_geocode() for the async request path. Goes through the
+    shared HTTP client, so it is pooled, timeout-bounded, rate limited to
+    Nominatim's policy and short-circuited while the upstream is failing.
+    """
+    with tracing.span("geocode") as span:
+        local = _lookup_gazetteer(location_text)
+        if local is not None:
+            span.set(source="gazetteer")
+            return local
+
+        cache = get_cache()
+        cached = cache.get(location_text)
+        if cached is not None:
+            span.set(source="cache")
+            return cached
+
+        span.set(source="nominatim")
+        try:
+            response = await get_http_client().get(NOMINATIM_URL, params=_params(location_text))
+            response.raise_for_status()
+            result = _to_result(response.json())
+            cache.put(location_text, result)
+            return result
+
+        except (httpx.HTTPError, CircuitOpenError, RateLimitExceeded) as e:
+            return {"error": f"Geocoding failed: {str(e)}"}
+
+
+def _lookup_gazetteer(location_text: str):
+    """Resolves against the offline gazetteer, if one is configured; None on a miss."""
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    matches = gazetteer.search(location_text)
+    if matches:
+        metrics.incr("gazetteer_hits_total")
+        return matches[0]
+    metrics.incr("gazetteer_misses_total")
+    return None
+
+
+def _params(location_text: str) -> dict:
+    return {
         "q": location_text,
         "format": "json",
         "limit": 1
     }
-    headers = {
-        "User-Agent": "AgentBeforeAmbulance/1.0"
-    }
-    
-    try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data:
-            result = data[0]
-            return {
-                "lat": result.get("lat"),
-                "lon": result.get("lon"),
-                "display_name": result.get("display_name"),
-                "osm_id": result.get("osm_id")
-            }
-        else:
-            return {"error": "Location not found"}
-            
-    except requests.RequestException as e:
-        return {"error": f"Geocoding failed: {str(e)}"}
+
+
+def _to_result(data: list) -> dict:
+    if data:
+        result = data[0]
+        return {
+            "lat": result.get("lat"),
+            "lon": result.get("lon"),
+            "display_name": result.get("display_name"),
+            "osm_id": result.get("osm_id")
+        }
+    return {"error": "Location not found"}
@@ -0,0 +1,131 @@
+"""
+Two-tier cache for geocoding results.
+
+Queries are normalized (case, whitespace, punctuation, common street
+abbreviations) so "123 Main St." and "123 main street" share one entry.
+Hot entries live in an in-memory LRU; everything is persisted to SQLite so
+repeat addresses survive restarts. "Not found" results are cached too, with
+a shorter TTL, so a bad address does not keep hitting the upstream.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+_ABBREVIATIONS = {
+    "st": "street", "ave": "avenue", "av": "avenue", "rd": "road", "blvd": "boulevard",
+    "dr": "drive", "ln": "lane", "ct": "court", "pl": "place", "hwy": "highway",
+    "pkwy": "parkway", "sq": "square", "mt": "mount", "ft": "fort",
+    "n": "north", "s": "south", "e": "east", "w": "west",
+    "ne": "northeast", "nw": "northwest", "se": "southeast", "sw": "southwest",
+    "hosp": "hospital", "univ": "university", "apt": "apartment",
+}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(text: str) -> str:
+    tokens = _TOKEN.findall(text.lower())
+    return " ".join(_ABBREVIATIONS.get(token, token) for token in tokens)
+
+
+class GeocodeCache:
+    def __init__(self, path: str = None, max_entries: int = 4096, ttl_seconds: float = 30 * 24 * 3600,
+                 negative_ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._memory = OrderedDict()  # key -> (result, expires_at)
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, query: str):
+        """Returns the cached result dict for `query`, or None on a miss."""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self._record_hit("memory", entry[0])
+                return entry[0]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT result, expires_at FROM geocode WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result, row[1])
+                    self._record_hit("disk", result)
+                    return result
+
+        metrics.incr("geocode_cache_misses_total")
+        self._publish_hit_rate()
+        return None
+
+    def put(self, query: str, result: dict):
+        """
+        Caches a successful or "not found" result. Transient failures should
+        not be cached; callers only pass definitive answers.
+        """
+        key = normalize_query(query)
+        ttl = self.negative_ttl_seconds if self.is_negative(result) else self.ttl_seconds
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, result, expires_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO geocode (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), expires_at),
+                )
+
+    @staticmethod
+    def is_negative(result: dict) -> bool:
+        return result.get("error") == "Location not found"
+
+    def _remember(self, key: str, result: dict, expires_at: float):
+        self._memory[key] = (result, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, tier: str, result: dict):
+        metrics.incr(f"geocode_cache_{tier}_hits_total")
+        if self.is_negative(result):
+            metrics.incr("geocode_cache_negative_hits_total")
+        self._publish_hit_rate()
+
+    @staticmethod
+    def _publish_hit_rate():
+        hits = metrics.get("geocode_cache_memory_hits_total") + metrics.get("geocode_cache_disk_hits_total")
+        total = hits + metrics.get("geocode_cache_misses_total")
+        metrics.set_gauge("geocode_cache_hit_rate", hits / total if total else 0.0)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._memory.items() if expires_at <= now]
+            for key in expired:
+                del self._memory[key]
+            if self._conn is not None:
+                return self._conn.execute("DELETE FROM geocode WHERE expires_at <= ?", (now,)).rowcount
+        return len(expired)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
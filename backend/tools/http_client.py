@@ -0,0 +1,171 @@
+"""
+Shared async HTTP client for external tools.
+
+One keep-alive connection pool per event loop, connect/read timeouts on every
+request, and per-host policies: a rate limiter (which also caps concurrency)
+and a circuit breaker. A slow or failing upstream makes its own calls fail
+fast instead of tying up the request that is waiting on it.
+"""
+import asyncio
+import os
+import threading
+import time
+import weakref
+from urllib.parse import urlparse
+
+import httpx
+
+import metrics
+from utils import RateLimiter, RateLimitExceeded
+
+
+class CircuitOpenError(Exception):
+    """Raised while a host's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one probe request is let through (half-open),
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def cancel_probe(self):
+        """Releases a half-open probe that never reached the host."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class HostPolicy:
+    def __init__(self, rate: float = 50.0, burst: int = 50, max_concurrency: int = 20, max_queue_wait: float = 2.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.limiter = RateLimiter(rate=rate, burst=burst, max_concurrency=max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_queue_wait = max_queue_wait
+
+
+class AsyncHTTPClient:
+    def __init__(self, connect_timeout: float = 3.0, read_timeout: float = 5.0, max_connections: int = 100,
+                 max_keepalive: int = 20, user_agent: str = "AgentBeforeAmbulance/1.0"):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.headers = {"User-Agent": user_agent}
+        self._policies = {}
+        self._clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+    def set_policy(self, host: str, policy: HostPolicy):
+        self._policies[host] = policy
+
+    def policy(self, host: str) -> HostPolicy:
+        policy = self._policies.get(host)
+        if policy is None:
+            policy = self._policies[host] = HostPolicy()
+        return policy
+
+    def _client(self) -> httpx.AsyncClient:
+        # httpx pools are bound to the loop that created them
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, headers=self.headers)
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlparse(url).netloc
+        policy = self.policy(host)
+        if not policy.breaker.allow():
+            metrics.incr("http_circuit_open_rejections_total")
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        try:
+            async with policy.limiter.acquire_async(max_wait=policy.max_queue_wait):
+                start = time.perf_counter()
+                response = await self._client().request(method, url, **kwargs)
+                metrics.observe("http_request_seconds", time.perf_counter() - start)
+        except RateLimitExceeded:
+            metrics.incr("http_rate_limited_total")
+            policy.breaker.cancel_probe()
+            raise
+        except httpx.HTTPError:
+            metrics.incr("http_errors_total")
+            policy.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500 or response.status_code == 429:
+            metrics.incr("http_errors_total")
+            policy.breaker.record_failure()
+        else:
+            policy.breaker.record_success()
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self):
+        for client in list(self._clients.values()):
+            await client.aclose()
+        self._clients.clear()
+
+
+_client = None
+
+
+def get_http_client() -> AsyncHTTPClient:
+    """Returns the process-wide client, with Nominatim's usage policy pre-registered."""
+    global _client
+    if _client is None:
+        _client = AsyncHTTPClient(
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "3")),
+            read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "5")),
+        )
+        # Nominatim allows at most one request per second from a client
+        _client.set_policy("nominatim.openstreetmap.org", HostPolicy(
+            rate=float(os.getenv("NOMINATIM_RATE_PER_SEC", "1")), burst=1, max_concurrency=1,
+            max_queue_wait=float(os.getenv("NOMINATIM_MAX_QUEUE_WAIT", "2")),
+        ))
+    return _client
+
+
+def set_http_client(client: AsyncHTTPClient):
+    global _client
+    _client = client
@@ -0,0 +1,180 @@
+"""
+Lightweight spans for the request pipeline.
+
+    with tracing.span("triage", source="rules") as s:
+        ...
+        s.set(severity=4)
+
+Every span records its duration into the `span_<name>_seconds` summary, so
+per-stage latency is always on and costs two clock reads and one observe.
+Full traces (span tree, attributes, errors) are only kept for a sampled
+fraction of root spans (TRACE_SAMPLE_RATE, default 1%); children of an
+unsampled root skip all bookkeeping. Sampled traces are kept in a small ring
+buffer (/traces) and, with TRACE_OTEL=true and opentelemetry-api installed,
+mirrored as OpenTelemetry spans for whatever exporter the process configures.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+
+_recent = deque(maxlen=BUFFER_SIZE)
+_recent_lock = threading.Lock()
+_tracer = None
+_otel_checked = False
+
+
+class _Unsampled:
+    """Stands in for every span of an unsampled trace."""
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+_UNSAMPLED = _Unsampled()
+_current = contextvars.ContextVar("tracing_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "duration", "attributes", "status", "_otel")
+
+    def __init__(self, name: str, trace: list, parent: "Span" = None, attributes: dict = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.duration = None
+        self.attributes = dict(attributes or ())
+        self.status = "ok"
+        self._otel = _start_otel(name, parent, self.attributes)
+
+    @property
+    def trace_id(self) -> int:
+        return self.trace[0]
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        if self._otel is not None:
+            for key, value in attributes.items():
+                self._otel.set_attribute(key, _otel_value(value))
+
+    def finish(self, duration: float, error: BaseException = None):
+        self.duration = duration
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = repr(error)
+        self.trace[1].append(self)
+        if self._otel is not None:
+            if error is not None:
+                self._otel.record_exception(error)
+                from opentelemetry.trace import Status, StatusCode
+                self._otel.set_status(Status(StatusCode.ERROR))
+            self._otel.end()
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": f"{self.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_span_id": f"{self.parent_id:016x}" if self.parent_id is not None else None,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times a pipeline stage; nested spans become children of the enclosing one."""
+    parent = _current.get()
+    if parent is None:
+        if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+            record = Span(name, [random.getrandbits(128), []], attributes=attributes)
+        else:
+            record = _UNSAMPLED
+        token = _current.set(record)
+    elif parent is _UNSAMPLED:
+        record, token = _UNSAMPLED, None
+    else:
+        record = Span(name, parent.trace, parent, attributes)
+        token = _current.set(record)
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield record
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe(f"span_{name}_seconds", elapsed)
+        if token is not None:
+            _current.reset(token)
+        if record is not _UNSAMPLED:
+            record.finish(elapsed, error)
+            if record.parent_id is None:
+                with _recent_lock:
+                    _recent.append(record.trace)
+
+
+def annotate(**attributes):
+    """Adds attributes to the current span (a no-op outside a sampled trace)."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def recent_traces(limit: int = 20) -> list:
+    """The most recent sampled traces, newest first, each a list of span dicts in finishing order."""
+    with _recent_lock:
+        traces = list(_recent)[-limit:]
+    return [[s.to_dict() for s in spans] for _, spans in reversed(traces)]
+
+
+def set_sample_rate(rate: float):
+    global SAMPLE_RATE
+    SAMPLE_RATE = rate
+
+
+def clear():
+    with _recent_lock:
+        _recent.clear()
+
+
+def _start_otel(name: str, parent: Span, attributes: dict):
+    tracer = _get_tracer()
+    if tracer is None:
+        return None
+    from opentelemetry import trace
+    context = trace.set_span_in_context(parent._otel) if parent is not None and parent._otel is not None else None
+    return tracer.start_span(name, context=context, attributes={k: _otel_value(v) for k, v in attributes.items()})
+
+
+def _get_tracer():
+    global _tracer, _otel_checked
+    if not _otel_checked:
+        _otel_checked = True
+        if os.getenv("TRACE_OTEL", "false").lower() == "true":
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                print("[WARN] TRACE_OTEL is set but opentelemetry-api is not installed; keeping traces in-process only")
+            else:
+                _tracer = trace.get_tracer("agent-before-ambulance")
+    return _tracer
+
+
+def _otel_value(value):
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
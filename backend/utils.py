@@ -1,25 +1,226 @@
+import asyncio
+import os
+import re
+import threading
 import time
 import functools
+import inspect
+import weakref
+from contextlib import asynccontextmanager, contextmanager
 from google.api_core import exceptions
 import random
 
-def retry_with_backoff(retries=3, initial_delay=0.5, backoff_factor=2):
+import metrics
+import tracing
+
+RETRYABLE_EXCEPTIONS = (exceptions.ResourceExhausted, exceptions.ServiceUnavailable)
+
+_RETRY_HINT_PATTERNS = (
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller would have to queue longer than it is willing to wait."""
+
+
+class RateLimiter:
+    """
+    Token bucket + concurrency cap shared by every agent that talks to the model.
+
+    When the server reports quota exhaustion, `trip()` opens a shared cooldown
+    window so all callers pause together instead of each backing off on its own
+    schedule and hitting the API at the same moment.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 10, max_concurrency: int = 16):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self._thread_slots = threading.BoundedSemaphore(max_concurrency)
+        self._loop_slots = weakref.WeakKeyDictionary()
+
+    def reserve(self, max_wait: float = None):
+        """
+        Takes one token and returns how long the caller must wait before using it.
+        Tokens may go negative, which queues callers fairly without polling.
+        Returns None (taking nothing) if the wait would exceed `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max((1 - self._tokens) / self.rate if self._tokens < 1 else 0.0, self._cooldown_until - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def trip(self, delay: float):
+        """Opens (or extends) the shared cooldown window after a quota error."""
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+
+    def cooldown_remaining(self) -> float:
+        with self._lock:
+            return max(0.0, self._cooldown_until - time.monotonic())
+
+    def _loop_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._loop_slots.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop_slots[loop] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def acquire_async(self, max_wait: float = None):
+        wait = self.reserve(max_wait)
+        if wait is None:
+            raise RateLimitExceeded(f"Rate limit queue longer than {max_wait}s")
+        if wait > 0:
+            metrics.incr("llm_rate_limit_waits_total")
+            metrics.incr("llm_rate_limit_wait_seconds_total", wait)
+            await asyncio.sleep(wait)
+        async with self._loop_semaphore():
+            yield
+
+    @contextmanager
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            metrics.incr("llm_rate_limit_waits_total")
+            metrics.incr("llm_rate_limit_wait_seconds_total", wait)
+            time.sleep(wait)
+        with self._thread_slots:
+            yield
+
+
+llm_rate_limiter = RateLimiter(
+    rate=float(os.getenv("LLM_RATE_PER_SEC", "10")),
+    burst=int(os.getenv("LLM_BURST", "10")),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+)
+
+
+def retry_hint_seconds(exc: Exception):
+    """
+    Extracts the server-suggested retry delay from a google.api_core error, if any.
+    Looks at structured RetryInfo details first, then at the error message.
+    """
+    for detail in getattr(exc, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    message = str(exc)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _next_delay(exc: Exception, delay: float, max_delay: float) -> float:
+    hint = retry_hint_seconds(exc)
+    if hint is not None:
+        metrics.incr("llm_retry_hints_total")
+        return min(max_delay, hint + random.uniform(0, 0.1 * max(hint, 1)))
+    # Full jitter spreads callers that failed together
+    return random.uniform(delay / 2, delay)
+
+
+def _llm_span_name(func) -> str:
+    """TriageAgent.analyze_async -> llm_triage, FirstAidAgent._generate -> llm_first_aid."""
+    owner = func.__qualname__.split(".")[0]
+    if owner.endswith("Agent") and owner != "Agent":
+        owner = owner[:-len("Agent")]
+    return "llm_" + re.sub(r"(?<!^)(?=[A-Z])", "_", owner).lower()
+
+
+def retry_with_backoff(retries=3, initial_delay=0.5, backoff_factor=2, max_delay=30.0, max_wait=20.0, limiter=None):
+    """
+    Retries model calls on quota/availability errors with exponential backoff.
+
+    Works for both coroutine functions (non-blocking asyncio.sleep) and plain
+    functions. Every attempt goes through the shared rate limiter, and quota
+    errors trip its cooldown so the whole process backs off together. A call
+    gives up early rather than queue past `max_wait` seconds of backoff.
+    """
     def decorator(func):
+        span_name = _llm_span_name(func)
+
+        def limiter_for_call():
+            return limiter or llm_rate_limiter
+
+        def check_cooldown():
+            # Degrade by failing fast instead of parking requests behind a long quota outage
+            remaining = limiter_for_call().cooldown_remaining()
+            if remaining > max_wait:
+                metrics.incr("llm_retry_giveups_total")
+                raise exceptions.ResourceExhausted(f"Model quota cooling down for {remaining:.1f}s")
+
+        def plan_retry(exc, attempt, delay, waited):
+            """Returns the sleep time for the next attempt, or None to give up."""
+            if attempt == retries:
+                return None
+            sleep_time = _next_delay(exc, delay, max_delay)
+            if waited + sleep_time > max_wait:
+                return None
+            if isinstance(exc, exceptions.ResourceExhausted):
+                limiter_for_call().trip(sleep_time)
+            metrics.incr("llm_retries_total")
+            metrics.incr("llm_retry_wait_seconds_total", sleep_time)
+            print(f"Rate limit hit in {func.__qualname__}. Retrying in {sleep_time:.2f}s...")
+            return sleep_time
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                check_cooldown()
+                delay = initial_delay
+                waited = 0.0
+                with tracing.span(span_name, call=func.__qualname__) as span:
+                    for attempt in range(retries + 1):
+                        try:
+                            async with limiter_for_call().acquire_async():
+                                return await func(*args, **kwargs)
+                        except RETRYABLE_EXCEPTIONS as e:
+                            sleep_time = plan_retry(e, attempt, delay, waited)
+                            if sleep_time is None:
+                                metrics.incr("llm_retry_giveups_total")
+                                raise
+                            span.set(retries=attempt + 1)
+                            # The shared cooldown is honoured by the next acquire
+                            if not isinstance(e, exceptions.ResourceExhausted):
+                                await asyncio.sleep(sleep_time)
+                            waited += sleep_time
+                            delay *= backoff_factor
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            check_cooldown()
             delay = initial_delay
-            last_exception = None
-            for i in range(retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except exceptions.ResourceExhausted as e:
-                    last_exception = e
-                    if i == retries:
-                        break
-                    sleep_time = delay + random.uniform(0, 0.1)
-                    print(f"Rate limit hit. Retrying in {sleep_time:.2f}s...")
-                    time.sleep(sleep_time)
-                    delay *= backoff_factor
-            raise last_exception
+            waited = 0.0
+            with tracing.span(span_name, call=func.__qualname__) as span:
+                for attempt in range(retries + 1):
+                    try:
+                        with limiter_for_call().acquire():
+                            return func(*args, **kwargs)
+                    except RETRYABLE_EXCEPTIONS as e:
+                        sleep_time = plan_retry(e, attempt, delay, waited)
+                        if sleep_time is None:
+                            metrics.incr("llm_retry_giveups_total")
+                            raise
+                        span.set(retries=attempt + 1)
+                        if not isinstance(e, exceptions.ResourceExhausted):
+                            time.sleep(sleep_time)
+                        waited += sleep_time
+                        delay *= backoff_factor
         return wrapper
     return decorator
@@ -8,7 +8,9 @@ const CONFIG = {
         : window.location.origin.replace(':8080', ':8001'),  // Production (adjust port if needed)
     MAX_RETRIES: 3,
     RETRY_DELAY: 1000,
-    SESSION_STORAGE_KEY: 'aba_session_id'
+    SESSION_STORAGE_KEY: 'aba_session_id',
+    // Speak replies sentence by sentence as they are generated (/agent/stream)
+    STREAMING: true
 };
 
 // ============================================
@@ -188,6 +190,23 @@ async function sendMessage(text) {
     state.isProcessing = true;
     updateStatus('Processing...', 'processing');
 
+    if (CONFIG.STREAMING) {
+        try {
+            if (await sendMessageStreaming(text)) {
+                updateStatus('Ready', 'ready');
+                state.retryCount = 0;
+                state.isProcessing = false;
+                return;
+            }
+        } catch (error) {
+            console.error('Stream Error:', error);
+            handleApiError(error);
+            state.isProcessing = false;
+            return;
+        }
+        // Backend without streaming support: fall through to /agent
+    }
+
     try {
         const response = await fetchWithRetry(`${CONFIG.API_URL}/agent`, {
             method: 'POST',
@@ -234,6 +253,71 @@ async function sendMessage(text) {
     }
 }
 
+/**
+ * Sends a message to /agent/stream and speaks each sentence as it arrives.
+ * Returns false (without sending anything) if the backend has no streaming endpoint.
+ */
+async function sendMessageStreaming(text) {
+    const response = await fetch(`${CONFIG.API_URL}/agent/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            session_id: state.sessionId,
+            message: text
+        })
+    });
+
+    if (response.status === 404 || response.status === 405) return false;
+    if (!response.ok || !response.body) throw new Error(`Server error: ${response.status}`);
+
+    window.speechSynthesis?.cancel();
+    const messageDiv = addMessage('agent', '');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            handleStreamEvent(parseSseEvent(buffer.slice(0, boundary)), messageDiv);
+            buffer = buffer.slice(boundary + 2);
+        }
+    }
+    return true;
+}
+
+function parseSseEvent(raw) {
+    let event = 'message';
+    let data = '';
+    for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+    }
+    return { event, data: data ? JSON.parse(data) : {} };
+}
+
+function handleStreamEvent({ event, data }, messageDiv) {
+    switch (event) {
+        case 'chunk':
+            messageDiv.textContent += (messageDiv.textContent ? ' ' : '') + data.text;
+            elements.chatContainer.scrollTop = elements.chatContainer.scrollHeight;
+            speak(data.text, { queue: true });
+            break;
+        case 'dispatch':
+            showNotification(`🚑 Ambulance dispatched. ETA ${data.eta} minutes.`, 'info');
+            break;
+        case 'error':
+            messageDiv.textContent = data.text;
+            speak(data.text, { queue: true });
+            break;
+    }
+}
+
 // ============================================
 // Network & Error Handling
 // ============================================
@@ -284,6 +368,7 @@ function addMessage(role, text) {
     
     elements.chatContainer.appendChild(div);
     elements.chatContainer.scrollTop = elements.chatContainer.scrollHeight;
+    return div;
 }
 
 function updateStatus(text, type = 'ready') {
@@ -323,10 +408,10 @@ function showNotification(message, type = 'info') {
     }, 5000);
 }
 
-function speak(text) {
+function speak(text, { queue = false } = {}) {
     if ('speechSynthesis' in window) {
-        // Cancel any ongoing speech
-        window.speechSynthesis.cancel();
+        // Cancel any ongoing speech, unless this continues a streamed reply
+        if (!queue) window.speechSynthesis.cancel();
         
         const utterance = new SpeechSynthesisUtterance(text);
         utterance.rate = 0.9;
@@ -79,7 +79,9 @@ async def verify_supervisor():
     
     # Mocking triage agent
     print("Mocking triage agent...")
-    supervisor.triage_agent.analyze = lambda x: {"severity": 1, "accident_type": "minor cut"}
+    async def mock_analyze(x):
+        return {"severity": 1, "accident_type": "minor cut"}
+    supervisor.triage_agent.analyze_async = mock_analyze
     
     print("Processing message...")
     try: